@@ -1,24 +1,104 @@
 import asyncio
+import gc
 import logging
 import sys
 
-from loader import dp, bot
+from data import config
+from loader import dp, bot, broadcaster, data_managers, http_clients, redis, response_cache
 import middlewares, filters, handlers
+from handlers.private.chat import providers, router
+from utils.metrics import registry
+from utils.metrics.registry import CallbackMetric
+from utils.metrics.server import start_metrics_server
+from utils.misc.watchdog import LoopWatchdog
 from utils.notify_admins import on_startup_notify
 from utils.set_bot_commands import set_default_commands
+from utils.streaming import stats as stream_stats
+from utils.webhook import run_webhook
+
+metrics_runner = None
+watchdog = LoopWatchdog(config.LOOP_WATCHDOG_THRESHOLD, config.LOOP_WATCHDOG_INTERVAL) if config.LOOP_WATCHDOG else None
+
+
+def register_metrics():
+    """Mavjud hisoblagichlarni (renderer, kesh, router) registryga ulash"""
+    registry.watch("stream_renderer", stream_stats)
+    if response_cache is not None:
+        registry.watch("response_cache", response_cache.stats)
+    if router is not None:
+        for field in ("failovers", "hedges", "hedge_wins"):
+            registry.register(CallbackMetric(f"provider_router_{field}_total", f"Provider router {field}",
+                                             "counter", lambda field=field: getattr(router, field)))
+
 
 async def on_startup():
-    await set_default_commands()
-    await on_startup_notify()
+    global metrics_runner
+    if watchdog is not None:
+        watchdog.start()
+    for manager in data_managers.values():
+        await manager.start()
+    # Ko'p jarayonli rejimda buyruqlar va adminlarga xabar faqat birinchi workerdan
+    if not config.WORKER_INDEX:
+        await set_default_commands()
+        await on_startup_notify()
+    # Oldingi ishga tushishda uzilib qolgan broadcast (fon vazifasida davom etadi)
+    broadcaster.resume()
+    if config.METRICS_ENABLED and config.METRICS_PORT:
+        register_metrics()
+        # Har bir worker o'z portida: METRICS_PORT + worker indeksi
+        port = config.METRICS_PORT + (config.WORKER_INDEX or 0)
+        metrics_runner = await start_metrics_server(config.METRICS_HOST, port)
+        logging.info(f"Metrics: http://{config.METRICS_HOST}:{port}/metrics")
+    # Yuklangan chat tarixi (har bir xabar - GC kuzatadigan Message obyekti) to'liq
+    # GC larda qayta-qayta aylanib chiqilmasligi uchun doimiy avlodga o'tkaziladi
+    gc.collect()
+    gc.freeze()
+
+async def on_shutdown():
+    if watchdog is not None:
+        await watchdog.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    # Broadcast progressi saqlanadi, keyingi ishga tushishda davom etadi
+    await broadcaster.close()
+    # Xotiradagi chat tarixini diskka yozib qo'yish
+    for manager in data_managers.values():
+        await manager.close()
+    for provider in providers.values():
+        await provider.close()
+    if router is not None:
+        logging.info(f"Provider routing: {router.stats()}")
+    if response_cache is not None:
+        logging.info(f"Response cache: {response_cache.stats.as_dict()}")
+        await response_cache.close()
+    await dp.storage.close()
+    if redis is not None:
+        await redis.aclose()
 
 async def main():
     dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
     try:
-        await dp.start_polling(bot)
+        if config.BOT_MODE == "webhook":
+            await run_webhook(
+                dp, bot,
+                base_url=config.WEBHOOK_BASE_URL,
+                path=config.WEBHOOK_PATH,
+                secret_token=config.WEBHOOK_SECRET,
+                host=config.WEBAPP_HOST,
+                port=config.WEBAPP_PORT,
+                workers=config.WEBHOOK_WORKERS,
+                queue_size=config.WEBHOOK_QUEUE_SIZE,
+            )
+        else:
+            await bot.delete_webhook(drop_pending_updates=False)
+            await dp.start_polling(bot)
     except KeyboardInterrupt:
         logging.info("❌ Bot to‘xtatildi!")
     finally:
         await bot.session.close()
+        # Provayderlarning umumiy HTTP klientlari
+        await http_clients.aclose()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
@@ -0,0 +1,20 @@
+"""
+Benchmark va yuklama testlari.
+
+Skriptlar `python -m bench.<nom>` ko'rinishida ishga tushiriladi. Haqiqiy
+tokenlar kerak emas: konfiguratsiya uchun soxta qiymatlar qo'yiladi.
+"""
+import os
+
+for _name, _value in {
+    "BOT_TOKEN": "123456:bench",
+    "ADMINS": "",
+    "ip": "127.0.0.1",
+    "OPENAI_API_KEY": "bench",
+    "OPENAI_MODEL": "gpt-4o-mini",
+    "GEMINI_API_KEY": "bench",
+    "GEMINI_MODEL": "gemini-1.5-flash",
+    "DEEPSEEK_API_KEY": "bench",
+    "DEEPSEEK_MODEL": "deepseek-chat",
+}.items():
+    os.environ.setdefault(_name, _value)
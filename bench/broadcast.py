@@ -0,0 +1,151 @@
+"""
+Broadcast: soxta Telegram Bot API (sekundiga `--flood-rate` dan ko'p xabarga
+429, `--blocked` ulushdagi foydalanuvchilarga 403) ga `--users` ta
+foydalanuvchiga xabar yuborish. Solishtiriladi:
+  * oddiy ketma-ket sikl (oldingi on_startup_notify kabi: xatolik logga yoziladi va o'tkazib yuboriladi);
+  * Broadcaster (token bucket, per-chat interval, RetryAfter, bloklaganlar).
+Broadcaster bilan bir vaqtda chat trafigi (`--chat-rate` xabar/sekund,
+OutgoingBudget orqali) yuboriladi va uning kechikishi o'lchanadi. Oxirida
+broadcast o'rtasida to'xtatilib (bot qayta ishga tushgandek) davom
+ettiriladi va takroriy/yetkazilmagan xabarlar sanaladi.
+
+    python -m bench.broadcast --users 500 --flood-rate 30 --rate 25
+"""
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from bench.fake_telegram import FakeTelegram, start_fake_telegram
+from middlewares.broadcast import OutgoingBudget
+from utils.broadcast import BLOCKED, FAILED, SENT, Broadcaster
+
+FIRST_CHAT = 1000000
+
+
+def _percentile(values, pct):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _server(args):
+    fake = FakeTelegram(flood_rate=args.flood_rate)
+    rng = random.Random(args.seed)
+    fake.blocked.update(FIRST_CHAT + i for i in range(args.users) if rng.random() < args.blocked)
+    runner, base_url = await start_fake_telegram(fake)
+    bot = Bot("42:BENCH", session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    return fake, runner, bot
+
+
+def _recipients(args):
+    return [str(FIRST_CHAT + i) for i in range(args.users)]
+
+
+async def naive(args) -> None:
+    fake, runner, bot = await _server(args)
+    started = time.perf_counter()
+    for chat_id in _recipients(args):
+        try:
+            await bot.send_message(chat_id, "Yangilik!")
+        except Exception:
+            pass
+    elapsed = time.perf_counter() - started
+    delivered = sum(1 for chat_id, count in fake.sent.items() if chat_id >= FIRST_CHAT)
+    print(f"  naive loop       {elapsed:6.1f} s  {args.users / elapsed:7.1f} msg/s  delivered={delivered} "
+          f"429={fake.errors[429]} 403={fake.errors[403]} lost={args.users - len(fake.blocked) - delivered}")
+    await bot.session.close()
+    await runner.cleanup()
+
+
+async def _chat_traffic(bot, rate: float, latencies, stop: asyncio.Event) -> None:
+    chat_id = 1
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await bot.send_message(chat_id, "javob")
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            latencies.append(float('inf'))
+        chat_id = chat_id % 50 + 1
+        await asyncio.sleep(1 / rate)
+
+
+async def broadcaster(args) -> None:
+    fake, runner, bot = await _server(args)
+    state_dir = tempfile.mkdtemp(prefix='bench-broadcast-')
+    engine = Broadcaster(bot, state_dir=state_dir, rate=args.rate, concurrency=args.concurrency)
+    bot.session.middleware(OutgoingBudget(engine.bucket))
+
+    latencies, stop = [], asyncio.Event()
+    chat = asyncio.create_task(_chat_traffic(bot, args.chat_rate, latencies, stop))
+    await asyncio.sleep(1)
+    idle_latencies = list(latencies)
+    started = time.perf_counter()
+    job = await engine.start(_recipients(args), text="Yangilik!")
+    await engine._task
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await chat
+    busy = latencies[len(idle_latencies):]
+    chat_failed = sum(1 for latency in latencies if latency == float('inf'))
+    print(f"  Broadcaster      {elapsed:6.1f} s  {args.users / elapsed:7.1f} msg/s  "
+          f"sent={job.counts[SENT]} blocked={job.counts[BLOCKED]} failed={job.counts[FAILED]} "
+          f"429={fake.errors[429]} (chat traffic {args.chat_rate:g}/s included)")
+    print(f"  chat latency ms  idle p50={_percentile(idle_latencies, 50) * 1000:.1f}  "
+          f"during broadcast p50={_percentile(busy, 50) * 1000:.1f} p99={_percentile(busy, 99) * 1000:.1f}  "
+          f"failed={chat_failed}")
+    await bot.session.close()
+    await runner.cleanup()
+
+
+async def resume(args) -> None:
+    fake, runner, bot = await _server(args)
+    state_dir = tempfile.mkdtemp(prefix='bench-broadcast-')
+    engine = Broadcaster(bot, state_dir=state_dir, rate=args.rate, concurrency=args.concurrency,
+                         checkpoint_interval=0.5)
+    job = await engine.start(_recipients(args), text="Yangilik!")
+    while job.processed < args.users * 0.4:
+        await asyncio.sleep(0.05)
+    await engine.close()  # on_shutdown kabi
+    stopped_at = job.processed
+
+    engine = Broadcaster(bot, state_dir=state_dir, rate=args.rate, concurrency=args.concurrency)
+    job = engine.resume()
+    await engine._task
+    expected = {FIRST_CHAT + i for i in range(args.users)} - fake.blocked
+    duplicates = sum(1 for chat_id in expected if fake.sent[chat_id] > 1)
+    missing = sum(1 for chat_id in expected if not fake.sent[chat_id])
+    print(f"  cancel + resume  stopped at {stopped_at}/{args.users}, finished {job.status}: "
+          f"sent={job.counts[SENT]} duplicates={duplicates} missing={missing} "
+          f"blocked.txt={len(engine.blocked)}")
+    await bot.session.close()
+    await runner.cleanup()
+
+
+async def main(args) -> None:
+    print(f"{args.users} users, {args.blocked:.0%} blocked, Telegram flood limit {args.flood_rate:g} msg/s, "
+          f"broadcast rate {args.rate:g} msg/s")
+    await naive(args)
+    await broadcaster(args)
+    await resume(args)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--blocked", type=float, default=0.05, help="share of users who blocked the bot")
+    parser.add_argument("--flood-rate", type=float, default=30.0, help="fake Telegram limit, messages per second")
+    parser.add_argument("--rate", type=float, default=25.0, help="Broadcaster token bucket rate")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--chat-rate", type=float, default=3.0, help="chat replies per second during the broadcast")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,104 @@
+"""
+Prompt hajmi (token) va time-to-first-token ni solishtirish: eski "oxirgi
+max_messages * 2 ta xabar" usuli va token byudjeti bo'yicha ContextBuilder.
+
+Sintetik korpus: har bir suhbatda oddiy savol-javoblar orasida vaqti-vaqti
+bilan uzun matn/kod qo'yilgan xabarlar bor. TTFT provayder so'rovisiz,
+prefill tezligi modeli bo'yicha hisoblanadi: base + prompt_tokens / prefill_rate.
+
+    python -m bench.context_window --conversations 500 --turns 40 --budget 3000
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List
+
+from utils.json_manager import (ContextBuilder, Conversation, JSONDataManager, Message, count_tokens,
+                                extractive_summary)
+
+SYSTEM_PROMPT = JSONDataManager.DEFAULT_SYSTEM_PROMPT
+WORDS = ("python", "funksiya", "ro'yxat", "server", "so'rov", "javob", "model", "ma'lumot",
+         "database", "token", "xatolik", "natija", "kod", "test", "vaqt", "foydalanuvchi")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words)) + '.'
+
+
+def _conversation(rng: random.Random, turns: int, paste_ratio: float) -> List[dict]:
+    messages = []
+    for _ in range(turns):
+        if rng.random() < paste_ratio:
+            content = _text(rng, rng.randint(800, 3000))  # log, kod yoki hujjat qo'yilgan
+        else:
+            content = _text(rng, rng.randint(5, 40))
+        messages.append({"role": "user", "content": content})
+        messages.append({"role": "assistant", "content": _text(rng, rng.randint(40, 250))})
+    return messages
+
+
+def _prompt_tokens(messages: List[dict]) -> int:
+    return sum(count_tokens(message['content']) + 4 for message in messages)
+
+
+def _legacy(messages: List[dict], max_messages: int) -> List[dict]:
+    # Oldingi manage_conversation_history: o'lchamidan qat'i nazar oxirgi max_messages * 2 ta xabar
+    return [{"role": "system", "content": SYSTEM_PROMPT}] + messages[-(max_messages * 2):]
+
+
+def _report(name: str, tokens: List[int], build_us: List[float], args) -> None:
+    ttft = [args.base_latency + t / args.prefill_rate * 1000 for t in tokens]
+    print(f"{name:<18} tokens p50={_percentile(tokens, 50):>6} p95={_percentile(tokens, 95):>6} "
+          f"max={max(tokens):>6} | TTFT ms p50={_percentile(ttft, 50):>7.0f} p95={_percentile(ttft, 95):>7.0f} "
+          f"| build us p50={_percentile(build_us, 50):.1f} mean={statistics.mean(build_us):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--paste-ratio", type=float, default=0.1)
+    parser.add_argument("--budget", type=int, default=3000)
+    parser.add_argument("--max-messages", type=int, default=5)
+    parser.add_argument("--prefill-rate", type=float, default=4000.0, help="prompt tokens per second")
+    parser.add_argument("--base-latency", type=float, default=300.0, help="ms, network + queueing")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [_conversation(rng, args.turns, args.paste_ratio) for _ in range(args.conversations)]
+    variants = {
+        "legacy": None,
+        "budget": ContextBuilder(),
+        "budget+summary": ContextBuilder(summarizer=extractive_summary),
+    }
+
+    for name, builder in variants.items():
+        tokens, build_us = [], []
+        for conversation in corpus:
+            history = Conversation(JSONDataManager.MAX_STORED_MESSAGES)
+            # Har bir navbatda (foydalanuvchi xabari qo'shilgandan keyin) prompt yig'iladi
+            for index in range(0, len(conversation), 2):
+                history.append(Message(**conversation[index]))
+
+                started = time.perf_counter()
+                if builder is None:
+                    prompt = _legacy(history.last(len(history)).to_wire(), args.max_messages)
+                else:
+                    prompt, _ = builder.build(history, SYSTEM_PROMPT, budget=args.budget,
+                                              max_messages=args.max_messages * 2)
+                build_us.append((time.perf_counter() - started) * 1e6)
+                tokens.append(_prompt_tokens(prompt))
+
+                history.append(Message(**conversation[index + 1]))
+        _report(name, tokens, build_us, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Xotiradagi chat tarixi hajmi (tracemalloc): oldingi lug'atlar ro'yxati
+({"role", "content", "tokens"} har bir xabar uchun) va Conversation
+(__slots__ li Message, intern qilingan rollar, halqa bufer) solishtiriladi.
+
+Ikkala holatda ham bir xil JSON (storage formati) yuklanadi va quyidagilar
+o'lchanadi:
+  * bytes/user - yuklangandan keyin xotirada qolgan hajm / foydalanuvchilar soni;
+  * to'liq GC pauzasi: Message obyektlari (lug'atlardan farqli) GC kuzatuvida,
+    shuning uchun app.on_startup tarix yuklangach gc.freeze() qiladi;
+  * bitta navbat (foydalanuvchi xabari + kontekst yig'ish + javob) dagi
+    eng yuqori ajratilgan xotira, navbatdan keyin qolgan xotira va vaqt.
+
+    python -m bench.conversation_memory --users 100000 --messages 20
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from utils.json_manager import ContextBuilder, Conversation, Message, count_tokens
+from utils.json_manager.conversation import load_conversations
+from utils.json_manager.context import MESSAGE_OVERHEAD
+
+SYSTEM_PROMPT = "You are a helpful assistant. If the question is in Uzbek, answer in Uzbek."
+_WORDS = "salom python kod funksiya ro'yxat savol javob misol qanday nima uchun ishlaydi".split()
+
+
+def _seed(users: int, messages: int, rng: random.Random) -> bytes:
+    """Storage formatidagi JSON (token sonlari bilan - diskdagi fayl kabi)"""
+    data = {}
+    for i in range(users):
+        history = []
+        for j in range(messages):
+            content = ' '.join(rng.choices(_WORDS, k=rng.randint(4, 16))) + f" {i}.{j}"
+            history.append({"role": "user" if j % 2 == 0 else "assistant", "content": content,
+                            "tokens": count_tokens(content) + MESSAGE_OVERHEAD})
+        data[str(1000000 + i)] = {'messages': history, 'last_message_time': "2025-01-01T00:00:00"}
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def _legacy_add(user_data: Dict[str, Any], role: str, content: str, capacity: int) -> None:
+    # Oldingi JSONDataManager.add_message: lug'at qo'shiladi, to'lganda ro'yxat kesib qayta yaratiladi
+    message = {"role": role, "content": content}
+    message['tokens'] = count_tokens(content) + MESSAGE_OVERHEAD
+    user_data['messages'].append(message)
+    overflow = len(user_data['messages']) - capacity
+    if overflow > 0:
+        user_data['messages'] = user_data['messages'][overflow:]
+
+
+def _legacy_build(user_data: Dict[str, Any], budget: int, max_messages: int) -> List[Dict[str, str]]:
+    # Oldingi ContextBuilder.build: kesimlar nusxa, har bir xabar uchun yangi lug'at
+    messages = user_data.get('messages', [])
+    window = max(0, len(messages) - max_messages)
+    remaining = budget - count_tokens(SYSTEM_PROMPT) - MESSAGE_OVERHEAD
+    tail = messages[window:]
+    start = len(tail)
+    while start > 0 and tail[start - 1]['tokens'] <= remaining:
+        remaining -= tail[start - 1]['tokens']
+        start -= 1
+    return [{"role": "system", "content": SYSTEM_PROMPT}] + [
+        {"role": message['role'], "content": message['content']} for message in messages[window + start:]
+    ]
+
+
+def _load_legacy(blob: bytes, capacity: int) -> Dict[str, Any]:
+    return json.loads(blob)
+
+
+def _load_conversations(blob: bytes, capacity: int) -> Dict[str, Conversation]:
+    return load_conversations(json.loads(blob), capacity)
+
+
+def _measure_load(load, blob: bytes, capacity: int) -> Tuple[Any, int, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    data = load(blob, capacity)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return data, size, elapsed
+
+
+def _measure_gc() -> Tuple[float, float]:
+    """To'liq GC pauzasi (ms): oddiy holatda va gc.freeze() dan keyin (app.on_startup kabi)"""
+    gc.collect()
+    started = time.perf_counter()
+    gc.collect()
+    plain = (time.perf_counter() - started) * 1000
+    gc.freeze()
+    started = time.perf_counter()
+    gc.collect()
+    frozen = (time.perf_counter() - started) * 1000
+    gc.unfreeze()
+    return plain, frozen
+
+
+def _measure_turns(turn, data: Dict[str, Any], user_ids: List[str]) -> Tuple[float, float, float]:
+    """Bitta navbat uchun: o'rtacha eng yuqori ajratilgan bayt, qolgan bayt va vaqt (mikrosekund)"""
+    half = len(user_ids) // 2
+    gc.collect()  # yuklashdan qolgan to'liq GC vaqt o'lchoviga tushmasin
+    rounds = []
+    for _ in range(3):  # eng yaxshisi olinadi: katta heap da birinchi aylanish OS shovqiniga sezgir
+        started = time.perf_counter()
+        for user_id in user_ids[half:]:
+            turn(data[user_id])
+        rounds.append(time.perf_counter() - started)
+    elapsed_us = min(rounds) * 1e6 / max(1, len(user_ids) - half)
+
+    peaks = []
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for user_id in user_ids[:half]:
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        turn(data[user_id])
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    gc.collect()
+    retained = (tracemalloc.get_traced_memory()[0] - base) / max(1, half)
+    tracemalloc.stop()
+    return sum(peaks) / max(1, len(peaks)), retained, elapsed_us
+
+
+def main(args) -> None:
+    rng = random.Random(args.seed)
+    blob = _seed(args.users, args.messages, rng)
+    user_ids = rng.sample([str(1000000 + i) for i in range(args.users)], min(args.turns, args.users))
+    print(f"{args.users} users x {args.messages} messages, JSON {len(blob) / 2 ** 20:.1f} MiB, "
+          f"per-turn sample: {len(user_ids)} users")
+    question, answer = "Python da ro'yxatni qanday saralash mumkin? " * 2, "sorted() funksiyasidan foydalaning. " * 6
+    builder = ContextBuilder()
+
+    def legacy_turn(user_data):
+        _legacy_add(user_data, "user", question, args.messages)
+        _legacy_build(user_data, args.budget, args.max_messages * 2)
+        _legacy_add(user_data, "assistant", answer, args.messages)
+
+    def conversation_turn(conversation):
+        conversation.append(Message("user", question, count_tokens(question) + MESSAGE_OVERHEAD))
+        builder.build(conversation, SYSTEM_PROMPT, budget=args.budget, max_messages=args.max_messages * 2)
+        conversation.append(Message("assistant", answer, count_tokens(answer) + MESSAGE_OVERHEAD))
+
+    results = []
+    for name, load, turn in (("dict messages", _load_legacy, legacy_turn),
+                             ("Conversation", _load_conversations, conversation_turn)):
+        data, size, elapsed = _measure_load(load, blob, args.messages)
+        results.append((name, size, elapsed) + _measure_gc() + _measure_turns(turn, data, user_ids))
+        del data
+        gc.collect()
+
+    print(f"\n{'model':<14} {'MiB':>8} {'bytes/user':>11} {'load s':>7} | {'gc ms':>7} {'frozen':>7} | "
+          f"{'turn peak B':>11} {'kept B':>7} {'turn us':>8}")
+    for name, size, elapsed, gc_ms, frozen_ms, peak, kept, turn_us in results:
+        print(f"{name:<14} {size / 2 ** 20:8.1f} {size / args.users:11.0f} {elapsed:7.2f} | "
+              f"{gc_ms:7.1f} {frozen_ms:7.1f} | {peak:11.0f} {kept:7.0f} {turn_us:8.1f}")
+    legacy, current = results
+    print(f"\nbytes/user: {current[1] / legacy[1]:.0%} of dict messages")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=20, help="stored messages per user (buffer capacity)")
+    parser.add_argument("--turns", type=int, default=2000, help="users sampled per turn (half traced, half timed)")
+    parser.add_argument("--budget", type=int, default=3000)
+    parser.add_argument("--max-messages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""
+Benchmarklar uchun soxta LLM server: OpenAI Chat Completions va Gemini
+streamGenerateContent (SSE) javoblarini sozlanadigan kechikish bilan qaytaradi.
+
+    python -m bench.fake_llm --port 8081 --ttft 0.3 --chunks 20 --chunk-delay 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+class FakeLLM:
+    def __init__(self, ttft: float = 0.3, chunks: int = 20, chunk_delay: float = 0.02,
+                 error_rate: float = 0.0, max_streams: int = 0):
+        self.ttft = ttft
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.max_streams = max_streams  # 0 - cheklanmagan; oshsa 429 qaytariladi
+        self.active = 0
+        self.requests = 0
+        self.errors = 0
+
+    def _reject(self, request: web.Request):
+        self.requests += 1
+        if self.max_streams and self.active >= self.max_streams:
+            self.errors += 1
+            return web.json_response({"error": {"message": "rate limited"}}, status=429,
+                                     headers={"Retry-After": "0.1"})
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": {"message": "upstream unavailable"}}, status=503)
+        return None
+
+    async def _sse(self, request: web.Request, events) -> web.StreamResponse:
+        self.active += 1
+        try:
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            await asyncio.sleep(self.ttft)
+            for index, event in enumerate(events):
+                if index:
+                    await asyncio.sleep(self.chunk_delay)
+                await response.write(f"data: {event}\n\n".encode())
+            await response.write_eof()
+            return response
+        finally:
+            self.active -= 1
+
+    async def openai_chat(self, request: web.Request) -> web.StreamResponse:
+        rejected = self._reject(request)
+        if rejected is not None:
+            return rejected
+        body = await request.json()
+        created = int(time.time())
+
+        def events():
+            for index in range(self.chunks):
+                yield json.dumps({
+                    "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": f"token{index} "}, "finish_reason": None}],
+                })
+            yield "[DONE]"
+
+        return await self._sse(request, events())
+
+    async def gemini_stream(self, request: web.Request) -> web.StreamResponse:
+        rejected = self._reject(request)
+        if rejected is not None:
+            return rejected
+        await request.json()
+        return await self._sse(request, (
+            json.dumps({"candidates": [{"content": {"role": "model", "parts": [{"text": f"token{index} "}]}}]})
+            for index in range(self.chunks)
+        ))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.openai_chat)
+        app.router.add_post("/v1beta/models/{model}:streamGenerateContent", self.gemini_stream)
+        return app
+
+
+async def start_fake_llm(fake: FakeLLM, host: str = "127.0.0.1", port: int = 0):
+    """Serverni ishga tushirish; (runner, base_url) qaytaradi"""
+    runner = web.AppRunner(fake.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, backlog=4096)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeLLM(args.ttft, args.chunks, args.chunk_delay, args.error_rate)
+    web.run_app(fake.app(), host="127.0.0.1", port=args.port, access_log=None, backlog=4096)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Yuklama testlari uchun soxta Telegram Bot API server.
+
+getUpdates (long polling) navbatdagi sintetik updatelarni qaytaradi, bot
+yuborgan sendMessage/editMessageText chaqiruvlari qayd etiladi va har bir
+chat uchun "javob tayyor" shartini kutish mumkin (`expect`).
+
+`flood_rate` berilsa, sekundiga shundan ko'p xabar yuborilganda 429
+(retry_after bilan) qaytariladi; `blocked` dagi chatlarga yuborish 403.
+"""
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from aiohttp import web
+
+# (method, text) -> javob shu chaqiruv bilan tugadimi
+ReplyPredicate = Callable[[str, str], bool]
+
+
+class FakeTelegram:
+    def __init__(self, bot_id: int = 1, flood_rate: Optional[float] = None, retry_after: int = 1):
+        self.bot_id = bot_id
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.blocked: Set[int] = set()
+        self.sent: Counter = Counter()  # chat_id -> yetkazilgan xabarlar
+        self.errors: Counter = Counter()  # HTTP status -> soni
+        self._recent: "deque[float]" = deque()
+        self.updates: "deque[dict]" = deque()
+        self.update_id = 0
+        self.message_id = 0
+        self.pushed = 0
+        self.calls: Counter = Counter()
+        self.polling = asyncio.Event()  # bot birinchi marta getUpdates chaqirganda
+        self._new_updates = asyncio.Event()
+        self._waiters: Dict[int, Tuple[ReplyPredicate, asyncio.Future]] = {}
+
+    def push(self, chat_id: int, text: str) -> None:
+        """Foydalanuvchidan kelgan xabarni update navbatiga qo'shish"""
+        self.update_id += 1
+        self.message_id += 1
+        user = {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"}
+        message = {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+        }
+        if text.startswith('/'):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        self.updates.append({"update_id": self.update_id, "message": message})
+        self.pushed += 1
+        self._new_updates.set()
+
+    def expect(self, chat_id: int, predicate: ReplyPredicate) -> asyncio.Future:
+        """Chatga `predicate` ni qanoatlantiradigan javob kelganda perf_counter qiymati bilan bajariladi"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[chat_id] = (predicate, future)
+        return future
+
+    def _reply(self, method: str, chat_id: int, text: str) -> None:
+        waiter = self._waiters.get(chat_id)
+        if waiter is not None and not waiter[1].done() and waiter[0](method, text):
+            waiter[1].set_result(time.perf_counter())
+            del self._waiters[chat_id]
+
+    async def _get_updates(self, data) -> list:
+        if not self.polling.is_set():
+            self.polling.set()
+        offset = int(data.get("offset") or 0)
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        if not self.updates:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), float(data.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                return []
+        limit = int(data.get("limit") or 100)
+        return [update for _, update in zip(range(limit), self.updates)]
+
+    def _rejection(self, chat_id: int) -> Optional[web.Response]:
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - 1:
+            self._recent.popleft()
+        if chat_id in self.blocked:
+            status, description, parameters = 403, "Forbidden: bot was blocked by the user", None
+        elif self.flood_rate is not None and len(self._recent) >= self.flood_rate:
+            status, description = 429, f"Too Many Requests: retry after {self.retry_after}"
+            parameters = {"retry_after": self.retry_after}
+        else:
+            self._recent.append(now)
+            return None
+        self.errors[status] += 1
+        body = {"ok": False, "error_code": status, "description": description}
+        if parameters:
+            body["parameters"] = parameters
+        return web.json_response(body, status=status)
+
+    def _message(self, data, message_id: Optional[int] = None) -> dict:
+        if message_id is None:
+            self.message_id += 1
+            message_id = self.message_id
+        chat_id = int(data["chat_id"])
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data.get("text", ""),
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        data = await request.post()
+        self.calls[method] += 1
+
+        if method in ("sendMessage", "editMessageText", "copyMessage"):
+            rejection = self._rejection(int(data["chat_id"]))
+            if rejection is not None:
+                return rejection
+            self.sent[int(data["chat_id"])] += 1
+
+        if method == "getUpdates":
+            result = await self._get_updates(data)
+        elif method == "getMe":
+            result = {"id": self.bot_id, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method in ("sendMessage", "editMessageText"):
+            message_id = int(data["message_id"]) if method == "editMessageText" else None
+            result = self._message(data, message_id)
+            self._reply(method, result["chat"]["id"], result["text"])
+        elif method == "copyMessage":
+            self.message_id += 1
+            result = {"message_id": self.message_id}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start_fake_telegram(fake: FakeTelegram, host: str = "127.0.0.1", port: int = 0):
+    """Serverni ishga tushirish; (runner, base_url) qaytaradi (TELEGRAM_API_URL uchun)"""
+    runner = web.AppRunner(fake.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, backlog=4096)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}"
@@ -0,0 +1,105 @@
+"""
+Janitor: faol bo'lmagan foydalanuvchilarni hot store dan gzip arxivga
+chiqarish. `--idle` ulushdagi foydalanuvchilarning oxirgi xabari TTL dan
+eski qilib yaratiladi, so'ng quyidagilar o'lchanadi:
+  * hot store fayli hajmi va qayta ishga tushishdagi yuklash vaqti (oldin / keyin);
+  * evict_idle davomiyligi va shu vaqtdagi eng uzun event loop bloklanishi;
+  * arxiv hajmi (JSON ga nisbatan) va qaytgan foydalanuvchini tiklash kechikishi.
+
+    python -m bench.history_janitor --users 100000 --idle 0.8
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.json_manager import HistoryArchive, JSONDataManager
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _seed(path: str, users: int, idle: float, messages: int, rng: random.Random) -> None:
+    now, old = datetime.now().isoformat(), (datetime.now() - timedelta(days=90)).isoformat()
+    data = {}
+    for i in range(users):
+        history = [{"role": "user" if j % 2 == 0 else "assistant",
+                    "content": f"Savol yoki javob matni {i}.{j} " * rng.randint(1, 6)} for j in range(messages)]
+        data[str(1000000 + i)] = {'messages': history, 'last_message_time': old if rng.random() < idle else now}
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+
+
+def _open(path: str, archive_dir: str):
+    started = time.perf_counter()
+    manager = JSONDataManager(path, ttl=30 * 24 * 3600, archive=HistoryArchive(archive_dir))
+    elapsed = time.perf_counter() - started
+    # app.on_startup kabi: yuklangan tarix to'liq GC larda aylanib chiqilmaydi
+    gc.collect()
+    gc.freeze()
+    return manager, elapsed
+
+
+async def _heartbeat(lags, interval: float = 0.005) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def main(args) -> None:
+    workdir = tempfile.mkdtemp(prefix='bench-janitor-')
+    path, archive_dir = os.path.join(workdir, 'history.json'), os.path.join(workdir, 'archive')
+    _seed(path, args.users, args.idle, args.messages, random.Random(args.seed))
+    size_before = os.path.getsize(path)
+
+    manager, load_before = _open(path, archive_dir)
+    lags = []
+    heartbeat = asyncio.create_task(_heartbeat(lags))
+    started = time.perf_counter()
+    evicted = await manager.evict_idle()
+    evict_s = time.perf_counter() - started
+    heartbeat.cancel()
+    await manager.close()
+    size_after = os.path.getsize(path)
+    archive_size = manager.archive.disk_size()
+
+    manager, load_after = _open(path, archive_dir)
+    counts = manager.user_counts()
+    archived = [user_id for user_id in map(str, range(1000000, 1000000 + args.users)) if user_id in manager.archive]
+    latencies = []
+    for user_id in random.Random(args.seed).sample(archived, min(args.restores, len(archived))):
+        started = time.perf_counter()
+        manager.get_user_data(user_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+    await manager.close()
+
+    print(f"{args.users} users, {args.idle:.0%} idle, {args.messages} messages each")
+    print(f"  evicted          {evicted} in {evict_s:.2f} s, loop blocked max {max(lags, default=0) * 1000:.1f} ms "
+          f"(p99 {_percentile(lags, 99) * 1000 if lags else 0:.1f} ms)")
+    print(f"  hot store        {size_before / 2 ** 20:.1f} MiB -> {size_after / 2 ** 20:.1f} MiB, "
+          f"load {load_before:.2f} s -> {load_after:.2f} s")
+    print(f"  archive          {archive_size / 2 ** 20:.1f} MiB "
+          f"({archive_size / max(1, size_before - size_after):.0%} of the evicted JSON)")
+    print(f"  users            hot={counts['hot']} archived={counts['archived']}")
+    if latencies:
+        print(f"  restore ms       p50={_percentile(latencies, 50):.3f} p99={_percentile(latencies, 99):.3f} "
+              f"mean={statistics.mean(latencies):.3f} (n={len(latencies)})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--idle", type=float, default=0.8, help="share of users idle longer than the TTL")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--restores", type=int, default=1000, help="archived users reloaded for latency")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,110 @@
+"""
+add_message kechikishini (p50/p99) solishtirish: eski "har chaqiruvda butun
+faylni qayta yozish" usuli, JSONDataManager va SQLiteDataManager.
+
+    python -m bench.history_storage --users 1000 10000 100000 --samples 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from utils.db_api.sqlite import SQLiteDataManager, SQLiteWriter, connect
+from utils.json_manager import JSONDataManager
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _seed_users(count: int) -> dict:
+    now = "2025-01-01T00:00:00"
+    return {
+        str(1000000 + i): {
+            'messages': [{"role": "user", "content": f"salom {i}"}, {"role": "assistant", "content": "Salom!"}],
+            'last_message_time': now,
+        }
+        for i in range(count)
+    }
+
+
+def _legacy_add_message(file_path: str, user_id: str, role: str, content: str) -> None:
+    # Oldingi JSONDataManager.add_message xatti-harakati: load + to'liq dump
+    with open(file_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    data.setdefault(user_id, {'messages': [], 'last_message_time': ''})
+    data[user_id]['messages'] = (data[user_id]['messages'] + [{"role": role, "content": content}])[-20:]
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def _measure(add: Callable[[str, str, str], None], user_ids: List[str], samples: int) -> List[float]:
+    latencies = []
+    for _ in range(samples):
+        user_id = random.choice(user_ids)
+        started = time.perf_counter()
+        add(user_id, "user", "Python nima? " * 8)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def _run(users: int, samples: int, workdir: str) -> None:
+    seed = _seed_users(users)
+    user_ids = list(seed)
+
+    json_path = os.path.join(workdir, f'legacy_{users}.json')
+    with open(json_path, 'w', encoding='utf-8') as file:
+        json.dump(seed, file, ensure_ascii=False, indent=2)
+    legacy = _measure(lambda *a: _legacy_add_message(json_path, *a), user_ids, min(samples, 50))
+
+    manager_path = os.path.join(workdir, f'manager_{users}.json')
+    with open(manager_path, 'w', encoding='utf-8') as file:
+        json.dump(seed, file, ensure_ascii=False)
+    json_manager = JSONDataManager(manager_path, max_dirty=10 ** 9)
+    in_memory = _measure(json_manager.add_message, user_ids, samples)
+    started = time.perf_counter()
+    await json_manager.flush()
+    json_flush = (time.perf_counter() - started) * 1000
+
+    db_path = os.path.join(workdir, f'history_{users}.db')
+    conn = connect(db_path)
+    with conn:
+        SQLiteWriter._apply(conn, [
+            ('set', 'bench', user_id, [(m['role'], m['content']) for m in user_data['messages']],
+             user_data['last_message_time'], None)
+            for user_id, user_data in seed.items()
+        ])
+    conn.close()
+    sqlite_manager = SQLiteDataManager('bench', db_path=db_path)
+    sqlite = _measure(sqlite_manager.add_message, user_ids, samples)
+    started = time.perf_counter()
+    await sqlite_manager.flush()
+    sqlite_flush = (time.perf_counter() - started) * 1000
+
+    print(f"\n{users} users")
+    for name, latencies in (("legacy json rewrite", legacy), ("JSONDataManager", in_memory),
+                            ("SQLiteDataManager", sqlite)):
+        print(f"  {name:<22} p50={_percentile(latencies, 50):9.3f} ms  "
+              f"p99={_percentile(latencies, 99):9.3f} ms  mean={statistics.mean(latencies):9.3f} ms")
+    print(f"  flush: json={json_flush:.1f} ms (thread), sqlite={sqlite_flush:.1f} ms (writer thread)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--samples', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for users in args.users:
+            asyncio.run(_run(users, args.samples, workdir))
+
+
+if __name__ == '__main__':
+    main()
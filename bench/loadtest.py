@@ -0,0 +1,270 @@
+"""
+Butun botni yuklama ostida o'lchash: soxta Telegram Bot API va uchta soxta
+LLM server (OpenAI, DeepSeek, Gemini) alohida jarayonda ishlaydi, bot esa
+shu jarayonda odatdagidek polling orqali ishga tushiriladi
+(TELEGRAM_API_URL va *_BASE_URL shu serverlarga yo'naltiriladi).
+
+Har bir sintetik foydalanuvchi /start bosadi, provayder tugmasini tanlaydi
+(ChatStates bo'yicha teng taqsimlangan) va `--turns` ta savol beradi; keyingi
+xabar oldingi javob to'liq kelgandan keyin yuboriladi. Natijada updates/s,
+javob kechikishi p50/p95/p99, event loop kechikishi va RSS.
+
+`--workers N` (N >= 1) bilan bot utils.supervisor orqali N ta worker
+jarayonida ishlaydi; loop kechikishi supervisor jarayoniniki, RSS esa
+supervisor va workerlar yig'indisi.
+
+    python -m bench.loadtest --users 300 --turns 3 --ttft 0.3 --chunks 40 --token-rate 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import re
+import resource
+import tempfile
+import time
+from typing import Dict, List
+
+from bench.fake_llm import FakeLLM, start_fake_llm
+from bench.fake_telegram import FakeTelegram, start_fake_telegram
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _rss_mib(pid='self') -> float:
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class LoopLagMonitor:
+    """Har `interval` da uxlab, rejalashtirilgandan qancha kech uyg'onganini yozib boradi"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+# --- soxta serverlar jarayoni ---
+
+async def _user(telegram: FakeTelegram, user_id: int, button: str, args: Dict, results: Dict) -> None:
+    last_token = re.compile(rf"\btoken{args['chunks'] - 1}\b")
+    any_message = lambda method, text: method == "sendMessage"  # noqa: E731
+    answered = lambda method, text: last_token.search(text) is not None  # noqa: E731
+
+    steps = [("/start", any_message, "command"), (button, any_message, "command")]
+    steps += [(f"savol {turn}: {random.random()}", answered, "reply") for turn in range(args['turns'])]
+
+    await asyncio.sleep(random.uniform(0, args['ramp']))
+    for text, predicate, kind in steps:
+        reply = telegram.expect(user_id, predicate)
+        started = time.perf_counter()
+        telegram.push(user_id, text)
+        try:
+            finished = await asyncio.wait_for(reply, args['timeout'])
+        except asyncio.TimeoutError:
+            results['timeouts'] += 1
+            continue
+        results[kind].append(finished - started)
+        await asyncio.sleep(random.uniform(0, 2 * args['think']))
+
+
+async def _serve_async(conn, args: Dict) -> None:
+    loop = asyncio.get_running_loop()
+    telegram = FakeTelegram()
+    runner, telegram_url = await start_fake_telegram(telegram)
+    runners = [runner]
+    llm_urls = []
+    for _ in range(3):
+        fake = FakeLLM(ttft=args['ttft'], chunks=args['chunks'], chunk_delay=1 / args['token_rate'])
+        runner, url = await start_fake_llm(fake)
+        runners.append(runner)
+        llm_urls.append(url)
+    conn.send({"telegram": telegram_url, "openai": llm_urls[0], "deepseek": llm_urls[1], "gemini": llm_urls[2]})
+
+    try:
+        buttons = await loop.run_in_executor(None, conn.recv)
+        await telegram.polling.wait()
+
+        results = {'command': [], 'reply': [], 'timeouts': 0}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _user(telegram, 10_000 + index, buttons[index % len(buttons)], args, results)
+            for index in range(args['users'])
+        ))
+        results['elapsed'] = time.perf_counter() - started
+        results['updates'] = telegram.pushed
+        results['calls'] = dict(telegram.calls)
+        conn.send(results)
+        await loop.run_in_executor(None, conn.recv)  # bot to'xtaguncha serverlar ishlab tursin
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def _serve(conn, args: Dict) -> None:
+    asyncio.run(_serve_async(conn, args))
+
+
+# --- bot jarayoni ---
+
+async def _run_single(conn, buttons: List[str], lag: LoopLagMonitor):
+    loop = asyncio.get_running_loop()
+    import app
+    from loader import bot, dp
+
+    conn.send(buttons)
+    dp.startup.register(app.on_startup)
+    dp.shutdown.register(app.on_shutdown)
+
+    rss_before = _rss_mib()
+    lag.start()
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=1, handle_signals=False))
+    results = await loop.run_in_executor(None, conn.recv)
+    rss_after = _rss_mib()
+    await lag.stop()
+
+    await dp.stop_polling()
+    await polling
+    await app.http_clients.aclose()
+    return results, rss_before, rss_after
+
+
+async def _run_supervised(conn, buttons: List[str], lag: LoopLagMonitor, workers: int):
+    loop = asyncio.get_running_loop()
+    from aiogram import Bot
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from data import config
+    from utils.supervisor import Supervisor
+
+    bot = Bot(token=config.BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL)))
+    supervisor = Supervisor(bot, workers)
+    await supervisor.start()
+    total_rss = lambda: _rss_mib() + sum(_rss_mib(link.process.pid) for link in supervisor.links)  # noqa: E731
+
+    conn.send(buttons)
+    rss_before = total_rss()
+    lag.start()
+    receiver = asyncio.create_task(supervisor.poll(timeout=1))
+    results = await loop.run_in_executor(None, conn.recv)
+    rss_after = total_rss()
+    await lag.stop()
+
+    receiver.cancel()
+    await asyncio.gather(receiver, return_exceptions=True)
+    await supervisor.stop()
+    await bot.session.close()
+    results['per_worker'] = [link.sent for link in supervisor.links]
+    return results, rss_before, rss_after
+
+
+async def main(args) -> None:
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context('spawn')
+    conn, child_conn = context.Pipe()
+    process = context.Process(target=_serve, args=(child_conn, vars(args)), daemon=True)
+    process.start()
+    urls = await loop.run_in_executor(None, conn.recv)
+
+    os.environ.update({
+        "TELEGRAM_API_URL": urls["telegram"],
+        "OPENAI_BASE_URL": f"{urls['openai']}/v1",
+        "DEEPSEEK_BASE_URL": f"{urls['deepseek']}/v1",
+        "GEMINI_BASE_URL": urls["gemini"],
+        "METRICS_PORT": "0",
+    })
+    # Har bir foydalanuvchi --turns ta savol beradi: provayder limitlari o'lchovga xalaqit bermasin
+    os.environ.setdefault("CHAT_RATE_LIMIT", "100000")
+    # Chat tarixi fayllari vaqtinchalik katalogda
+    os.chdir(tempfile.mkdtemp(prefix='bench-loadtest-'))
+
+    from data.config import PROVIDERS
+    buttons = [options["button"] for options in PROVIDERS.values()]
+    lag = LoopLagMonitor()
+    if args.workers:
+        results, rss_before, rss_after = await _run_supervised(conn, buttons, lag, args.workers)
+    else:
+        results, rss_before, rss_after = await _run_single(conn, buttons, lag)
+    conn.send("stop")
+    process.join(timeout=10)
+    reply = [value * 1000 for value in results['reply']]
+    command = [value * 1000 for value in results['command']]
+    lag_ms = [value * 1000 for value in lag.samples]
+    if args.json:
+        print(json.dumps({
+            "workers": args.workers,
+            "updates_per_s": results['updates'] / results['elapsed'],
+            "timeouts": results['timeouts'],
+            "reply_p50_ms": _percentile(reply, 50),
+            "reply_p95_ms": _percentile(reply, 95),
+            "command_p50_ms": _percentile(command, 50),
+            "command_p95_ms": _percentile(command, 95),
+            "loop_lag_max_ms": max(lag_ms, default=0),
+            "rss_mib": rss_after,
+        }))
+        return
+    print(f"{args.users} users x {args.turns} turns, ttft={args.ttft}s, "
+          f"{args.chunks} chunks @ {args.token_rate:g} tok/s, think={args.think}s")
+    print(f"  throughput   {results['updates'] / results['elapsed']:8.1f} updates/s "
+          f"({results['updates']} updates in {results['elapsed']:.1f}s, {results['timeouts']} timeouts)")
+    print(f"  reply ms     p50={_percentile(reply, 50):7.0f} p95={_percentile(reply, 95):7.0f} "
+          f"p99={_percentile(reply, 99):7.0f} (n={len(reply)})")
+    print(f"  command ms   p50={_percentile(command, 50):7.1f} p95={_percentile(command, 95):7.1f} "
+          f"p99={_percentile(command, 99):7.1f}")
+    print(f"  loop lag ms  p50={_percentile(lag_ms, 50):7.2f} p99={_percentile(lag_ms, 99):7.2f} "
+          f"max={max(lag_ms, default=0):7.2f}")
+    print(f"  RSS MiB      start={rss_before:.1f} end={rss_after:.1f} "
+          f"peak={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}")
+    print(f"  Bot API calls: {results['calls']}")
+    if 'per_worker' in results:
+        print(f"  updates per worker: {results['per_worker']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=3, help="questions per user (Gemini allows 10/min)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="fake LLM time to first token, seconds")
+    parser.add_argument("--chunks", type=int, default=40, help="streamed chunks per answer")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="chunks per second after the first")
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between a reply and the next message")
+    parser.add_argument("--ramp", type=float, default=5.0, help="users start uniformly within this many seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="a reply not finished by then is a timeout")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run the bot under utils.supervisor with this many workers (0 - single process)")
+    parser.add_argument("--json", action="store_true", help="print a single JSON summary line")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
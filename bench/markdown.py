@@ -0,0 +1,117 @@
+"""
+markdown_to_html tezligini solishtirish: eski `while '**' in text: replace(..., 1)`
+usuli va bir o'tishli MarkdownStream, 4-32 KB li LLM javoblarida.
+
+stream - javob 16 belgilik bo'laklarda keladi va har `--snapshot-every`
+bo'lakda xabar yangilanadi: eski usulda har safar butun matn qaytadan
+o'giriladi, MarkdownStream esa faqat yangi qatorlarni qayta ishlaydi.
+
+    python -m bench.markdown --sizes 4 8 16 32 --repeat 20
+"""
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from utils.misc.markdown import MarkdownStream, markdown_to_html
+
+WORDS = ("python", "funksiya", "ro'yxat", "server", "so'rov", "javob", "model", "ma'lumot",
+         "database", "token", "xatolik", "natija", "kod", "test", "vaqt", "foydalanuvchi")
+
+
+def _legacy_markdown_to_html(text: str) -> str:
+    # Oldingi utils.misc.markdown.markdown_to_html
+    text = text.replace('<', '&lt;').replace('>', '&gt;')
+    lines = []
+    for line in text.split('\n'):
+        if line.startswith('# '):
+            line = f"<b>{line[2:]}</b>"
+        elif line.startswith('## '):
+            line = f"<b>{line[3:]}</b>"
+        lines.append(line)
+    text = '\n'.join(lines)
+    text = text.replace('\n* ', '\n• ')
+    text = text.replace('\n- ', '\n• ')
+    while '**' in text:
+        text = text.replace('**', '<b>', 1)
+        text = text.replace('**', '</b>', 1)
+    while '__' in text:
+        text = text.replace('__', '<i>', 1)
+        text = text.replace('__', '</i>', 1)
+    while '`' in text:
+        text = text.replace('`', '<code>', 1)
+        text = text.replace('`', '</code>', 1)
+    return text
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 16))]
+    for _ in range(rng.randint(0, 2)):
+        index = rng.randrange(len(words))
+        words[index] = rng.choice(("**{}**", "*{}*", "`{}`", "[{}](https://example.com)")).format(words[index])
+    return ' '.join(words).capitalize() + '.'
+
+
+def _response(rng: random.Random, size: int) -> str:
+    """Taxminan `size` belgilik, LLM uslubidagi markdown javob"""
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.1:
+            block = f"## {_sentence(rng)}"
+        elif kind < 0.35:
+            block = '\n'.join(f"- {_sentence(rng)}" for _ in range(rng.randint(2, 6)))
+        elif kind < 0.5:
+            code = '\n'.join(f"    result = {rng.choice(WORDS)}(x < {i}) & mask" for i in range(rng.randint(3, 12)))
+            block = f"```python\ndef f(x):\n{code}\n```"
+        else:
+            block = ' '.join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+        parts.append(block)
+        length += len(block) + 2
+    return '\n\n'.join(parts)
+
+
+def _time(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def _stream_legacy(text: str, chunk: int, every: int) -> None:
+    for index, end in enumerate(range(chunk, len(text) + chunk, chunk), 1):
+        if index % every == 0 or end >= len(text):
+            _legacy_markdown_to_html(text[:end])
+
+
+def _stream_incremental(text: str, chunk: int, every: int) -> None:
+    stream = MarkdownStream()
+    for index, start in enumerate(range(0, len(text), chunk), 1):
+        stream.feed(text[start:start + chunk])
+        if index % every == 0 or start + chunk >= len(text):
+            stream.html()
+
+
+def main(args) -> None:
+    rng = random.Random(42)
+    print(f"{'size':>6} | {'legacy ms':>10} {'single-pass ms':>15} | "
+          f"{'stream legacy ms':>17} {'stream incremental ms':>22}")
+    for size in args.sizes:
+        text = _response(rng, size * 1024)
+        # Eski usul toq belgilarda muvozanatsiz teglar beradi; bu yerda faqat tezlik o'lchanadi
+        legacy = _time(lambda: _legacy_markdown_to_html(text), args.repeat)
+        single = _time(lambda: markdown_to_html(text), args.repeat)
+        stream_legacy = _time(lambda: _stream_legacy(text, 16, args.snapshot_every), max(1, args.repeat // 5))
+        stream_new = _time(lambda: _stream_incremental(text, 16, args.snapshot_every), max(1, args.repeat // 5))
+        print(f"{size:>4}KB | {legacy:10.2f} {single:15.2f} | {stream_legacy:17.2f} {stream_new:22.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs='+', default=[4, 8, 16, 32], help="response sizes, KB")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--snapshot-every", type=int, default=8, help="chunks between message edits")
+    main(parser.parse_args())
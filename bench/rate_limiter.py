@@ -0,0 +1,69 @@
+"""
+SlidingWindowLimiter mikrobenchmarki: bitta tekshiruv narxi va xotira,
+eski `defaultdict(list)` + datetime ro'yxatini qayta qurish usuli bilan solishtirib.
+
+    python -m bench.rate_limiter --keys 100000 --checks 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+from utils.misc.rate_limiter import SlidingWindowLimiter
+
+
+class LegacyLimiter:
+    """Oldingi gemini_chat.rate_limit dekoratoridagi mantiq"""
+
+    def __init__(self, limit: int, period: int):
+        self.limit = limit
+        self.period = period
+        self.requests = defaultdict(list)
+
+    def hit(self, key) -> float:
+        current_time = datetime.now()
+        self.requests[key] = [
+            req_time for req_time in self.requests[key]
+            if (current_time - req_time).seconds < self.period
+        ]
+        if len(self.requests[key]) >= self.limit:
+            return 1.0
+        self.requests[key].append(current_time)
+        return 0.0
+
+
+def _run(name: str, factory, keys: int, checks: int) -> None:
+    ids = [random.randrange(keys) for _ in range(checks)]
+
+    limiter = factory()
+    started = time.perf_counter()
+    for key in ids:
+        limiter.hit(key)
+    elapsed = time.perf_counter() - started
+
+    # Xotira alohida o'lchanadi: tracemalloc vaqt o'lchoviga ta'sir qilmasin
+    tracemalloc.start()
+    limiter = factory()
+    for key in ids:
+        limiter.hit(key)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<22} {elapsed / checks * 1e9:8.0f} ns/check  {current / 1024 / 1024:8.1f} MiB retained")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    _run("legacy list rebuild", lambda: LegacyLimiter(args.limit, 60), args.keys, args.checks)
+    _run("SlidingWindowLimiter", lambda: SlidingWindowLimiter(args.limit, 60, max_keys=args.keys),
+         args.keys, args.checks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Ishga tushish vaqti: `python -X importtime -c "import app"` alohida jarayonda
+bir necha marta ishga tushiriladi va eng yaxshi natija bo'yicha `app`
+importining umumiy vaqti, eng qimmat paketlar (o'z vaqtlari yig'indisi
+bo'yicha) hamda ishga tushishda yuklanmasligi kerak bo'lgan modullar
+(standart: openai - SDK birinchi so'rovda yuklanadi) ko'rsatiladi.
+
+`--budget-ms` yoki taqiqlangan modul import qilinsa, skript 1 kodi bilan
+tugaydi - CI da regressiyani ushlash uchun.
+
+    python -m bench.startup --repeat 5 --top 15
+    python -m bench.startup --disable gemini deepseek --budget-ms 6000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(env: Dict[str, str], cwd: str) -> Tuple[float, List[Tuple[int, int, int, str]]]:
+    """Bitta o'lchov: jarayonning to'liq vaqti (ms) va importtime qatorlari (self, cumulative, depth, name)"""
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            env=env, cwd=cwd, capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if output.returncode != 0:
+        sys.exit(f"import app failed:\n{output.stderr[-3000:]}")
+    rows = []
+    for line in output.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return wall, rows
+
+
+def main(args) -> None:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_ROOT, os.environ.get("PYTHONPATH")])))
+    for name in args.disable:
+        env[f"{name.upper()}_API_KEY"] = ""
+    # Chat tarixi fayllari yuklanmasligi uchun bo'sh katalogda
+    cwd = tempfile.mkdtemp(prefix='bench-startup-')
+
+    runs = [_run(env, cwd) for _ in range(args.repeat)]
+    app_ms = [next(cumulative for _, cumulative, _, name in rows if name == 'app') / 1000 for _, rows in runs]
+    best = min(range(len(runs)), key=lambda index: app_ms[index])
+    wall, rows = runs[best]
+
+    packages: Dict[str, int] = defaultdict(int)
+    for self_us, _, _, name in rows:
+        packages[name.split('.')[0]] += self_us
+    imported = {name for _, _, _, name in rows}
+    forbidden = [name for name in args.forbid if name in imported]
+
+    print(f"import app: best {app_ms[best]:.0f} ms, median {sorted(app_ms)[len(app_ms) // 2]:.0f} ms "
+          f"(process wall {wall:.0f} ms, {len(rows)} modules, {args.repeat} runs)")
+    if args.disable:
+        print(f"disabled providers: {', '.join(args.disable)}")
+    print(f"\n{'package':<28} {'self ms':>9}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<28} {self_us / 1000:9.1f}")
+    print(f"\nnot imported at startup: "
+          f"{', '.join(name for name in args.forbid if name not in imported) or '-'}")
+
+    failed = False
+    if forbidden:
+        print(f"FAIL: imported at startup: {', '.join(forbidden)}")
+        failed = True
+    if args.budget_ms and app_ms[best] > args.budget_ms:
+        print(f"FAIL: import app took {app_ms[best]:.0f} ms > budget {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--disable", nargs='*', default=[], help="providers started without an API key")
+    parser.add_argument("--forbid", nargs='*', default=["openai"], help="modules that must not load at startup")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail if `import app` is slower (0 - off)")
+    main(parser.parse_args())
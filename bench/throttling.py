@@ -0,0 +1,58 @@
+"""
+ThrottleManager yuklama testi: sekundiga nechta tekshiruv bajarilishi.
+
+    python -m bench.throttling                       # jarayon ichidagi fallback
+    python -m bench.throttling --fakeredis           # fakeredis (lupa bilan) ustida Lua skript
+    python -m bench.throttling --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from middlewares.throttling import ThrottleManager, Throttled
+
+
+async def _worker(manager: ThrottleManager, users: int, checks: int, counters: dict) -> None:
+    for _ in range(checks):
+        user_id = random.randrange(users)
+        try:
+            await manager.throttle("bench", rate=0.5, user_id=user_id, chat_id=user_id)
+            counters["allowed"] += 1
+        except Throttled:
+            counters["throttled"] += 1
+
+
+async def _run(redis, users: int, concurrency: int, checks: int, label: str) -> None:
+    manager = ThrottleManager(redis=redis, burst=3)
+    counters = {"allowed": 0, "throttled": 0}
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(manager, users, checks // concurrency, counters) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    total = counters["allowed"] + counters["throttled"]
+    print(f"{label:<12} {total / elapsed:12.0f} checks/s  "
+          f"allowed={counters['allowed']} throttled={counters['throttled']} ({elapsed:.2f} s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--checks", type=int, default=100000)
+    parser.add_argument("--fakeredis", action="store_true")
+    parser.add_argument("--redis-url")
+    args = parser.parse_args()
+
+    redis, label = None, "in-process"
+    if args.fakeredis:
+        from fakeredis import FakeAsyncRedis
+        redis, label = FakeAsyncRedis(), "fakeredis"
+    elif args.redis_url:
+        from redis.asyncio import Redis
+        redis, label = Redis.from_url(args.redis_url), "redis"
+
+    asyncio.run(_run(redis, args.users, args.concurrency, args.checks, label))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Provayder HTTP klientlarini soxta LLM serverda solishtirish: har bir provayder
+o'z standart klienti bilan (oldingi holat) va HTTPClientFactory ning umumiy
+ulanishlar puli (limitlar, timeoutlar, jitterli qayta urinishlar) bilan.
+
+200 ta parallel suhbat, har biri bir necha navbatdan iborat; natijada
+throughput, TTFT va to'liq javob vaqtining p50/p95/p99 qiymatlari.
+
+    python -m bench.upstream_pool --conversations 200 --turns 3 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from bench.fake_llm import FakeLLM, start_fake_llm
+from providers import HTTPClientFactory, build_provider
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _conversation(provider, turns: int, results: Dict[str, list]) -> None:
+    messages = [{"role": "system", "content": "You are a helpful assistant."}]
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"savol {turn}"})
+        started = time.perf_counter()
+        first = None
+        parts = []
+        try:
+            async for chunk in provider.stream(messages):
+                if first is None:
+                    first = time.perf_counter() - started
+                parts.append(chunk)
+        except Exception as e:
+            results['errors'].append(type(e).__name__)
+            continue
+        results['ttft'].append(first * 1000)
+        results['total'].append((time.perf_counter() - started) * 1000)
+        messages.append({"role": "assistant", "content": ''.join(parts)})
+
+
+async def _run(name: str, providers: list, args) -> None:
+    results = {'ttft': [], 'total': [], 'errors': []}
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _conversation(providers[index % len(providers)], args.turns, results)
+        for index in range(args.conversations)
+    ))
+    elapsed = time.perf_counter() - started
+    errors = {kind: results['errors'].count(kind) for kind in set(results['errors'])}
+    print(f"{name:<16} {len(results['total']) / elapsed:7.1f} turns/s | "
+          f"TTFT ms p50={_percentile(results['ttft'], 50):6.0f} p95={_percentile(results['ttft'], 95):6.0f} "
+          f"p99={_percentile(results['ttft'], 99):6.0f} | total ms p50={_percentile(results['total'], 50):6.0f} "
+          f"p95={_percentile(results['total'], 95):6.0f} p99={_percentile(results['total'], 99):6.0f} | "
+          f"errors={errors or 0}")
+
+
+async def main(args) -> None:
+    # Har bir provayder alohida upstream (real holatdagidek har biri o'z hostida)
+    fakes, runners, base_urls = [], [], []
+    for _ in range(3):
+        fake = FakeLLM(ttft=args.ttft, chunks=args.chunks, chunk_delay=args.chunk_delay,
+                       error_rate=args.error_rate, max_streams=args.max_streams)
+        runner, base_url = await start_fake_llm(fake)
+        fakes.append(fake)
+        runners.append(runner)
+        base_urls.append(base_url)
+    options = {
+        "openai": {"kind": "openai", "api_key": "test", "model": "gpt-bench", "base_url": f"{base_urls[0]}/v1"},
+        "deepseek": {"kind": "openai", "api_key": "test", "model": "deepseek-bench", "base_url": f"{base_urls[1]}/v1"},
+        "gemini": {"kind": "gemini", "api_key": "test", "model": "gemini-bench", "base_url": base_urls[2]},
+    }
+    try:
+        # Oldingi holat: har bir provayder o'z klienti va standart sozlamalari bilan
+        # (Gemini uchun ham REST klienti - SDK ni soxta serverga yo'naltirib bo'lmaydi)
+        providers = [build_provider(name, opts) for name, opts in options.items()]
+        await _run("default clients", providers, args)
+        for provider in providers:
+            await provider.close()
+
+        http_clients = HTTPClientFactory(
+            max_connections=args.max_connections, max_keepalive=args.max_connections,
+            retries=args.retries, backoff=args.backoff,
+        )
+        providers = [build_provider(name, opts, http_clients=http_clients) for name, opts in options.items()]
+        await _run("shared pool", providers, args)
+        await http_clients.aclose()
+        print(f"servers: {sum(fake.requests for fake in fakes)} requests, "
+              f"{sum(fake.errors for fake in fakes)} rejected")
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-delay", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--max-streams", type=int, default=0, help="server returns 429 above this")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--backoff", type=float, default=0.2)
+    asyncio.run(main(parser.parse_args()))
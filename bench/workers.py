@@ -0,0 +1,47 @@
+"""
+Ko'p jarayonli rejim o'tkazuvchanligini solishtirish: bench.loadtest bitta
+jarayonda (workers=0) va utils.supervisor orqali 1, 2, 4, 8 ta worker bilan
+alohida jarayonlarda ketma-ket ishga tushiriladi.
+
+Eslatma: provayder limitlari (masalan, GEMINI_MAX_CONCURRENCY) har bir
+workerda alohida, shuning uchun ular bu yerda yuqori qilib qo'yiladi - aks
+holda natija CPU emas, limitlar bilan o'lchanadi. Workerlar soni CPU
+yadrolaridan oshsa, qo'shimcha jarayonlar faqat IPC va xotira narxini oshiradi.
+
+    python -m bench.workers --workers 0 1 2 4 8 -- --users 300 --chunks 200 --token-rate 400
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+def main(args, loadtest_args) -> None:
+    env = dict(os.environ, GEMINI_MAX_CONCURRENCY="1000", PROVIDER_MAX_CONCURRENCY="1000")
+    print(f"CPU cores: {os.cpu_count()}, loadtest args: {' '.join(loadtest_args) or '(defaults)'}")
+    print(f"{'workers':>7} | {'updates/s':>9} {'timeouts':>8} | {'reply p50':>9} {'p95':>7} | "
+          f"{'cmd p50':>7} {'p95':>7} | {'lag max':>7} {'RSS MiB':>8}")
+    for workers in args.workers:
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.loadtest", "--json", "--workers", str(workers), *loadtest_args],
+            env=env, capture_output=True, text=True,
+        )
+        lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+        if output.returncode != 0 or not lines:
+            print(f"{workers:>7} | failed (exit code {output.returncode})\n{output.stderr[-2000:]}")
+            continue
+        result = json.loads(lines[-1])
+        print(f"{workers or 'single':>7} | {result['updates_per_s']:9.1f} {result['timeouts']:8d} | "
+              f"{result['reply_p50_ms']:9.0f} {result['reply_p95_ms']:7.0f} | "
+              f"{result['command_p50_ms']:7.1f} {result['command_p95_ms']:7.1f} | "
+              f"{result['loop_lag_max_ms']:7.1f} {result['rss_mib']:8.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs='+', default=[0, 1, 2, 4, 8],
+                        help="worker counts to compare (0 - single process without supervisor)")
+    argv = sys.argv[1:]
+    split = argv.index('--') if '--' in argv else len(argv)
+    main(parser.parse_args(argv[:split]), argv[split + 1:])
@@ -1,3 +1,5 @@
+import os
+
 from environs import Env
 
 # environs kutubxonasidan foydalanish
@@ -9,9 +11,156 @@ BOT_TOKEN = env.str("BOT_TOKEN")  # Bot toekn
 ADMINS = env.list("ADMINS")  # adminlar ro'yxati
 IP = env.str("ip")  # Xosting ip manzili
 
-OPENAI_API_KEY = env.str("OPENAI_API_KEY")
-OPENAI_MODEL = env.str("OPENAI_MODEL")
-GEMINI_API_KEY = env.str("GEMINI_API_KEY")
-GEMINI_MODEL = env.str("GEMINI_MODEL")
-DEEPSEEK_API_KEY = env.str("DEEPSEEK_API_KEY")
-DEEPSEEK_MODEL = env.str("DEEPSEEK_MODEL")
+# Bot API server manzili (masalan, local Bot API server yoki bench.loadtest dagi soxta server)
+TELEGRAM_API_URL = env.str("TELEGRAM_API_URL", None)
+
+# Ishga tushirish rejimi: polling yoki webhook
+BOT_MODE = env.str("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = env.str("WEBHOOK_BASE_URL", None)  # masalan: https://bot.example.com
+WEBHOOK_PATH = env.str("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = env.str("WEBHOOK_SECRET", None)
+WEBAPP_HOST = env.str("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = env.int("WEBAPP_PORT", 8080)
+WEBHOOK_WORKERS = env.int("WEBHOOK_WORKERS", 16)  # updatelarni parallel qayta ishlovchi workerlar
+WEBHOOK_QUEUE_SIZE = env.int("WEBHOOK_QUEUE_SIZE", 1000)
+
+# Ko'p jarayonli rejim (python -m utils.supervisor): updatelar foydalanuvchi ID si bo'yicha workerlarga taqsimlanadi
+WORKERS = env.int("WORKERS", 1) or os.cpu_count() or 1  # 0 - CPU yadrolari soni
+WORKER_INDEX = env.int("WORKER_INDEX", None)  # supervisor har bir worker jarayoni uchun o'zi o'rnatadi
+
+REDIS_URL = env.str("REDIS_URL", None)  # masalan: redis://localhost:6379/0 (bo'lmasa jarayon ichidagi fallback)
+FSM_STORAGE = env.str("FSM_STORAGE", "memory")  # memory | redis | sqlite
+FSM_SQLITE_PATH = env.str("FSM_SQLITE_PATH", "data/fsm.db")
+FSM_STATE_TTL = env.int("FSM_STATE_TTL", 7 * 24 * 3600)  # shuncha sekund faol bo'lmagan holatlar o'chadi
+THROTTLE_RATE = env.float("THROTTLE_RATE", 0.5)  # bitta foydalanuvchi xabarlari orasidagi minimal vaqt (sekund)
+THROTTLE_BURST = env.int("THROTTLE_BURST", 3)  # ketma-ket ruxsat etilgan xabarlar soni
+# Provayderga yuboriladigan so'rovlar: CHAT_RATE_PERIOD sekundda CHAT_RATE_LIMIT ta (provayder o'zinikini berishi mumkin)
+CHAT_RATE_LIMIT = (env.int("CHAT_RATE_LIMIT", 10), env.int("CHAT_RATE_PERIOD", 60))
+
+# Kaliti berilmagan provayder o'chiriladi (PROVIDERS ga qarang)
+OPENAI_API_KEY = env.str("OPENAI_API_KEY", None)
+OPENAI_MODEL = env.str("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = env.str("OPENAI_BASE_URL", None)  # berilmasa https://api.openai.com/v1
+GEMINI_API_KEY = env.str("GEMINI_API_KEY", None)
+GEMINI_MODEL = env.str("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_BASE_URL = env.str("GEMINI_BASE_URL", None)  # berilmasa https://generativelanguage.googleapis.com
+GEMINI_MAX_CONCURRENCY = env.int("GEMINI_MAX_CONCURRENCY", 8)  # bir vaqtdagi Gemini so'rovlari
+DEEPSEEK_API_KEY = env.str("DEEPSEEK_API_KEY", None)
+DEEPSEEK_MODEL = env.str("DEEPSEEK_MODEL", "deepseek-chat")
+DEEPSEEK_BASE_URL = env.str("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+
+# Bitta provayderga bir vaqtda yuboriladigan so'rovlar soni (provayder o'zinikini berishi mumkin)
+PROVIDER_MAX_CONCURRENCY = env.int("PROVIDER_MAX_CONCURRENCY", 32)
+# Javob tugamay turib kelgan xabarlar: merge - keyingi navbatga birlashtirish, drop - rad etish
+CHAT_BUSY_POLICY = env.str("CHAT_BUSY_POLICY", "merge")
+# merge siyosatida birlashtiriladigan xabarlar soni (oshganda eng eskilari tashlanadi)
+CHAT_QUEUE_LIMIT = env.int("CHAT_QUEUE_LIMIT", 5)
+
+# Provayderga yuboriladigan kontekst (sistema xabari + tarix) uchun standart token byudjeti
+CONTEXT_TOKEN_BUDGET = env.int("CONTEXT_TOKEN_BUDGET", 3000)
+
+# Chat provayderlari: yangi model qo'shish uchun shu yerga yozuv qo'shish kifoya.
+# kind - "openai" (OpenAI bilan mos API) yoki "gemini"
+# context_tokens - model uchun kontekst byudjeti (berilmasa CONTEXT_TOKEN_BUDGET)
+# markdown - javob Markdown sifatida ko'rsatiladimi (standart True); system_prompt bunga mos bo'lishi kerak
+PROVIDERS = {
+    "openai": {
+        "kind": "openai",
+        "button": "🧠 ChatGPT (OpenAI)",
+        "intro": "OpenAI model orqali javob beriladi!\nSavolingizni yuboring",
+        "api_key": OPENAI_API_KEY,
+        "model": OPENAI_MODEL,
+        "base_url": OPENAI_BASE_URL,
+    },
+    "gemini": {
+        "kind": "gemini",
+        "button": "🔮 Gemini (Google)",
+        "intro": "Google Gemini AI model orqali javob beriladi!\nSavolingizni yuboring",
+        "api_key": GEMINI_API_KEY,
+        "model": GEMINI_MODEL,
+        "base_url": GEMINI_BASE_URL,
+        "system_prompt": (
+            "Format answers with simple Markdown: **bold**, *italic*, `inline code`, "
+            "fenced code blocks and '-' bullet lists. Do not use tables or HTML. "
+            "If the question is in Uzbek, answer in Uzbek."
+        ),
+        "max_tokens": None,  # javob uzunligi cheklanmagan
+        "max_concurrency": GEMINI_MAX_CONCURRENCY,
+        "rate_limit": (10, 60),  # 60 sekundda 10 ta so'rov
+    },
+    "deepseek": {
+        "kind": "openai",
+        "button": "🚀 DeepSeek AI",
+        "intro": "DeepSeek AI model orqali javob beriladi!\nSavolingizni yuboring",
+        "api_key": DEEPSEEK_API_KEY,
+        "model": DEEPSEEK_MODEL,
+        "base_url": DEEPSEEK_BASE_URL,
+    },
+}
+# Kaliti yo'q provayderlar uchun tugma, handler, tarix va klient umuman yaratilmaydi
+PROVIDERS = {name: options for name, options in PROVIDERS.items() if options.get("api_key")}
+
+# Provayderlarga HTTP ulanishlar puli (har bir upstream host uchun bitta klient)
+HTTP_MAX_CONNECTIONS = env.int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = env.int("HTTP_MAX_KEEPALIVE", 50)  # PROVIDER_MAX_CONCURRENCY dan kam bo'lmasin
+HTTP_KEEPALIVE_EXPIRY = env.float("HTTP_KEEPALIVE_EXPIRY", 30.0)
+HTTP_CONNECT_TIMEOUT = env.float("HTTP_CONNECT_TIMEOUT", 5.0)
+HTTP_FIRST_BYTE_TIMEOUT = env.float("HTTP_FIRST_BYTE_TIMEOUT", 60.0)  # birinchi bo'lakkacha
+HTTP_READ_TIMEOUT = env.float("HTTP_READ_TIMEOUT", 30.0)  # stream bo'laklari orasida
+HTTP_RETRIES = env.int("HTTP_RETRIES", 2)  # 429/5xx va ulanish xatolarida
+HTTP_RETRY_BACKOFF = env.float("HTTP_RETRY_BACKOFF", 0.5)
+HTTP2 = env.bool("HTTP2", False)  # httpx[http2] (h2 paketi) kerak
+
+# Provayderlar orasida yo'naltirish: off | failover | hedge
+# (provayder yozuvidagi "fallbacks" ro'yxati berilmasa, qolgan barcha provayderlar zaxira)
+ROUTING_MODE = env.str("ROUTING_MODE", "off")
+CIRCUIT_FAILURE_THRESHOLD = env.int("CIRCUIT_FAILURE_THRESHOLD", 5)  # ketma-ket xatoliklar
+CIRCUIT_ERROR_RATE = env.float("CIRCUIT_ERROR_RATE", 0.5)  # oxirgi so'rovlardagi xatoliklar ulushi
+CIRCUIT_COOLDOWN = env.float("CIRCUIT_COOLDOWN", 30.0)  # sekund
+HEDGE_DELAY = env.float("HEDGE_DELAY", 2.0)  # p95 TTFT hali ma'lum bo'lmaganda
+
+# Takroriy birinchi savollar uchun javoblar keshi (ixtiyoriy)
+RESPONSE_CACHE = env.bool("RESPONSE_CACHE", False)
+RESPONSE_CACHE_SIZE = env.int("RESPONSE_CACHE_SIZE", 1000)  # xotiradagi yozuvlar soni
+RESPONSE_CACHE_TTL = env.float("RESPONSE_CACHE_TTL", 3600.0)  # sekund
+RESPONSE_CACHE_TIER = env.str("RESPONSE_CACHE_TIER", "")  # "" | redis | sqlite
+RESPONSE_CACHE_PATH = env.str("RESPONSE_CACHE_PATH", "data/chat_story/response_cache.db")
+
+# Streaming javoblarda bitta chatdagi xabar tahrirlari orasidagi minimal vaqt (sekund)
+STREAM_EDIT_INTERVAL = env.float("STREAM_EDIT_INTERVAL", 1.0)
+
+# Prometheus metrikalari (ixtiyoriy): METRICS_PORT=0 bo'lsa /metrics server ishga tushirilmaydi.
+# Server autentifikatsiyasiz, shuning uchun standart holatda o'chiq
+METRICS_ENABLED = env.bool("METRICS_ENABLED", False)
+METRICS_HOST = env.str("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = env.int("METRICS_PORT", 9100)
+
+# Event loop bloklanishini aniqlash: kechikish LOOP_WATCHDOG_THRESHOLD dan oshsa stack logga yoziladi
+LOOP_WATCHDOG = env.bool("LOOP_WATCHDOG", False)
+LOOP_WATCHDOG_THRESHOLD = env.float("LOOP_WATCHDOG_THRESHOLD", 0.1)  # sekund
+LOOP_WATCHDOG_INTERVAL = env.float("LOOP_WATCHDOG_INTERVAL", 0.05)  # heartbeat oralig'i, sekund
+
+# Chat tarixini diskka yozish sozlamalari
+HISTORY_FLUSH_INTERVAL = env.float("HISTORY_FLUSH_INTERVAL", 5.0)  # sekund
+HISTORY_FLUSH_MAX_DIRTY = env.int("HISTORY_FLUSH_MAX_DIRTY", 100)  # shuncha foydalanuvchi o'zgarsa darhol yoziladi
+HISTORY_STORAGE = env.str("HISTORY_STORAGE", "json")  # json | sharded | log | sqlite
+HISTORY_DB_PATH = env.str("HISTORY_DB_PATH", "data/chat_story/history.db")
+HISTORY_MAX_MESSAGES = env.int("HISTORY_MAX_MESSAGES", 20)  # har bir foydalanuvchi uchun saqlanadigan xabarlar
+# Byudjetga sig'magan eski xabarlarni qisqacha xulosaga aylantirib saqlash
+HISTORY_SUMMARY = env.bool("HISTORY_SUMMARY", False)
+HISTORY_SUMMARY_TOKENS = env.int("HISTORY_SUMMARY_TOKENS", 300)
+# Shuncha sekund yozmagan foydalanuvchilar xotira va storage dan chiqariladi
+# (0 - hech kim o'chirilmaydi; ixtiyoriy, masalan 30 kun uchun 2592000)
+HISTORY_TTL = env.float("HISTORY_TTL", 0)
+HISTORY_JANITOR_INTERVAL = env.float("HISTORY_JANITOR_INTERVAL", 3600.0)  # tekshiruvlar oralig'i, sekund
+# Chiqarilganlar tarixi kunlik gzip JSONL arxivga yoziladi va qaytganda tiklanadi (False - butunlay o'chadi)
+HISTORY_ARCHIVE = env.bool("HISTORY_ARCHIVE", True)
+HISTORY_ARCHIVE_DIR = env.str("HISTORY_ARCHIVE_DIR", "data/chat_story/archive")
+
+# Ommaviy xabar (/broadcast) va adminlarga xabarnomalar: Telegram ~30 xabar/sekund ruxsat beradi,
+# zaxira chat trafigi uchun qoldiriladi (chat javoblari ham shu limitdan token oladi)
+BROADCAST_RATE = env.float("BROADCAST_RATE", 25.0)  # xabar/sekund, butun bot uchun
+BROADCAST_CHAT_INTERVAL = env.float("BROADCAST_CHAT_INTERVAL", 1.0)  # bitta chatga yuborishlar orasida, sekund
+BROADCAST_CONCURRENCY = env.int("BROADCAST_CONCURRENCY", 8)  # parallel yuborishlar
+BROADCAST_RETRIES = env.int("BROADCAST_RETRIES", 3)  # RetryAfter va tarmoq xatolarida
+BROADCAST_STATE_DIR = env.str("BROADCAST_STATE_DIR", "data/broadcast")  # progress, davom ettirish uchun
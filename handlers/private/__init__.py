@@ -1,5 +1,4 @@
 from . import help
 from . import start
-from . import openai_chat
-from . import gemini_chat
-from . import deep_seek_chat
+from . import broadcast
+from . import chat
@@ -0,0 +1,72 @@
+from aiogram import F, types
+from aiogram.filters import Command, CommandObject
+
+from data import config
+from data.config import ADMINS
+from loader import broadcaster, data_managers, dp
+from utils.broadcast import combined_summary, known_user_ids
+from utils.misc import rate_limit
+from utils.supervisor import owns_user
+
+admin_only = F.from_user.id.in_({int(admin) for admin in ADMINS})
+multi_worker = config.WORKER_INDEX is not None
+# Ko'p jarayonli rejimda buyruq barcha workerlarga keladi: Redis dagi umumiy
+# throttling bucketi bitta buyruqni bir necha marta hisoblamasligi uchun kalit har bir workerga alohida
+throttling_key = f"broadcast_w{config.WORKER_INDEX}" if multi_worker else "broadcast"
+
+
+def replies_here(message: types.Message) -> bool:
+    """Ko'p jarayonli rejimda adminga faqat uning o'z workeri javob beradi"""
+    return not multi_worker or owns_user(config.WORKER_INDEX, config.WORKERS, str(message.from_user.id))
+
+
+@dp.message(Command('broadcast'), admin_only)
+@rate_limit(config.THROTTLE_RATE, key=throttling_key)
+async def broadcast_start(message: types.Message, command: CommandObject):
+    """/broadcast <matn> yoki xabarga javoban /broadcast - shu xabar nusxasi yuboriladi"""
+    if broadcaster.running:
+        if replies_here(message):
+            await message.answer("Boshqa broadcast davom etmoqda:\n" + broadcaster.job.summary())
+        return
+    reply = message.reply_to_message
+    if reply is None and not command.args:
+        if replies_here(message):
+            await message.answer("Foydalanish: /broadcast matn yoki yuboriladigan xabarga javoban /broadcast")
+        return
+    # Ko'p jarayonli rejimda - faqat shu workerning foydalanuvchilari
+    recipients = known_user_ids(data_managers.values())
+    if reply is not None:
+        job = await broadcaster.start(recipients, copy_from=(message.chat.id, reply.message_id))
+    else:
+        job = await broadcaster.start(recipients, text=command.args)
+    if not replies_here(message):
+        return
+    if multi_worker:
+        await message.answer(f"Broadcast {config.WORKERS} ta workerda boshlandi\n"
+                             f"/broadcast_status - holati, /broadcast_cancel - to'xtatish")
+    else:
+        await message.answer(f"Broadcast {job.id} boshlandi: {job.total} ta foydalanuvchi\n"
+                             f"/broadcast_status - holati, /broadcast_cancel - to'xtatish")
+
+
+@dp.message(Command('broadcast_status'), admin_only)
+async def broadcast_status(message: types.Message):
+    if multi_worker:
+        summary = combined_summary(config.BROADCAST_STATE_DIR)
+    else:
+        summary = broadcaster.job.summary() if broadcaster.job is not None else None
+    await message.answer(summary or "Broadcast hali bo'lmagan")
+
+
+@dp.message(Command('broadcast_cancel'), admin_only)
+@rate_limit(config.THROTTLE_RATE, key=f"{throttling_key}_cancel")
+async def broadcast_cancel(message: types.Message):
+    job = await broadcaster.cancel()
+    if not replies_here(message):
+        return
+    if multi_worker:
+        await message.answer("To'xtatish barcha workerlarga yuborildi\n/broadcast_status - holati")
+    elif job is None:
+        await message.answer("Davom etayotgan broadcast yo'q")
+    else:
+        await message.answer(job.summary())
@@ -0,0 +1,158 @@
+import logging
+from typing import Any, Dict
+
+from aiogram import Router, types, F
+from aiogram.fsm.context import FSMContext
+from aiogram.types import ErrorEvent
+
+from data.config import (
+    CHAT_BUSY_POLICY, CHAT_QUEUE_LIMIT, CIRCUIT_COOLDOWN, CIRCUIT_ERROR_RATE, CIRCUIT_FAILURE_THRESHOLD, CONTEXT_TOKEN_BUDGET,
+    HEDGE_DELAY, PROVIDERS, PROVIDER_MAX_CONCURRENCY, ROUTING_MODE, STREAM_EDIT_INTERVAL
+)
+from loader import dp, bot, data_managers, http_clients, response_cache
+from providers import ChatProvider, ProviderRouter, build_provider
+from states import provider_state
+from utils.json_manager import JSONDataManager
+from utils.misc.concurrency import QUEUED, REJECTED, TRIMMED, TurnGuard
+from utils.streaming import render_stream
+
+logger = logging.getLogger(__name__)
+
+# Suhbat holatlaridagi handlerlar alohida routerda: menyu tugmalari har doim birinchi tekshiriladi
+chat_router = Router(name="chat")
+
+
+def error_text(error: BaseException) -> str:
+    """Xatolik matniga qarab foydalanuvchiga ko'rsatiladigan xabarni tanlash"""
+    text = str(error).lower()
+    if "payment" in text or "insufficient" in text:
+        return "Hisobingizda yetarli mablag‘ yo‘q. Iltimos, provayder balansini tekshiring."
+    if "rate" in text:
+        return "Rate limit exceeded. Please wait."
+    return "Xatolik yuz berdi. Qaytadan urinib ko‘ring."
+
+
+def register_chat(name: str, options: Dict[str, Any], provider: ChatProvider,
+                  data_manager: JSONDataManager) -> None:
+    """Bitta provayder uchun menyu tugmasi, suhbat va xatolik handlerlarini ro'yxatdan o'tkazish"""
+    chat_state = provider_state(name)
+    system_prompt = options.get("system_prompt")
+    context_tokens = options.get("context_tokens", CONTEXT_TOKEN_BUDGET)
+    markdown = options.get("markdown", True)
+    turns = TurnGuard(CHAT_BUSY_POLICY, max_queued=CHAT_QUEUE_LIMIT)
+
+    async def chat_start(message: types.Message, state: FSMContext):
+        user_id = str(message.from_user.id)
+        data_manager.clear_history(user_id)
+
+        await message.answer(options["intro"], reply_markup=types.ReplyKeyboardRemove())
+        await state.set_state(chat_state)
+
+    async def answer_turn(message: types.Message, user_id: str, user_message: str):
+        try:
+            await bot.send_chat_action(chat_id=user_id, action="typing")
+
+            # Foydalanuvchi xabarini tarixga qo‘shish
+            data_manager.add_message(user_id, "user", user_message)
+            messages = data_manager.manage_conversation_history(
+                user_id, max_messages=5, token_budget=context_tokens, system_prompt=system_prompt
+            )
+
+            # Javobni stream orqali olish (kesh yoqilgan bo'lsa, takroriy birinchi savollar keshdan)
+            if response_cache is not None:
+                chunks = response_cache.stream(provider, messages)
+            else:
+                chunks = provider.stream(messages)
+            bot_response = await render_stream(message, chunks, min_interval=STREAM_EDIT_INTERVAL, markdown=markdown)
+
+            # Model javobini tarixga qo‘shish
+            data_manager.add_message(user_id, "assistant", bot_response)
+
+        except Exception as e:
+            logger.error(f"{name} chat error for user {user_id}: {e}")
+            await message.reply(error_text(e))
+
+    async def chat_handle_message(message: types.Message):
+        user_id = str(message.from_user.id)
+
+        # Foydalanuvchi uchun javob hali tugamagan bo'lsa, yangi generatsiya boshlanmaydi
+        if not turns.begin(user_id):
+            result = turns.enqueue(user_id, message)
+            if result == QUEUED:
+                await message.reply("⏳ Xabaringiz qabul qilindi, joriy javobdan keyin ko‘rib chiqiladi.")
+            elif result == TRIMMED:
+                await message.reply(
+                    f"⚠️ Kutayotgan xabarlar ko‘p: faqat oxirgi {turns.max_queued} tasi ko‘rib chiqiladi."
+                )
+            elif result == REJECTED:
+                await message.reply("⚠️ Iltimos, xabarlar orasida ozgina kutib turing!")
+            return
+
+        try:
+            user_message = message.text
+            while True:
+                await answer_turn(message, user_id, user_message)
+
+                # Javob davomida kelgan xabarlar bitta keyingi navbatga birlashtiriladi
+                queued = turns.next_batch(user_id)
+                if not queued:
+                    break
+                message = queued[-1]
+                user_message = "\n\n".join(item.text for item in queued)
+        finally:
+            turns.end(user_id)
+
+    async def chat_non_text(message: types.Message):
+        await message.reply("Iltimos, savolingizni matn ko‘rinishida yuboring.")
+
+    async def chat_error_handler(event: ErrorEvent) -> bool:
+        try:
+            if event.update.message:
+                await event.update.message.answer(error_text(event.exception))
+
+            logger.error(
+                "%s error: %s\nUpdate: %s",
+                name,
+                event.exception,
+                event.update
+            )
+        except Exception as e:
+            logger.error(f"Error in {name} error handler: {e}")
+        return True
+
+    # Metrika va loop watchdog yorliqlari handler nomidan olinadi: har bir provayder uchun alohida
+    for handler in (chat_start, chat_handle_message, chat_non_text, chat_error_handler):
+        handler.__name__ = handler.__qualname__ = f"{name}_{handler.__name__}"
+
+    dp.message.register(chat_start, F.text == options["button"])
+    # Limit middlewares.ProviderRateLimitMiddleware tomonidan "provider" flagi bo'yicha qo'llanadi
+    chat_router.message.register(chat_handle_message, chat_state, F.text, flags={"provider": name})
+    # Stiker, rasm, ovoz va h.k. navbatga ham, tarixga ham tushmaydi
+    chat_router.message.register(chat_non_text, chat_state)
+    chat_router.error.register(chat_error_handler, chat_state)
+
+
+providers: Dict[str, ChatProvider] = {}
+
+for _name, _options in PROVIDERS.items():
+    providers[_name] = build_provider(
+        _name, {"max_concurrency": PROVIDER_MAX_CONCURRENCY, **_options}, http_clients=http_clients
+    )
+
+# Ixtiyoriy failover/hedging: handlerlar provayder o'rniga uning router orqali o'ralgan ko'rinishini oladi
+router = None
+if ROUTING_MODE != "off":
+    router = ProviderRouter(
+        providers,
+        mode=ROUTING_MODE,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        error_rate=CIRCUIT_ERROR_RATE,
+        cooldown=CIRCUIT_COOLDOWN,
+        hedge_delay=HEDGE_DELAY,
+    )
+
+for _name, _options in PROVIDERS.items():
+    _provider = router.routed(_name, _options.get("fallbacks")) if router is not None else providers[_name]
+    register_chat(_name, _options, _provider, data_managers[_name])
+
+dp.include_router(chat_router)
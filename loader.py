@@ -1,15 +1,107 @@
+import os
+from functools import partial
+from typing import Optional
+
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
+from redis.asyncio import Redis
 
 from data import config
-from utils.json_manager import JSONDataManager
+from providers import HTTPClientFactory
+from utils.broadcast import Broadcaster
+from utils.db_api import SQLiteDataManager
+from utils.fsm_storage import CachedRedisStorage, SQLiteStorage
+from utils.json_manager import ContextBuilder, HistoryArchive, JSONDataManager, extractive_summary, make_storage
+from utils.response_cache import RedisCacheTier, ResponseCache, SQLiteCacheTier
+from utils.supervisor import owns_user
+
+redis = Redis.from_url(config.REDIS_URL) if config.REDIS_URL else None
+session = AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL)) if config.TELEGRAM_API_URL else None
+bot = Bot(token=config.BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+http_clients = HTTPClientFactory(
+    max_connections=config.HTTP_MAX_CONNECTIONS,
+    max_keepalive=config.HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+    read_timeout=config.HTTP_READ_TIMEOUT,
+    first_byte_timeout=config.HTTP_FIRST_BYTE_TIMEOUT,
+    retries=config.HTTP_RETRIES,
+    backoff=config.HTTP_RETRY_BACKOFF,
+    http2=config.HTTP2,
+)
+broadcaster = Broadcaster(
+    bot,
+    # Ko'p jarayonli rejimda har bir worker o'z holatini saqlaydi, flood limit esa bot uchun umumiy
+    state_dir=config.BROADCAST_STATE_DIR if config.WORKER_INDEX is None
+    else os.path.join(config.BROADCAST_STATE_DIR, f"w{config.WORKER_INDEX}"),
+    rate=config.BROADCAST_RATE if config.WORKER_INDEX is None else config.BROADCAST_RATE / config.WORKERS,
+    chat_interval=config.BROADCAST_CHAT_INTERVAL,
+    concurrency=config.BROADCAST_CONCURRENCY,
+    retries=config.BROADCAST_RETRIES,
+)
+
+
+def _fsm_storage() -> BaseStorage:
+    if config.FSM_STORAGE == 'redis':
+        if redis is None:
+            raise ValueError("FSM_STORAGE=redis requires REDIS_URL")
+        return CachedRedisStorage(redis, state_ttl=config.FSM_STATE_TTL)
+    if config.FSM_STORAGE == 'sqlite':
+        return SQLiteStorage(config.FSM_SQLITE_PATH, state_ttl=config.FSM_STATE_TTL)
+    return MemoryStorage()
 
-bot = Bot(token=config.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-storage = MemoryStorage()
+
+storage = _fsm_storage()
 dp = Dispatcher(storage=storage)
 
-openai_data_manager = JSONDataManager()
-gemini_data_manager = JSONDataManager(file_path='data/chat_story/gemini_data.json')
-deepseek_data_manager = JSONDataManager(file_path='data/chat_story/deepseek_data.json')
\ No newline at end of file
+
+def _data_manager(provider: str) -> JSONDataManager:
+    context = ContextBuilder(
+        summarizer=extractive_summary if config.HISTORY_SUMMARY else None,
+        summary_tokens=config.HISTORY_SUMMARY_TOKENS,
+    )
+    options = dict(flush_interval=config.HISTORY_FLUSH_INTERVAL, max_dirty=config.HISTORY_FLUSH_MAX_DIRTY,
+                   max_stored_messages=config.HISTORY_MAX_MESSAGES, context=context,
+                   ttl=config.HISTORY_TTL, janitor_interval=config.HISTORY_JANITOR_INTERVAL)
+    worker = config.WORKER_INDEX
+    archive_dir = os.path.join(config.HISTORY_ARCHIVE_DIR, provider)
+    # TTL keyin o'chirilsa ham, oldin arxivlanganlar qaytganda tiklanadi
+    if config.HISTORY_ARCHIVE and (config.HISTORY_TTL or os.path.isdir(archive_dir)):
+        # Har bir provayderga alohida katalog, har bir workerga alohida kunlik fayllar
+        options['archive'] = HistoryArchive(archive_dir, suffix=f".w{worker}" if worker is not None else '')
+    if worker is not None and config.HISTORY_STORAGE in ('sqlite', 'sharded'):
+        # Umumiy storage: har bir worker faqat o'z foydalanuvchilarini yuklaydi va yozadi
+        options['owner'] = partial(owns_user, worker, config.WORKERS)
+    if config.HISTORY_STORAGE == 'sqlite':
+        return SQLiteDataManager(provider, db_path=config.HISTORY_DB_PATH, **options)
+
+    file_path = f'data/chat_story/{provider}_data.json'
+    if worker is not None and config.HISTORY_STORAGE != 'sharded':
+        # Bitta fayl bir nechta jarayondan yozilmasligi uchun har bir workerga alohida fayl
+        file_path = f'data/chat_story/{provider}_data.w{worker}.json'
+    return JSONDataManager(file_path=file_path, storage=make_storage(config.HISTORY_STORAGE, file_path), **options)
+
+
+# Har bir provayder uchun alohida chat tarixi
+data_managers = {name: _data_manager(name) for name in config.PROVIDERS}
+
+
+def _response_cache() -> Optional[ResponseCache]:
+    if not config.RESPONSE_CACHE:
+        return None
+    tier = None
+    if config.RESPONSE_CACHE_TIER == 'redis':
+        if redis is None:
+            raise ValueError("RESPONSE_CACHE_TIER=redis requires REDIS_URL")
+        tier = RedisCacheTier(redis)
+    elif config.RESPONSE_CACHE_TIER == 'sqlite':
+        tier = SQLiteCacheTier(config.RESPONSE_CACHE_PATH)
+    return ResponseCache(max_entries=config.RESPONSE_CACHE_SIZE, ttl=config.RESPONSE_CACHE_TTL, tier=tier)
+
+
+response_cache = _response_cache()
@@ -1 +1,25 @@
+from data import config
+from loader import bot, broadcaster, dp, redis
+from .broadcast import OutgoingBudget, UnblockOnMessage
+from .metrics import HandlerMetricsMiddleware, TelegramRequestMetrics, UpdateMetricsMiddleware
+from .rate_limit import ProviderRateLimitMiddleware
 from .throttling import ThrottlingMiddleware
+from .watchdog import HandlerNameMiddleware
+
+
+if __name__ == "middlewares":
+    if config.METRICS_ENABLED:
+        dp.update.outer_middleware(UpdateMetricsMiddleware())
+        bot.session.middleware(TelegramRequestMetrics())
+    bot.session.middleware(OutgoingBudget(broadcaster.bucket))
+    dp.message.outer_middleware(UnblockOnMessage(broadcaster))
+    dp.message.middleware(ThrottlingMiddleware(redis=redis, limit=config.THROTTLE_RATE, burst=config.THROTTLE_BURST))
+    dp.message.middleware(ProviderRateLimitMiddleware({
+        name: options.get("rate_limit", config.CHAT_RATE_LIMIT)
+        for name, options in config.PROVIDERS.items()
+    }))
+    if config.METRICS_ENABLED:
+        # Oxirgi inner middleware: faqat handlerning o'zi o'lchanadi
+        dp.message.middleware(HandlerMetricsMiddleware())
+    if config.LOOP_WATCHDOG:
+        dp.message.middleware(HandlerNameMiddleware())
@@ -0,0 +1,52 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import Message
+
+from utils.broadcast import Broadcaster, TokenBucket, broadcasting
+
+# Telegram flood limitiga kiradigan (chatga xabar chiqaradigan) metodlar
+SEND_METHODS = frozenset({
+    "sendMessage", "editMessageText", "copyMessage", "forwardMessage", "sendPhoto", "sendDocument",
+    "sendVideo", "sendAudio", "sendVoice", "sendAnimation", "sendSticker", "sendMediaGroup",
+})
+
+
+class OutgoingBudget(BaseRequestMiddleware):
+    """
+    Bot session middleware: chat trafigi broadcast bucketidan token oladi, lekin kutmaydi -
+    javoblar kechikmaydi, broadcast esa shuncha sekinlashadi.
+    """
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType,
+            bot: Bot,
+            method: TelegramMethod,
+    ) -> Response:
+        if method.__api_method__ in SEND_METHODS and not broadcasting.get():
+            self.bucket.consume()
+        return await make_request(bot, method)
+
+
+class UnblockOnMessage(BaseMiddleware):
+    """Botni bloklab, keyin yana yozgan foydalanuvchini broadcast ning `blocked.txt` idan chiqarish"""
+
+    def __init__(self, broadcaster: Broadcaster):
+        self.broadcaster = broadcaster
+        super().__init__()
+
+    async def __call__(
+            self,
+            handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+            event: Message,
+            data: Dict[str, Any]
+    ) -> Any:
+        if event.from_user is not None and event.chat.type == "private":
+            self.broadcaster.unblock(str(event.from_user.id))
+        return await handler(event, data)
@@ -0,0 +1,63 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from utils import metrics
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer middleware (dp.update): har bir update ni qayta ishlash vaqti, update turi bo'yicha"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            metrics.update_duration.labels(event.event_type).observe(time.perf_counter() - started)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: tanlangan handler ishlash vaqti, handler nomi bo'yicha"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            callback = getattr(data.get("handler"), "callback", None)
+            name = getattr(callback, "__name__", "unknown")
+            metrics.handler_duration.labels(name).observe(time.perf_counter() - started)
+
+
+class TelegramRequestMetrics(BaseRequestMiddleware):
+    """Bot session middleware: Bot API so'rovlari kechikishi, metod bo'yicha"""
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType,
+            bot: Bot,
+            method: TelegramMethod,
+    ) -> Response:
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            metrics.telegram_request_errors.labels(name).inc()
+            raise
+        finally:
+            metrics.telegram_request_duration.labels(name).observe(time.perf_counter() - started)
@@ -0,0 +1,44 @@
+import math
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+
+from utils import metrics
+from utils.misc.rate_limiter import SlidingWindowLimiter
+
+
+class ProviderRateLimitMiddleware(BaseMiddleware):
+    """
+    Har bir provayder uchun alohida sliding window limiti.
+
+    Provayder nomi handlerga `flags={"provider": name}` orqali beriladi;
+    bu flag bo'lmagan handlerlar cheklanmaydi.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[int, float]]):
+        self.limits = limits
+        self.limiters = {name: SlidingWindowLimiter(limit, period) for name, (limit, period) in limits.items()}
+        self._rejections = {name: metrics.throttle_rejections.labels(f"provider:{name}") for name in limits}
+        super().__init__()
+
+    async def __call__(
+            self,
+            handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+            event: Message,
+            data: Dict[str, Any]
+    ) -> Any:
+        provider = get_flag(data, "provider")
+        limiter = self.limiters.get(provider)
+        if limiter is not None:
+            retry_after = limiter.hit(event.from_user.id)
+            if retry_after:
+                self._rejections[provider].inc()
+                await event.reply(
+                    f"⚠️ Juda ko‘p so‘rov yubordingiz. "
+                    f"Iltimos, {math.ceil(retry_after)} sekund kutib turing."
+                )
+                return
+
+        return await handler(event, data)
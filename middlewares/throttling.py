@@ -1,17 +1,48 @@
-import asyncio
+import logging
 import time
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from aiogram import BaseMiddleware
-from aiogram.dispatcher.event.bases import CancelHandler
 from aiogram.types import Message
 
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# GCRA (token bucket bilan teng kuchli) algoritmi: tekshiruv va yozish bitta
+# atomik skriptda, ya'ni bitta round trip ichida bajariladi.
+# KEYS[1] - bucket kaliti; ARGV: interval (s), burst, hozirgi vaqt (s)
+# Natija: {ruxsat (1/0), qancha kutish kerak (ms), ketma-ket rad etishlar soni}
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tat', 'exceeded')
+local tat = tonumber(state[1]) or now
+local exceeded = tonumber(state[2]) or 0
+if tat < now then tat = now end
+
+local new_tat = tat + interval
+local allow_until = now + interval * burst
+if new_tat <= allow_until then
+    redis.call('HSET', KEYS[1], 'tat', tostring(new_tat), 'exceeded', 0)
+    redis.call('PEXPIRE', KEYS[1], math.ceil((new_tat - now) * 1000) + 1000)
+    return {1, 0, 0}
+end
+
+exceeded = exceeded + 1
+redis.call('HSET', KEYS[1], 'exceeded', exceeded)
+redis.call('PEXPIRE', KEYS[1], math.ceil((tat - now) * 1000) + 1000)
+return {0, math.ceil((new_tat - allow_until) * 1000), exceeded}
+"""
+
 
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self, redis, limit=.5, key_prefix='antiflood_'):
+    def __init__(self, redis=None, limit=.5, key_prefix='antiflood_', burst: int = 1):
         self.rate_limit = limit
         self.prefix = key_prefix
-        self.throttle_manager = ThrottleManager(redis=redis)
+        self.throttle_manager = ThrottleManager(redis=redis, burst=burst)
+        self._rejections = metrics.throttle_rejections.labels("antiflood")
 
         super().__init__()
 
@@ -23,26 +54,24 @@ class ThrottlingMiddleware(BaseMiddleware):
     ) -> Any:
 
         try:
-            await self.on_process_event(event)
-        except CancelHandler:
+            await self.on_process_event(event, data)
+        except Throttled:
             # Cancel current handler
+            self._rejections.inc()
             return
 
-        try:
-            result = await handler(event, data)
-        except Exception as e:
-            # logger.exception(e) # You may uncomment this if logger is defined elsewhere
-            print(e)  # Temporary print for exception
-        else:
-            return result
+        return await handler(event, data)
 
     async def on_process_event(
             self,
             event: Message,
+            data: Dict[str, Any],
     ) -> Any:
 
-        limit = self.rate_limit
-        key = f"{self.prefix}_message"
+        # utils.misc.rate_limit dekoratori bilan berilgan handler sozlamalari
+        callback = getattr(data.get("handler"), "callback", None)
+        limit = getattr(callback, "throttling_rate_limit", self.rate_limit)
+        key = getattr(callback, "throttling_key", f"{self.prefix}_message")
 
         # Use ThrottleManager.throttle method.
         try:
@@ -50,71 +79,77 @@ class ThrottlingMiddleware(BaseMiddleware):
         except Throttled as t:
             # Execute action
             await self.event_throttled(event, t)
-
-            # Cancel current handler
-            raise CancelHandler()
+            raise
 
     async def event_throttled(self, event: Message, throttled: 'Throttled'):
-        # Calculate how many times is left till the block ends
-        delta = throttled.rate - throttled.delta
-
         # Prevent flooding
         if throttled.exceeded_count <= 2:
-            await event.answer(f'Too many events.\nTry again in {delta:.2f} seconds.')
+            await event.answer(f'Too many events.\nTry again in {throttled.retry_after:.2f} seconds.')
 
 
 class ThrottleManager:
-    def __init__(self, redis):
+    """
+    Redis mavjud bo'lsa atomik Lua skript orqali, aks holda jarayon ichida
+    ishlaydigan GCRA limitlagich.
+    """
+
+    def __init__(self, redis=None, burst: int = 1, max_local_keys: int = 100000):
         self.redis = redis
+        self.burst = burst
+        self.max_local_keys = max_local_keys
+        self._script = redis.register_script(GCRA_SCRIPT) if redis is not None else None
+        # bucket -> (theoretical arrival time, exceeded count)
+        self._local: Dict[str, Tuple[float, int]] = {}
 
     async def throttle(self, key: str, rate: float, user_id: int, chat_id: int):
-        now = time.time()
         bucket_name = f'throttle_{key}_{user_id}_{chat_id}'
 
-        # Get data from redis
-        data = await self.redis.hmget(bucket_name, "RATE_LIMIT", "LAST_CALL", "EXCEEDED_COUNT", "DELTA")
-        data = {
-            k.decode(): float(v.decode())
-            if isinstance(v, bytes)
-            else float(v)
-            for k, v in zip(["RATE_LIMIT", "LAST_CALL", "EXCEEDED_COUNT", "DELTA"], data)
-            if v is not None
-        }
-
-        # Calculate
-        called = data.get("LAST_CALL", now)
-        delta = now - called
-        result = delta >= rate or delta <= 0
-
-        # Save result
-        data["RATE_LIMIT"] = rate
-        data["LAST_CALL"] = now
-        data["DELTA"] = delta
-        if not result:
-            data["EXCEEDED_COUNT"] += 1
+        if self._script is not None:
+            allowed, retry_after_ms, exceeded = await self._script(
+                keys=[bucket_name], args=[rate, self.burst, time.time()]
+            )
+            retry_after = int(retry_after_ms) / 1000
         else:
-            data["EXCEEDED_COUNT"] = 1
+            allowed, retry_after, exceeded = self._throttle_local(bucket_name, rate)
+
+        if not int(allowed):
+            raise Throttled(key=key, chat=chat_id, user=user_id, rate=rate,
+                            retry_after=retry_after, exceeded_count=int(exceeded))
+        return True
+
+    def _throttle_local(self, bucket_name: str, rate: float) -> Tuple[int, float, int]:
+        now = time.monotonic()
+        tat, exceeded = self._local.get(bucket_name, (now, 0))
+        tat = max(tat, now)
 
-        # Save data to redis
-        await self.redis.hmset_dict(bucket_name, data)
+        new_tat = tat + rate
+        allow_until = now + rate * self.burst
+        if new_tat <= allow_until:
+            self._local[bucket_name] = (new_tat, 0)
+            if len(self._local) > self.max_local_keys:
+                self._evict_expired(now)
+            return 1, 0.0, 0
 
-        if not result:
-            raise Throttled(key=key, chat=chat_id, user=user_id, **data)
+        self._local[bucket_name] = (tat, exceeded + 1)
+        return 0, new_tat - allow_until, exceeded + 1
 
-        return result
+    def _evict_expired(self, now: float) -> None:
+        """Muddati o'tgan bucketlarni xotiradan o'chirish"""
+        for bucket_name in [name for name, (tat, _) in self._local.items() if tat <= now]:
+            del self._local[bucket_name]
 
 
 class Throttled(Exception):
     def __init__(self, **kwargs):
         self.key = kwargs.pop("key", '<None>')
-        self.called_at = kwargs.pop("LAST_CALL", time.time())
-        self.rate = kwargs.pop("RATE_LIMIT", None)
-        self.exceeded_count = kwargs.pop("EXCEEDED_COUNT", 0)
-        self.delta = kwargs.pop("DELTA", 0)
+        self.called_at = kwargs.pop("called_at", time.time())
+        self.rate: Optional[float] = kwargs.pop("rate", None)
+        self.retry_after: float = kwargs.pop("retry_after", 0)
+        self.exceeded_count = kwargs.pop("exceeded_count", 0)
         self.user = kwargs.pop('user', None)
         self.chat = kwargs.pop('chat', None)
 
     def __str__(self):
         return f"Rate limit exceeded! (Limit: {self.rate} s, " \
                f"exceeded: {self.exceeded_count}, " \
-               f"time delta: {round(self.delta, 3)} s)"
+               f"retry after: {round(self.retry_after, 3)} s)"
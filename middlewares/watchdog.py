@@ -0,0 +1,20 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.misc.watchdog import handler_scope
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Inner middleware: loop watchdog bloklanish paytida qaysi handler ishlayotganini bilishi uchun"""
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        callback = getattr(data.get("handler"), "callback", None)
+        with handler_scope(getattr(callback, "__name__", "unknown")):
+            return await handler(event, data)
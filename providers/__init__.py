@@ -0,0 +1,41 @@
+from functools import partial
+from typing import Any, Dict, Optional
+
+from .base import ChatProvider
+from .gemini import GEMINI_BASE_URL, GeminiProvider
+from .http import HTTPClientFactory, RetryTransport
+from .openai_compatible import OpenAICompatibleProvider
+from .router import ProviderRouter, RoutedProvider
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+def build_provider(name: str, options: Dict[str, Any],
+                   http_clients: Optional[HTTPClientFactory] = None) -> ChatProvider:
+    """Konfiguratsiyadagi yozuv bo'yicha provayder yaratish (HTTP klient birinchi so'rovda olinadi)"""
+    kind = options["kind"]
+    params = dict(
+        name=name,
+        api_key=options["api_key"],
+        model=options["model"],
+        temperature=options.get("temperature", 0.7),
+        max_tokens=options.get("max_tokens", 300),
+        max_concurrency=options.get("max_concurrency"),
+    )
+    if http_clients is not None:
+        params.update(
+            first_byte_timeout=http_clients.first_byte_timeout,
+            chunk_timeout=http_clients.read_timeout,
+        )
+
+    if kind == "openai":
+        base_url = options.get("base_url")
+        if http_clients is not None:
+            params["http_client"] = partial(http_clients.get, base_url or OPENAI_BASE_URL)
+        return OpenAICompatibleProvider(base_url=base_url, **params)
+    if kind == "gemini":
+        base_url = options.get("base_url") or GEMINI_BASE_URL
+        if http_clients is not None:
+            params["http_client"] = partial(http_clients.get, base_url)
+        return GeminiProvider(base_url=base_url, **params)
+    raise ValueError(f"Unknown provider kind: {kind}")
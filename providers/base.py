@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import time
+from abc import ABC, abstractmethod
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from async_timeout import timeout as async_timeout  # asyncio.timeout faqat Python 3.11+ da
+
+from utils import metrics
+from utils.json_manager.context import count_tokens
+
+# Javobni haqiqatda bergan provayder (name, model): ProviderRouter g'olibni tanlaganda o'rnatadi.
+# Async generator chaqiruvchi vazifa kontekstida ishlaydi, shuning uchun qiymat stream ni o'qiganga ko'rinadi
+served_by: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar('served_by', default=None)
+
+
+class ChatProvider(ABC):
+    """
+    LLM provayderlari uchun umumiy async interfeys.
+
+    `stream` OpenAI formatidagi xabarlar ro'yxatini ({"role", "content"})
+    qabul qiladi va javob matnini bo'laklab qaytaradi.
+    """
+
+    def __init__(self, name: str, model: str, temperature: float = 0.7, max_tokens: Optional[int] = 300,
+                 max_concurrency: Optional[int] = None, first_byte_timeout: Optional[float] = None,
+                 chunk_timeout: Optional[float] = None):
+        self.name = name
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.first_byte_timeout = first_byte_timeout
+        self.chunk_timeout = chunk_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        # Metrikalar bolalari bir marta olinadi: stream davomida lug'at qidiruvi yo'q
+        self._ttft = metrics.provider_ttft.labels(name)
+        self._generation = metrics.provider_generation.labels(name)
+        self._tokens_per_second = metrics.provider_tokens_per_second.labels(name)
+        self._errors = metrics.provider_errors.labels(name)
+        self._in_flight = metrics.provider_in_flight.labels(name)
+
+    @abstractmethod
+    def _stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """Provayderga so'rov yuborish va javob bo'laklarini qaytarish"""
+
+    async def _stream_with_timeouts(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """Birinchi bo'lak `first_byte_timeout`, keyingilari `chunk_timeout` ichida kelishi kerak"""
+        started = time.perf_counter()
+        first_at = None
+        parts: List[str] = []
+        self._in_flight.inc()
+        try:
+            async with aclosing(self._stream(messages)) as chunks:
+                timeout = self.first_byte_timeout
+                while True:
+                    try:
+                        async with async_timeout(timeout):
+                            chunk = await anext(chunks)
+                    except StopAsyncIteration:
+                        break
+                    if first_at is None:
+                        first_at = time.perf_counter()
+                        self._ttft.observe(first_at - started)
+                    parts.append(chunk)
+                    yield chunk
+                    timeout = self.chunk_timeout
+        except Exception:
+            self._errors.inc()
+            raise
+        finally:
+            self._in_flight.dec()
+
+        finished = time.perf_counter()
+        self._generation.observe(finished - started)
+        if first_at is not None and finished > first_at:
+            # Tokenlar javob tugagach bir marta sanaladi: har bir bo'lakda tiktoken chaqirilmaydi
+            self._tokens_per_second.observe(count_tokens(''.join(parts)) / (finished - first_at))
+
+    async def stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        """Bir vaqtdagi so'rovlar cheklovi bilan javobni stream qilish"""
+        if self._semaphore is None:
+            async with aclosing(self._stream_with_timeouts(messages)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        async with self._semaphore:
+            async with aclosing(self._stream_with_timeouts(messages)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+
+    async def close(self) -> None:
+        """Provayder resurslarini yopish"""
@@ -0,0 +1,92 @@
+import json
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from .base import ChatProvider
+from .http import ClientSource, resolve_client
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+
+
+class GeminiAPIError(Exception):
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        super().__init__(f"Gemini API error {status_code}: {message}")
+
+
+def to_gemini_history(messages: List[Dict]) -> List[Dict]:
+    """OpenAI formatidagi tarixni Gemini formatiga o'tkazish (system xabarisiz)"""
+    return [
+        {"role": "model" if item["role"] == "assistant" else "user", "parts": [{"text": item["content"]}]}
+        for item in messages
+        if item["role"] != "system"
+    ]
+
+
+class GeminiProvider(ChatProvider):
+    """
+    Google Gemini REST API (streamGenerateContent, SSE) orqali.
+
+    SDK o'rniga to'g'ridan-to'g'ri httpx ishlatiladi - shunda Gemini ham
+    boshqa provayderlar bilan bir xil ulanishlar puli, timeout va qayta
+    urinishlardan foydalanadi. System xabari systemInstruction sifatida uzatiladi.
+    """
+
+    def __init__(self, name: str, api_key: str, model: str, base_url: Optional[str] = None,
+                 http_client: Optional[ClientSource] = None, **options):
+        super().__init__(name, model, **options)
+        self.api_key = api_key
+        self.url = f"{(base_url or GEMINI_BASE_URL).rstrip('/')}/v1beta/models/{model}:streamGenerateContent"
+        self._owns_client = http_client is None
+        self._http_client = http_client
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP klient birinchi so'rovda yaratiladi (yoki umumiy puldan olinadi)"""
+        if self._client is None:
+            self._client = resolve_client(self._http_client) or httpx.AsyncClient(
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            )
+        return self._client
+
+    def _payload(self, messages: List[Dict]) -> Dict:
+        payload = {
+            "contents": to_gemini_history(messages),
+            "generationConfig": {"temperature": self.temperature},
+        }
+        if self.max_tokens is not None:
+            payload["generationConfig"]["maxOutputTokens"] = self.max_tokens
+        if messages and messages[0]["role"] == "system":
+            payload["systemInstruction"] = {"parts": [{"text": messages[0]["content"]}]}
+        return payload
+
+    async def _stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        async with self.client.stream(
+                "POST", self.url,
+                params={"alt": "sse"},
+                headers={"x-goog-api-key": self.api_key},
+                json=self._payload(messages),
+        ) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode("utf-8", "replace")
+                try:
+                    message = json.loads(body)["error"]["message"]
+                except (ValueError, KeyError, TypeError):
+                    message = body[:200]
+                raise GeminiAPIError(response.status_code, message)
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = json.loads(line[5:])
+                for candidate in chunk.get("candidates", [])[:1]:
+                    # Xavfsizlik filtri sabab bo'sh qismlar o'tkazib yuboriladi
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+
+    async def close(self) -> None:
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import random
+from typing import Callable, Dict, Optional, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Provayderga tayyor klient yoki uni birinchi so'rovda qaytaradigan funksiya beriladi
+ClientSource = Union[httpx.AsyncClient, Callable[[], httpx.AsyncClient]]
+
+
+def resolve_client(source: Optional[ClientSource]) -> Optional[httpx.AsyncClient]:
+    return source() if callable(source) else source
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    429/5xx javoblar va ulanish xatolarida so'rovni qayta yuboradigan transport.
+
+    Kutish vaqti "full jitter" usulida: random(0, backoff * 2 ** urinish),
+    server Retry-After yuborgan bo'lsa, undan kam kutilmaydi.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, retries: int = 2, backoff: float = 0.5,
+                 max_backoff: float = 8.0):
+        self.transport = transport
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.max_backoff))
+            except ValueError:
+                pass
+        return delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self._delay(attempt)
+                logger.warning(f"{request.url.host}: {e!r}, retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                delay = self._delay(attempt, response)
+                await response.aclose()
+                logger.warning(f"{request.url.host}: HTTP {response.status_code}, retrying in {delay:.2f}s")
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class HTTPClientFactory:
+    """
+    Har bir upstream host uchun bitta umumiy `httpx.AsyncClient`.
+
+    Bir hostga boradigan barcha provayderlar bitta ulanishlar pulidan
+    foydalanadi (keep-alive, limitlar va timeoutlar shu yerda sozlanadi).
+    `read_timeout` - stream bo'laklari orasidagi, `first_byte_timeout` -
+    birinchi bo'lak uchun maksimal kutish (ChatProvider.stream da qo'llanadi).
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 50, keepalive_expiry: float = 30.0,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0, first_byte_timeout: float = 60.0,
+                 retries: int = 2, backoff: float = 0.5, http2: bool = False):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Sarlavhalar birinchi bo'lak bilan birga kelishi mumkin, shuning uchun read = max(...)
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=max(read_timeout, first_byte_timeout),
+            write=read_timeout,
+            pool=connect_timeout,
+        )
+        self.read_timeout = read_timeout
+        self.first_byte_timeout = first_byte_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """base_url hosti uchun umumiy klientni olish (kerak bo'lsa yaratish)"""
+        url = httpx.URL(base_url)
+        key = f"{url.scheme}://{url.netloc.decode('ascii')}"
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2)
+            client = self._clients[key] = httpx.AsyncClient(
+                transport=RetryTransport(transport, retries=self.retries, backoff=self.backoff),
+                timeout=self.timeout,
+            )
+        return client
+
+    async def aclose(self) -> None:
+        """Barcha klientlarni yopish"""
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
@@ -0,0 +1,59 @@
+import asyncio
+import importlib
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from .base import ChatProvider
+from .http import ClientSource, resolve_client
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+class OpenAICompatibleProvider(ChatProvider):
+    """
+    OpenAI Chat Completions API bilan mos provayderlar (OpenAI, DeepSeek, ...).
+
+    openai SDK importi va klient birinchi so'rovgacha kechiktiriladi:
+    bot tezroq ishga tushadi, ishlatilmagan provayder esa SDK ni umuman yuklamaydi.
+    """
+
+    def __init__(self, name: str, api_key: str, model: str, base_url: Optional[str] = None,
+                 http_client: Optional[ClientSource] = None, **options):
+        super().__init__(name, model, **options)
+        self.api_key = api_key
+        self.base_url = base_url
+        # Umumiy klient HTTPClientFactory ga tegishli: qayta urinishlar va timeoutlar o'sha yerda
+        self._owns_client = http_client is None
+        self._http_client = http_client
+        self._client: Optional["AsyncOpenAI"] = None
+
+    async def get_client(self) -> "AsyncOpenAI":
+        if self._client is None:
+            # SDK importi (~0.5 s) event loopni bloklamasligi uchun alohida thread da
+            openai = await asyncio.to_thread(importlib.import_module, "openai")
+            if self._client is None:
+                http_client = resolve_client(self._http_client)
+                if http_client is None:
+                    self._client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+                else:
+                    self._client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                                      http_client=http_client, timeout=http_client.timeout,
+                                                      max_retries=0)
+        return self._client
+
+    async def _stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        client = await self.get_client()
+        stream = await client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True  # Enable streaming
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
+    async def close(self) -> None:
+        if self._owns_client and self._client is not None:
+            await self._client.close()
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import aclosing, suppress
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from .base import ChatProvider, served_by
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class ProviderHealth:
+    """
+    Provayderning oxirgi `window` ta so'rovi bo'yicha TTFT va xatoliklar
+    statistikasi hamda circuit breaker holati.
+    """
+
+    __slots__ = ('latencies', 'outcomes', 'consecutive_failures', 'state', 'opened_at', 'trial_in_flight')
+
+    def __init__(self, window: int = 100):
+        self.latencies: "deque[float]" = deque(maxlen=window)  # birinchi bo'lakkacha vaqt, sekund
+        self.outcomes: "deque[bool]" = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "state": self.state,
+            "p95_ttft": self.p95(),
+            "error_rate": round(self.error_rate(), 3),
+            "samples": len(self.outcomes),
+        }
+
+
+class ProviderRouter:
+    """
+    Provayderlar orasida failover va hedging.
+
+    failover - asosiy provayder xatolik qaytarsa yoki circuit breaker ochiq
+    bo'lsa, javob keyingi provayderdan olinadi (faqat birinchi bo'lak
+    kelgunga qadar: yarim javobni boshqa model davom ettirmaydi).
+    hedge - bundan tashqari, birinchi bo'lak p95 TTFT ichida kelmasa,
+    ikkinchi provayderga ham so'rov yuboriladi; birinchi bo'lagi oldin
+    kelgani qoladi, ikkinchisi bekor qilinadi.
+    """
+
+    def __init__(self, providers: Dict[str, ChatProvider], mode: str = "failover", window: int = 100,
+                 failure_threshold: int = 5, error_rate: float = 0.5, cooldown: float = 30.0,
+                 hedge_delay: float = 2.0, min_hedge_delay: float = 0.25):
+        if mode not in ("failover", "hedge"):
+            raise ValueError(f"Unknown routing mode: {mode}")
+        self.providers = providers
+        self.mode = mode
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.health = {name: ProviderHealth(window) for name in providers}
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _available(self, name: str) -> bool:
+        health = self.health[name]
+        if health.state == OPEN and time.monotonic() - health.opened_at >= self.cooldown:
+            health.state = HALF_OPEN
+        if health.state == HALF_OPEN:
+            # Yarim ochiq holatda faqat bitta sinov so'rovi
+            return not health.trial_in_flight
+        return health.state == CLOSED
+
+    def _record_success(self, name: str) -> None:
+        health = self.health[name]
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+        if health.state != CLOSED:
+            logger.info(f"Circuit for {name} closed")
+        health.state = CLOSED
+
+    def _record_failure(self, name: str, error: BaseException) -> None:
+        health = self.health[name]
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+        sustained = len(health.outcomes) >= 10 and health.error_rate() >= self.error_rate
+        if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold or sustained:
+            if health.state != OPEN:
+                logger.warning(f"Circuit for {name} opened after error: {error!r}")
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+
+    def _delay(self, name: str) -> float:
+        p95 = self.health[name].p95()
+        return max(self.min_hedge_delay, p95 if p95 is not None else self.hedge_delay)
+
+    def candidates(self, primary: str, fallbacks: Sequence[str]) -> List[str]:
+        """Navbatdagi provayderlar: breaker yopiq (yoki sinovga tayyor) bo'lganlari"""
+        names = [primary] + [name for name in fallbacks if name != primary and name in self.providers]
+        available = [name for name in names if self._available(name)]
+        # Hammasi ochiq bo'lsa ham foydalanuvchi javobsiz qolmasin
+        return available or [primary]
+
+    async def stream(self, primary: str, messages: List[Dict], fallbacks: Sequence[str]) -> AsyncIterator[str]:
+        pending = self.candidates(primary, fallbacks)
+        attempts: Dict[asyncio.Task, tuple] = {}  # anext vazifasi -> (nom, generator, boshlangan vaqt)
+        last_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            name = pending.pop(0)
+            health = self.health[name]
+            if health.state == HALF_OPEN:
+                health.trial_in_flight = True
+            chunks = self.providers[name].stream(messages)
+            attempts[asyncio.ensure_future(anext(chunks))] = (name, chunks, time.monotonic())
+
+        async def discard(task: asyncio.Task) -> None:
+            name, chunks, _ = attempts.pop(task)
+            self.health[name].trial_in_flight = False
+            task.cancel()
+            with suppress(BaseException):
+                await task
+            with suppress(Exception):
+                await chunks.aclose()
+
+        launch()
+        first = next(iter(attempts))
+        winner = None
+        hedged = False
+        try:
+            while winner is None:
+                hedge = self.mode == "hedge" and pending and len(attempts) == 1
+                timeout = self._delay(attempts[next(iter(attempts))][0]) if hedge else None
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Birinchi bo'lak p95 ichida kelmadi - ikkinchi provayderga ham so'rov
+                    self.hedges += 1
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    name, chunks, started = attempts[task]
+                    error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+                    if error is None:
+                        if winner is None:
+                            winner = task
+                        continue
+                    attempts.pop(task)
+                    self.health[name].trial_in_flight = False
+                    if isinstance(error, StopAsyncIteration):
+                        # Bo'sh javob ham javob
+                        self._record_success(name)
+                        for other in list(attempts):
+                            await discard(other)
+                        return
+                    last_error = error
+                    self._record_failure(name, error)
+                    logger.warning(f"Provider {name} failed before first chunk: {error!r}")
+
+                if winner is None and not attempts:
+                    if not pending:
+                        raise last_error
+                    self.failovers += 1
+                    launch()
+        except BaseException:
+            for task in list(attempts):
+                await discard(task)
+            raise
+
+        # G'olibdan boshqa urinishlar bekor qilinadi
+        for task in [task for task in attempts if task is not winner]:
+            await discard(task)
+
+        name, chunks, started = attempts.pop(winner)
+        served_by.set((name, self.providers[name].model))
+        health = self.health[name]
+        health.trial_in_flight = False
+        health.latencies.append(time.monotonic() - started)
+        if hedged and winner is not first:
+            self.hedge_wins += 1
+
+        async with aclosing(chunks):
+            try:
+                yield winner.result()
+                async for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                self._record_failure(name, e)
+                raise
+        self._record_success(name)
+
+    def routed(self, name: str, fallbacks: Optional[Sequence[str]] = None) -> "RoutedProvider":
+        """`name` provayderi uchun failover/hedging bilan o'ralgan provayder"""
+        if fallbacks is None:
+            fallbacks = [other for other in self.providers if other != name]
+        return RoutedProvider(self, self.providers[name], fallbacks)
+
+    def stats(self) -> Dict:
+        return {
+            "failovers": self.failovers,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "providers": {name: health.as_dict() for name, health in self.health.items()},
+        }
+
+
+class RoutedProvider(ChatProvider):
+    """Handlerlar uchun oddiy provayder ko'rinishi: so'rovlar ProviderRouter orqali yuboriladi"""
+
+    def __init__(self, router: ProviderRouter, primary: ChatProvider, fallbacks: Sequence[str]):
+        super().__init__(primary.name, primary.model)
+        self.router = router
+        self.fallbacks = list(fallbacks)
+
+    def _stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        return self.router.stream(self.name, messages, self.fallbacks)
+
+    async def stream(self, messages: List[Dict]) -> AsyncIterator[str]:
+        # Limitlar va timeoutlar har bir haqiqiy provayderning o'zida qo'llanadi
+        async with aclosing(self._stream(messages)) as chunks:
+            async for chunk in chunks:
+                yield chunk
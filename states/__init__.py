@@ -1 +1 @@
-from .chat_states import ChatStates, OpenAIAnswering, GeminiAnswering, DeepSeekAnswering
+from .chat_states import ChatStates, provider_state
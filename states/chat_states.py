@@ -7,13 +7,9 @@ class ChatStates(StatesGroup):
     deepseek = State()
 
 
-class OpenAIAnswering(StatesGroup):
-    answering = State()
-
-
-class GeminiAnswering(StatesGroup):
-    answering = State()
-
-
-class DeepSeekAnswering(StatesGroup):
-    answering = State()
+def provider_state(name: str) -> State:
+    """Provayder uchun suhbat holatini olish (yangi provayderlar uchun yaratiladi)"""
+    chat_state = getattr(ChatStates, name, None)
+    if not isinstance(chat_state, State):
+        chat_state = State(name, group_name='ChatStates')
+    return chat_state
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# data.config majburiy o'zgaruvchilarni talab qiladi (utils paketi uni import qiladi)
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("ADMINS", "")
+os.environ.setdefault("ip", "127.0.0.1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from bench.fake_telegram import FakeTelegram, start_fake_telegram
+from middlewares.broadcast import UnblockOnMessage
+from utils.broadcast import Broadcaster
+
+
+def _write_job(state_dir, **fields):
+    os.makedirs(state_dir, exist_ok=True)
+    data = {'id': 'abc', 'text': 'Yangilik', 'total': 3, 'cursor': 1, 'done': [],
+            'counts': {'sent': 1, 'blocked': 0, 'failed': 0}, 'status': 'running', **fields}
+    with open(os.path.join(state_dir, 'job.json'), 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+
+
+def _read_job(state_dir):
+    with open(os.path.join(state_dir, 'job.json'), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+@pytest.mark.parametrize("recipients", [None, "1\n2", "1\n2\n3\n4"])
+def test_resume_marks_job_failed_when_recipients_are_missing_or_partial(tmp_path, recipients):
+    state_dir = str(tmp_path)
+    _write_job(state_dir)
+    if recipients is not None:
+        (tmp_path / 'recipients-abc.txt').write_text(recipients, encoding='utf-8')
+
+    assert Broadcaster(bot=None, state_dir=state_dir).resume() is None
+    data = _read_job(state_dir)
+    assert data['status'] == 'failed'
+    assert data['finished_at'] and data['error']
+    # keyingi ishga tushishda qayta urinilmaydi
+    assert Broadcaster(bot=None, state_dir=state_dir).resume() is None
+
+
+@pytest.mark.parametrize("content", ["{not json", "[1, 2]"])
+def test_resume_moves_unreadable_job_aside(tmp_path, content):
+    (tmp_path / 'job.json').write_text(content, encoding='utf-8')
+
+    assert Broadcaster(bot=None, state_dir=str(tmp_path)).resume() is None
+    assert not (tmp_path / 'job.json').exists()
+    assert (tmp_path / 'job.json.corrupt').read_text(encoding='utf-8') == content
+
+
+def test_resume_continues_a_valid_job(tmp_path):
+    state_dir = str(tmp_path / 'broadcast')
+    _write_job(state_dir)
+    with open(os.path.join(state_dir, 'recipients-abc.txt'), 'w', encoding='utf-8') as file:
+        file.write("1001\n1002\n1003")
+
+    async def scenario():
+        fake = FakeTelegram()
+        runner, base_url = await start_fake_telegram(fake)
+        bot = Bot("42:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+        engine = Broadcaster(bot, state_dir=state_dir, rate=100, chat_interval=0.01)
+        job = engine.resume()
+        await engine._task
+        await bot.session.close()
+        await runner.cleanup()
+        return job, fake
+
+    job, fake = asyncio.run(scenario())
+    assert job.status == 'done' and job.counts['sent'] == 3
+    assert dict(fake.sent) == {1002: 1, 1003: 1}
+
+
+class FakeMessage:
+    def __init__(self, user_id: int, chat_type: str = "private"):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.chat = SimpleNamespace(id=user_id, type=chat_type)
+
+
+def test_user_who_writes_again_is_removed_from_blocked(tmp_path):
+    state_dir = str(tmp_path)
+    users = ["1001", "1002", "1003"]
+
+    async def scenario():
+        fake = FakeTelegram()
+        fake.blocked.update({1001, 1002})
+        runner, base_url = await start_fake_telegram(fake)
+        bot = Bot("42:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+        engine = Broadcaster(bot, state_dir=state_dir, rate=100, chat_interval=0.01)
+        await engine.start(users, text="birinchi")
+        await engine._task
+        assert engine.blocked == {"1001", "1002"}
+
+        # 1001 botni blokdan chiqarib, yana yozdi (guruhdagi xabar hisobga olinmaydi)
+        fake.blocked.discard(1001)
+        middleware = UnblockOnMessage(engine)
+        handled = []
+
+        async def handler(event, data):
+            handled.append(event)
+
+        await middleware(handler, FakeMessage(1001), {})
+        await middleware(handler, FakeMessage(1002, chat_type="group"), {})
+        assert len(handled) == 2
+
+        # Bot qayta ishga tushgandan keyin ham blocked.txt dan o'qiladi
+        engine = Broadcaster(bot, state_dir=state_dir, rate=100, chat_interval=0.01)
+        assert engine.blocked == {"1002"}
+        job = await engine.start(users, text="ikkinchi")
+        await engine._task
+        await bot.session.close()
+        await runner.cleanup()
+        return job, fake
+
+    job, fake = asyncio.run(scenario())
+    assert job.total == 2 and job.counts['sent'] == 2
+    assert fake.sent[1001] == 1 and fake.sent[1003] == 2
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+from functools import partial
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from bench.fake_telegram import FakeTelegram, start_fake_telegram
+from utils import supervisor as supervisor_module
+from utils.broadcast import Broadcaster, combined_summary, known_user_ids
+from utils.db_api import SQLiteDataManager
+from utils.supervisor import Supervisor, owns_user
+
+WORKERS = 3
+ADMIN = 42
+
+
+def _update(user_id: int, text: str) -> dict:
+    return {"update_id": 1, "message": {"message_id": 1, "date": 0, "text": text,
+                                        "chat": {"id": user_id, "type": "private"},
+                                        "from": {"id": user_id, "is_bot": False, "first_name": "U"}}}
+
+
+def test_admin_broadcast_commands_reach_every_worker(monkeypatch):
+    monkeypatch.setattr(supervisor_module.config, 'ADMINS', [str(ADMIN)])
+    supervisor = Supervisor(bot=None, workers=WORKERS)
+    received = {link.index: [] for link in supervisor.links}
+    for link in supervisor.links:
+        async def send(payload, index=link.index):
+            received[index].append(json.loads(payload)["message"]["text"])
+        link.send = send
+
+    async def scenario():
+        for user_id, text in ((ADMIN, "/broadcast Yangilik"), (ADMIN, "/broadcast_cancel@bench_bot"),
+                              (ADMIN, "/broadcast_status"), (ADMIN, "salom"), (7, "/broadcast spam")):
+            await supervisor.dispatch(_update(user_id, text))
+
+    asyncio.run(scenario())
+    admin_worker = ADMIN % WORKERS
+    for index, texts in received.items():
+        expected = ["/broadcast Yangilik", "/broadcast_cancel@bench_bot"]
+        if index == admin_worker:
+            expected += ["/broadcast_status", "salom"]
+        if index == 7 % WORKERS:
+            expected += ["/broadcast spam"]
+        assert texts == expected
+
+
+def test_worker_broadcasts_cover_every_shard_once(tmp_path):
+    """Har bir worker o'z shardiga yuboradi: birgalikda hamma foydalanuvchi bir martadan xabar oladi"""
+    db_path = str(tmp_path / 'history.db')
+    users = [str(1000 + i) for i in range(30)]
+
+    async def scenario():
+        manager = SQLiteDataManager('openai', db_path=db_path)
+        for user_id in users:
+            manager.add_message(user_id, 'user', 'salom')
+        await manager.close()
+
+        fake = FakeTelegram()
+        fake.blocked.add(1001)
+        runner, base_url = await start_fake_telegram(fake)
+        bot = Bot("42:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+        state_dir = str(tmp_path / 'broadcast')
+        broadcasters = []
+        for index in range(WORKERS):
+            # loader kabi: workerning o'z foydalanuvchilari, o'z holat katalogi va tezlikning 1/N qismi
+            shard = SQLiteDataManager('openai', db_path=db_path, owner=partial(owns_user, index, WORKERS))
+            engine = Broadcaster(bot, state_dir=os.path.join(state_dir, f"w{index}"), rate=300 / WORKERS,
+                                 chat_interval=0.01)
+            await engine.start(known_user_ids([shard]), text="Yangilik")
+            broadcasters.append(engine)
+        await asyncio.gather(*(engine._task for engine in broadcasters))
+        await bot.session.close()
+        await runner.cleanup()
+
+        assert {chat_id: count for chat_id, count in fake.sent.items()} == {
+            int(user_id): 1 for user_id in users if user_id != '1001'}
+        assert sum(engine.job.total for engine in broadcasters) == len(users)
+        summary = combined_summary(state_dir)
+        assert summary.startswith("Broadcast: done")
+        assert "yuborildi: 29" in summary and "bloklagan: 1" in summary
+        assert "w0: done, w1: done, w2: done" in summary
+
+    asyncio.run(scenario())
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from providers.base import ChatProvider
+from utils.misc.concurrency import MERGED, QUEUED, REJECTED, TRIMMED, TurnGuard
+
+
+def test_second_message_is_queued_while_turn_is_active():
+    turns = TurnGuard("merge")
+    assert turns.begin("1")
+    assert not turns.begin("1")
+    assert turns.enqueue("1", "a") == QUEUED
+    assert turns.enqueue("1", "b") == MERGED
+    # boshqa foydalanuvchi band emas
+    assert turns.begin("2")
+
+
+def test_next_batch_merges_queue_and_releases_key():
+    turns = TurnGuard("merge")
+    turns.begin("1")
+    turns.enqueue("1", "a")
+    turns.enqueue("1", "b")
+
+    assert turns.next_batch("1") == ["a", "b"]
+    # navbat hali egallangan: keyingi javob davomida kelganlar ham kutadi
+    assert not turns.begin("1")
+    assert turns.next_batch("1") == []
+    assert len(turns) == 0
+    assert turns.begin("1")
+
+
+def test_drop_policy_rejects_second_message():
+    turns = TurnGuard("drop")
+    assert turns.begin("1")
+    assert turns.enqueue("1", "a") == REJECTED
+    assert turns.next_batch("1") == []
+
+
+def test_queue_keeps_only_last_messages():
+    turns = TurnGuard("merge", max_queued=2)
+    turns.begin("1")
+    results = [turns.enqueue("1", item) for item in "abcd"]
+    # foydalanuvchiga faqat birinchi tashlashda xabar beriladi
+    assert results == [QUEUED, MERGED, TRIMMED, MERGED]
+    assert turns.next_batch("1") == ["c", "d"]
+
+    turns.enqueue("1", "e")
+    turns.enqueue("1", "f")
+    assert turns.enqueue("1", "g") == TRIMMED
+
+
+def test_end_after_exception_frees_key():
+    turns = TurnGuard("merge")
+
+    async def handle(key):
+        if not turns.begin(key):
+            turns.enqueue(key, "later")
+            return
+        try:
+            raise RuntimeError("provider failed")
+        finally:
+            turns.end(key)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(handle("1"))
+    assert len(turns) == 0
+    assert turns.begin("1")
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        TurnGuard("queue")
+
+
+class SlowProvider(ChatProvider):
+    def __init__(self, **kwargs):
+        super().__init__("slow", "slow-1", **kwargs)
+        self.active = 0
+        self.peak = 0
+
+    async def _stream(self, messages):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            yield "ok"
+        finally:
+            self.active -= 1
+
+
+def test_provider_semaphore_limits_concurrent_streams():
+    provider = SlowProvider(max_concurrency=2)
+
+    async def consume():
+        return [chunk async for chunk in provider.stream([])]
+
+    async def scenario():
+        return await asyncio.gather(*(consume() for _ in range(6)))
+
+    assert asyncio.run(scenario()) == [["ok"]] * 6
+    assert provider.peak == 2
@@ -0,0 +1,44 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.db_api import SQLiteDataManager
+from utils.json_manager import JSONDataManager, make_storage
+from utils.json_manager import manager as manager_module
+
+TTL = 30 * 24 * 3600
+
+
+def _open(kind: str, tmp_path) -> JSONDataManager:
+    if kind == 'sqlite':
+        return SQLiteDataManager('openai', db_path=str(tmp_path / 'history.db'), ttl=TTL)
+    path = str(tmp_path / 'openai_data.json')
+    return JSONDataManager(path, storage=make_storage(kind, path), ttl=TTL)
+
+
+@pytest.mark.parametrize('kind', ['json', 'sharded', 'log', 'sqlite'])
+def test_last_message_time_survives_reload(kind, tmp_path, monkeypatch):
+    """Eski foydalanuvchi yangi xabar yozsa, qayta ishga tushgandan keyin janitor uni chiqarmaydi"""
+
+    class PastDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) - timedelta(days=90)
+
+    async def scenario():
+        manager = _open(kind, tmp_path)
+        monkeypatch.setattr(manager_module, 'datetime', PastDatetime)
+        manager.add_message('1', 'user', 'birinchi xabar')
+        manager.add_message('2', 'user', 'faqat eski xabar')
+        monkeypatch.setattr(manager_module, 'datetime', datetime)
+        manager.add_message('1', 'user', 'yangi xabar')
+        await manager.close()
+
+        manager = _open(kind, tmp_path)
+        assert await manager.evict_idle() == 1
+        assert manager.user_counts()['hot'] == 1
+        assert [message.content for message in manager.get_user_data('1')] == ['birinchi xabar', 'yangi xabar']
+        await manager.close()
+
+    asyncio.run(scenario())
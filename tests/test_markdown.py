@@ -0,0 +1,76 @@
+from html.parser import HTMLParser
+
+import pytest
+
+from utils.misc.markdown import MarkdownStream, markdown_to_html
+
+
+class TagBalance(HTMLParser):
+    """HTML dagi teglar to'g'ri ichma-ich yopilganini tekshirish"""
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.balanced = True
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack.pop() != tag:
+            self.balanced = False
+
+
+def assert_balanced(html: str) -> None:
+    parser = TagBalance()
+    parser.feed(html)
+    parser.close()
+    assert parser.balanced and not parser.stack, html
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("**qalin** va *kursiv*", "<b>qalin</b> va <i>kursiv</i>"),
+    ("**bold *it***", "<b>bold <i>it</i></b>"),
+    ("***x***", "<b><i>x</i></b>"),
+    ("***x* y**", "<b><i>x</i> y</b>"),
+    # noto'g'ri ichma-ich: ichki teg yopilib, qayta ochiladi
+    ("*a **b* c**", "<i>a <b>b</b></i><b> c</b>"),
+    ("**a *b** c*", "<b>a <i>b</i></b><i> c</i>"),
+    # boshqa belgi bilan ochilgan kursiv yopmaydi
+    ("*a _b_ c*", "<i>a _b_ c</i>"),
+    ("_a *b* c_", "<i>a *b* c</i>"),
+    # yopilmagan belgilar o'z holicha qoladi
+    ("**yopilmagan", "**yopilmagan"),
+    ("*a **b c*", "<i>a <b>b c</b></i>"),
+    ("`kod", "`kod"),
+    ("a ** b", "a ** b"),
+    ("snake_case_name", "snake_case_name"),
+    ("\\*oddiy\\*", "*oddiy*"),
+    ("~~o'chirilgan~~", "<s>o'chirilgan</s>"),
+    ("`a*b` <teg> & x", "<code>a*b</code> &lt;teg&gt; &amp; x"),
+    ("[havola](https://a.uz?q=1&r=2)", '<a href="https://a.uz?q=1&amp;r=2">havola</a>'),
+    ("[havola](javascript:alert)", "havola (javascript:alert)"),
+    ("# Sarlavha **qalin**", "<b>Sarlavha qalin</b>"),
+    ("- *band*", "• <i>band</i>"),
+    # emphasis qatorlar orasida davom etmaydi
+    ("**a\nb**", "**a\nb**"),
+    ("```python\nif x < 1:\n    y = '*'\n```", '<pre><code class="language-python">if x &lt; 1:\n    y = \'*\'</code></pre>'),
+    ("```\nyopilmagan blok", "<pre>yopilmagan blok</pre>"),
+])
+def test_markdown_to_html(text, expected):
+    html = markdown_to_html(text)
+    assert html == expected
+    assert_balanced(html)
+
+
+@pytest.mark.parametrize("text", [
+    "Salom **dunyo** va *kursiv _ichida_ matn*\n",
+    "```python\nprint('<salom>')\n```\nOxiri ***uch* ikki**",
+    "- band **a *b** c*\n# Sarlavha\n~~s~~ `kod` [h](https://a.uz)",
+])
+def test_stream_is_balanced_after_every_chunk(text):
+    stream = MarkdownStream()
+    for char in text:
+        stream.feed(char)
+        assert_balanced(stream.html())
+    assert stream.html() == markdown_to_html(text)
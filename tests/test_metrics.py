@@ -0,0 +1,35 @@
+import asyncio
+
+from providers import ChatProvider, base
+
+
+class WordsProvider(ChatProvider):
+    async def _stream(self, messages):
+        for word in ("bir ", "ikki ", "uch ", "to'rt ", "besh"):
+            yield word
+
+
+def test_tokens_are_counted_once_per_reply(monkeypatch):
+    counted = []
+    monkeypatch.setattr(base, "count_tokens", lambda text: counted.append(text) or len(text.split()))
+    provider = WordsProvider("words", "words-1")
+
+    async def consume():
+        return ''.join([chunk async for chunk in provider.stream([])])
+
+    assert asyncio.run(consume()) == "bir ikki uch to'rt besh"
+    assert counted == ["bir ikki uch to'rt besh"]
+
+
+def test_chat_handler_labels_include_provider():
+    from handlers.private import chat
+
+    before = len(chat.chat_router.message.handlers)
+    for name in ("alpha", "beta"):
+        chat.register_chat(name, {"button": name, "intro": name}, WordsProvider(name, f"{name}-1"), None)
+
+    names = [handler.callback.__name__ for handler in chat.chat_router.message.handlers[before:]]
+    assert names == ["alpha_chat_handle_message", "alpha_chat_non_text",
+                     "beta_chat_handle_message", "beta_chat_non_text"]
+    errors = [handler.callback.__name__ for handler in chat.chat_router.error.handlers[-2:]]
+    assert errors == ["alpha_chat_error_handler", "beta_chat_error_handler"]
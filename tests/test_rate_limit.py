@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from middlewares.rate_limit import ProviderRateLimitMiddleware
+from utils.misc import rate_limiter, user_rate_limit
+
+
+class FakeMessage:
+    def __init__(self, user_id: int):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.replies = []
+
+    async def reply(self, text: str):
+        self.replies.append(text)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_decorator_replies_with_remaining_wait(clock):
+    handled = []
+
+    @user_rate_limit(limit=2, period=60)
+    async def handler(message):
+        handled.append(message)
+
+    async def scenario():
+        message = FakeMessage(1)
+        await handler(message)
+        clock[0] += 20
+        await handler(message)
+        clock[0] += 15
+        await handler(message)
+        assert len(handled) == 2
+        # birinchi so'rovdan 35 sekund o'tdi: 60 emas, 25 sekund qoldi
+        assert message.replies == ["⚠️ Juda ko‘p so‘rov yubordingiz. Iltimos, 25 sekund kutib turing."]
+
+        # boshqa foydalanuvchi cheklanmaydi, oyna o'tgach yana ruxsat
+        await handler(FakeMessage(2))
+        clock[0] += 25
+        await handler(message)
+        assert len(handled) == 4
+
+    asyncio.run(scenario())
+
+
+def test_middleware_limits_each_provider_separately(clock):
+    middleware = ProviderRateLimitMiddleware({"gemini": (1, 30), "openai": (2, 30)})
+    handled = []
+
+    async def handler(event, data):
+        handled.append(data["handler"].flags.get("provider"))
+
+    def data(provider):
+        return {"handler": SimpleNamespace(flags={"provider": provider})}
+
+    async def scenario():
+        message = FakeMessage(1)
+        await middleware(handler, message, data("gemini"))
+        clock[0] += 10
+        await middleware(handler, message, data("gemini"))
+        assert message.replies == ["⚠️ Juda ko‘p so‘rov yubordingiz. Iltimos, 20 sekund kutib turing."]
+
+        await middleware(handler, message, data("openai"))
+        await middleware(handler, message, data("openai"))
+        await middleware(handler, message, data("openai"))
+        assert len(message.replies) == 2
+        # flag'siz handlerlar cheklanmaydi
+        await middleware(handler, message, {"handler": SimpleNamespace(flags={})})
+        assert handled == ["gemini", "openai", "openai", None]
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+import asyncio
+import sqlite3
+import time
+
+from providers import ChatProvider, ProviderRouter
+from utils.response_cache import ResponseCache, SQLiteCacheTier, make_key
+
+MESSAGES = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Python nima?"}]
+
+
+class FakeProvider(ChatProvider):
+    def __init__(self, name: str, answer: str, fail: bool = False):
+        super().__init__(name, f"{name}-model")
+        self.answer = answer
+        self.fail = fail
+
+    async def _stream(self, messages):
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        for word in self.answer.split(' '):
+            yield word + ' '
+
+
+async def _collect(chunks) -> str:
+    return ''.join([chunk async for chunk in chunks])
+
+
+def test_fallback_answer_is_cached_under_the_model_that_wrote_it():
+    async def scenario():
+        primary, fallback = FakeProvider('openai', "asosiy javob"), FakeProvider('gemini', "zaxira javob")
+        primary.fail = True
+        router = ProviderRouter({'openai': primary, 'gemini': fallback}, mode="failover")
+        routed = router.routed('openai')
+        cache = ResponseCache()
+
+        assert await _collect(cache.stream(routed, MESSAGES)) == "zaxira javob "
+        assert await cache.get(make_key('openai', 'openai-model', MESSAGES)) is None
+        assert await cache.get(make_key('gemini', 'gemini-model', MESSAGES)) == "zaxira javob "
+
+        # Asosiy provayder tiklangach, uning savoliga zaxira modelning javobi qaytarilmaydi
+        primary.fail = False
+        assert await _collect(cache.stream(routed, MESSAGES)) == "asosiy javob "
+        assert cache.stats.hits == 0
+        assert await _collect(cache.stream(routed, MESSAGES)) == "asosiy javob "
+        assert cache.stats.hits == 1
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_tier_purges_expired_rows_every_n_writes(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+
+    async def scenario():
+        tier = SQLiteCacheTier(db_path, cleanup_every=3)
+        await tier.set('old', 'eski', ttl=0.01)
+        time.sleep(0.02)
+        await tier.set('a', 'x', ttl=60)
+        assert await tier.get('old') is None
+        assert _keys(db_path) == {'old', 'a'}
+        await tier.set('b', 'y', ttl=60)
+        assert _keys(db_path) == {'a', 'b'}
+        await tier.close()
+
+    asyncio.run(scenario())
+
+
+def _keys(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT key FROM response_cache")}
+    finally:
+        conn.close()
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from providers import ChatProvider, ProviderRouter
+from providers.router import CLOSED, HALF_OPEN, OPEN
+
+MESSAGES = [{"role": "user", "content": "Salom"}]
+
+
+class FakeProvider(ChatProvider):
+    def __init__(self, name: str, chunks=("javob",), delay: float = 0.0, fail: bool = False,
+                 fail_after_first: bool = False):
+        super().__init__(name, f"{name}-model")
+        self.chunks = chunks
+        self.delay = delay
+        self.fail = fail
+        self.fail_after_first = fail_after_first
+        self.calls = 0
+        self.closed = 0
+
+    async def _stream(self, messages):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError(f"{self.name} is down")
+            for index, chunk in enumerate(self.chunks):
+                yield chunk
+                if self.fail_after_first and index == 0:
+                    raise ConnectionError(f"{self.name} dropped the stream")
+        finally:
+            self.closed += 1
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+def test_breaker_opens_then_half_open_trial_closes_it():
+    primary, fallback = FakeProvider("openai", fail=True), FakeProvider("gemini")
+    router = ProviderRouter({"openai": primary, "gemini": fallback}, failure_threshold=2, cooldown=0.05)
+
+    async def scenario():
+        for _ in range(2):
+            assert await _collect(router.stream("openai", MESSAGES, ["gemini"])) == ["javob"]
+        assert router.health["openai"].state == OPEN
+        assert router.failovers == 2
+
+        # Ochiq breaker: asosiy provayderga so'rov yuborilmaydi
+        await _collect(router.stream("openai", MESSAGES, ["gemini"]))
+        assert primary.calls == 2
+
+        # Cooldown dan keyin bitta sinov so'rovi; muvaffaqiyatsiz bo'lsa yana ochiladi
+        await asyncio.sleep(0.06)
+        assert router.candidates("openai", ["gemini"]) == ["openai", "gemini"]
+        assert router.health["openai"].state == HALF_OPEN
+        await _collect(router.stream("openai", MESSAGES, ["gemini"]))
+        assert primary.calls == 3
+        assert router.health["openai"].state == OPEN
+
+        # Sinov muvaffaqiyatli bo'lsa breaker yopiladi
+        await asyncio.sleep(0.06)
+        primary.fail = False
+        assert await _collect(router.stream("openai", MESSAGES, ["gemini"])) == ["javob"]
+        assert router.health["openai"].state == CLOSED
+        assert primary.calls == 4
+
+    asyncio.run(scenario())
+
+
+def test_half_open_allows_a_single_trial():
+    primary, fallback = FakeProvider("openai", delay=0.05), FakeProvider("gemini")
+    router = ProviderRouter({"openai": primary, "gemini": fallback}, cooldown=0)
+    health = router.health["openai"]
+    health.state, health.opened_at = OPEN, 0.0
+
+    async def scenario():
+        trial = asyncio.create_task(_collect(router.stream("openai", MESSAGES, ["gemini"])))
+        await asyncio.sleep(0.01)
+        # Sinov davom etayotganda boshqa so'rovlar zaxiraga yuboriladi
+        assert await _collect(router.stream("openai", MESSAGES, ["gemini"])) == ["javob"]
+        assert fallback.calls == 1
+        assert await trial == ["javob"]
+        assert health.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_hedge_cancels_and_closes_the_losing_stream():
+    slow, fast = FakeProvider("openai", ("sekin",), delay=5), FakeProvider("gemini", ("tez",), delay=0.01)
+    router = ProviderRouter({"openai": slow, "gemini": fast}, mode="hedge", hedge_delay=0.02, min_hedge_delay=0.02)
+
+    async def scenario():
+        return await asyncio.wait_for(_collect(router.stream("openai", MESSAGES, ["gemini"])), 1)
+
+    assert asyncio.run(scenario()) == ["tez"]
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+    assert slow.calls == 1 and slow.closed == 1
+    assert fast.closed == 1
+    assert not router.health["openai"].trial_in_flight
+
+
+def test_hedge_is_not_launched_when_primary_is_fast():
+    primary, fallback = FakeProvider("openai", delay=0.0), FakeProvider("gemini")
+    router = ProviderRouter({"openai": primary, "gemini": fallback}, mode="hedge", hedge_delay=0.5)
+
+    assert asyncio.run(_collect(router.stream("openai", MESSAGES, ["gemini"]))) == ["javob"]
+    assert router.hedges == 0 and fallback.calls == 0
+
+
+def test_no_failover_after_first_chunk_was_yielded():
+    primary = FakeProvider("openai", ("bir", "ikki"), fail_after_first=True)
+    fallback = FakeProvider("gemini")
+    router = ProviderRouter({"openai": primary, "gemini": fallback}, failure_threshold=1)
+    received = []
+
+    async def scenario():
+        async for chunk in router.stream("openai", MESSAGES, ["gemini"]):
+            received.append(chunk)
+
+    with pytest.raises(ConnectionError, match="dropped"):
+        asyncio.run(scenario())
+    # Yarim javobni boshqa model davom ettirmaydi, lekin xatolik breakerga yoziladi
+    assert received == ["bir"]
+    assert fallback.calls == 0 and router.failovers == 0
+    assert router.health["openai"].state == OPEN
+    assert primary.closed == 1
+
+
+def test_all_candidates_failing_raises_last_error():
+    router = ProviderRouter({"openai": FakeProvider("openai", fail=True), "gemini": FakeProvider("gemini", fail=True)})
+
+    with pytest.raises(ConnectionError, match="gemini"):
+        asyncio.run(_collect(router.stream("openai", MESSAGES, ["gemini"])))
+
+
+def test_p95_ttft_sets_the_hedge_delay():
+    router = ProviderRouter({"openai": FakeProvider("openai")}, hedge_delay=2.0, min_hedge_delay=0.25)
+    health = router.health["openai"]
+    assert router._delay("openai") == 2.0  # namunalar yetarli emas
+
+    health.latencies.extend([0.5] * 19 + [3.0])
+    assert health.p95() == 0.5
+    assert router._delay("openai") == 0.5
+    health.latencies.clear()
+    health.latencies.extend([0.01] * 20)
+    assert router._delay("openai") == 0.25
@@ -0,0 +1,131 @@
+from html.parser import HTMLParser
+
+import pytest
+
+from utils.misc.markdown import closes_fence, fence_opener, markdown_to_html
+from utils.streaming.splitter import TELEGRAM_MESSAGE_LIMIT, MessageSplitter, split_message, utf16_len
+
+EMOJI = "😀"  # UTF-16 da ikki birlik (surrogate juftlik)
+
+
+class VisibleText(HTMLParser):
+    """HTML ning ko'rinadigan matni va teglar muvozanati"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.balanced = True
+        self.text = ''
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack.pop() != tag:
+            self.balanced = False
+
+    def handle_data(self, data):
+        self.text += data
+
+
+def visible(html: str) -> str:
+    parser = VisibleText()
+    parser.feed(html)
+    parser.close()
+    assert parser.balanced and not parser.stack, html
+    return parser.text
+
+
+def open_fence(part: str):
+    fence = None
+    for line in part.split('\n'):
+        if fence is None:
+            fence = fence_opener(line)
+        elif closes_fence(line, fence):
+            fence = None
+    return fence
+
+
+@pytest.mark.parametrize("text, sizes", [
+    ("a" * 4096, [4096]),
+    ("a" * 4095 + EMOJI, [4095, 2]),
+    ("a" * 4094 + EMOJI, [4096]),
+    ("a" * 4095 + EMOJI + "b", [4095, 3]),
+    ("a" * 4094 + EMOJI * 2, [4096, 2]),
+    (EMOJI * 2049, [4096, 2]),
+    ("a" + EMOJI * 2048, [4095, 2]),
+])
+def test_surrogate_pairs_at_the_limit(text, sizes):
+    parts = split_message(text)
+    assert [utf16_len(part) for part in parts] == sizes
+    assert ''.join(parts) == text
+
+
+@pytest.mark.parametrize("text, limit, expected", [
+    # paragraf oxiri qator va gapdan ustun
+    ("birinchi gap. ikkinchi\n\nuchinchi qism", 30, ["birinchi gap. ikkinchi\n\n", "uchinchi qism"]),
+    ("birinchi qator\nikkinchi qator", 20, ["birinchi qator\n", "ikkinchi qator"]),
+    ("Birinchi gap. Ikkinchi gap davomi", 20, ["Birinchi gap. ", "Ikkinchi gap davomi"]),
+    ("soz soz soz soz soz soz", 10, ["soz soz ", "soz soz ", "soz soz"]),
+    # kesish joyi yarmidan oldin bo'lsa aynan limitda kesiladi
+    ("a " + "b" * 20, 10, ["a bbbbbbbb", "bbbbbbbbbb", "bb"]),
+])
+def test_plain_split_points(text, limit, expected):
+    assert split_message(text, limit) == expected
+
+
+@pytest.mark.parametrize("text, limit", [
+    ("kirish\n```python\n" + "\n".join(f"x{i} = {i}" for i in range(30)) + "\n```\noxiri", 60),
+    ("````\n" + "a\n" * 40 + "````", 30),
+    ("~~~\n" + "uzun qator " * 20 + "\n~~~\nmatn", 40),
+    ("```js\n" + (EMOJI + " ") * 60 + "\n```", 50),
+])
+def test_code_fence_is_reopened_in_every_part(text, limit):
+    parts = split_message(text, limit, mode='markdown')
+    assert len(parts) > 1
+    for part in parts:
+        assert open_fence(part) is None, part
+        # HTML ga o'girilgandan keyingi ko'rinadigan matn limitga sig'adi
+        assert utf16_len(visible(markdown_to_html(part))) <= limit
+
+
+def test_markdown_split_inside_code_keeps_language():
+    text = "```python\n" + "\n".join(f"x{i} = {i}" for i in range(10)) + "\n```"
+    parts = split_message(text, 40, mode='markdown')
+    assert parts[0].endswith("\n```")
+    assert all(part.startswith("```python\n") for part in parts)
+    assert '\n'.join(line for part in parts for line in part.split('\n') if not line.startswith("```")) == \
+        '\n'.join(f"x{i} = {i}" for i in range(10))
+
+
+@pytest.mark.parametrize("html, limit", [
+    ("<b>" + "soz " * 40 + "</b> <i>oxiri</i>", 50),
+    ('<pre><code class="language-py">' + "\n".join(f"x{i} = {i}" for i in range(20)) + "</code></pre>", 50),
+    ("<b>qalin <i>ichida " + "matn " * 30 + "</i> tugadi</b>", 40),
+    ('<a href="https://a.uz">' + "havola " * 20 + "</a>", 30),
+    ("&lt;" * 30, 10),
+    ("<b>" + "a" * 49 + EMOJI + "</b>", 50),
+    ("<i>" + EMOJI * 60 + "</i>", 50),
+])
+def test_html_tags_are_closed_and_reopened(html, limit):
+    parts = split_message(html, limit, mode='html')
+    assert len(parts) > 1
+    for part in parts:
+        assert utf16_len(visible(part)) <= limit
+    assert ''.join(visible(part) for part in parts) == visible(html)
+
+
+def test_html_reopens_tag_with_attributes():
+    parts = split_message('<a href="https://a.uz">' + "havola " * 20 + "</a>", 30, mode='html')
+    assert all(part.startswith('<a href="https://a.uz">') and part.endswith('</a>') for part in parts)
+
+
+def test_cut_is_none_when_text_fits():
+    splitter = MessageSplitter(mode='markdown')
+    assert splitter.cut("a" * (TELEGRAM_MESSAGE_LIMIT - 2) + EMOJI) is None
+    assert splitter.cut("a" * (TELEGRAM_MESSAGE_LIMIT - 1) + EMOJI) is not None
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        MessageSplitter(mode='rst')
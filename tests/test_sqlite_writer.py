@@ -0,0 +1,98 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from utils.db_api import sqlite as sqlite_module
+from utils.db_api import SQLiteDataManager
+from utils.db_api.sqlite import SQLiteWriter, get_writer
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(SQLiteWriter, 'RETRY_DELAY', 0.001)
+
+
+def _failing_apply(monkeypatch, should_fail):
+    """SQLiteWriter._apply ni `should_fail(ops)` True bo'lganda xato beradigan qilish"""
+    original = SQLiteWriter._apply
+
+    def apply(conn, ops):
+        error = should_fail(ops)
+        if error is not None:
+            raise error
+        original(conn, ops)
+
+    monkeypatch.setattr(SQLiteWriter, '_apply', staticmethod(apply))
+
+
+def _history(db_path, user_id):
+    manager = SQLiteDataManager('openai', db_path=db_path)
+    return [message.content for message in manager.get_user_data(user_id)]
+
+
+def test_locked_database_is_retried(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'history.db')
+    failures = iter([sqlite3.OperationalError("database is locked")] * 2)
+    _failing_apply(monkeypatch, lambda ops: next(failures, None) if ops else None)
+
+    async def scenario():
+        manager = SQLiteDataManager('openai', db_path=db_path)
+        manager.add_message('1', 'user', 'salom')
+        await manager.close()
+
+    asyncio.run(scenario())
+    assert _history(db_path, '1') == ['salom']
+
+
+@pytest.mark.parametrize('error', [sqlite3.IntegrityError("constraint"), ValueError("bug")])
+def test_failed_ops_are_rewritten_on_next_flush(tmp_path, monkeypatch, error):
+    db_path = str(tmp_path / 'history.db')
+    broken = {'active': True}
+    # '2' foydalanuvchining operatsiyalari yozilmaydi, '1' niki - bittadan yozishda o'tadi
+    _failing_apply(monkeypatch, lambda ops: error if broken['active'] and any(op[2] == '2' for op in ops) else None)
+
+    async def scenario():
+        manager = SQLiteDataManager('openai', db_path=db_path)
+        manager.add_message('1', 'user', 'birinchi')
+        manager.add_message('2', 'user', 'ikkinchi')
+        manager.add_message('2', 'assistant', 'javob')
+        await manager.flush()
+        writer = get_writer(db_path)
+        assert writer.is_alive()
+        assert ('openai', '2') in writer.failed
+
+        broken['active'] = False
+        await manager.close()
+        assert not writer.failed
+
+    asyncio.run(scenario())
+    assert _history(db_path, '1') == ['birinchi']
+    assert _history(db_path, '2') == ['ikkinchi', 'javob']
+
+
+def test_flush_does_not_hang_on_a_stuck_writer(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'history.db')
+    release = threading.Event()
+    _failing_apply(monkeypatch, lambda ops: None if not ops or release.wait(5) else None)
+
+    manager = SQLiteDataManager('openai', db_path=db_path)
+    manager.storage.flush_timeout = 0.2
+    manager.add_message('1', 'user', 'salom')
+    payload = manager.storage.prepare(manager._data)
+    with pytest.raises(TimeoutError):
+        manager.storage.write(payload)
+    release.set()
+    assert get_writer(db_path).wait_flushed(5)
+
+
+def test_dead_writer_is_restarted_with_its_queue(tmp_path):
+    db_path = str(tmp_path / 'history.db')
+    manager = SQLiteDataManager('openai', db_path=db_path)
+    stale = SQLiteWriter(db_path)  # hech qachon ishga tushmagan (o'lgan) thread
+    sqlite_module._writers[db_path] = stale
+    manager.add_message('1', 'user', 'salom')
+    manager.flush_sync()
+    assert get_writer(db_path) is not stale
+    assert _history(db_path, '1') == ['salom']
@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from middlewares import throttling
+from middlewares.throttling import ThrottleManager, Throttled, ThrottlingMiddleware
+
+
+class FakeClock:
+    """time moduli o'rniga: Redis yo'li time(), lokal yo'l monotonic() dan foydalanadi"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(throttling, "time", fake)
+    return fake
+
+
+async def _attempt(manager: ThrottleManager, rate: float = 1.0):
+    try:
+        await manager.throttle("msg", rate=rate, user_id=1, chat_id=1)
+    except Throttled as t:
+        return 0, round(t.retry_after, 3), t.exceeded_count
+    return 1, 0.0, 0
+
+
+# (oldingi so'rovdan keyin o'tgan vaqt, kutilgan natija: ruxsat, retry_after, exceeded)
+SCENARIO = [
+    (0.0, (1, 0.0, 0)),
+    (0.0, (1, 0.0, 0)),
+    (0.0, (1, 0.0, 0)),
+    # burst tugadi
+    (0.0, (0, 1.0, 1)),
+    (0.25, (0, 0.75, 2)),
+    # bitta token qayta to'ldi
+    (0.75, (1, 0.0, 0)),
+    (0.0, (0, 1.0, 1)),
+    # uzoq tanaffusdan keyin faqat `burst` ta so'rov
+    (10.0, (1, 0.0, 0)),
+    (0.0, (1, 0.0, 0)),
+    (0.0, (1, 0.0, 0)),
+    (0.0, (0, 1.0, 1)),
+    # yarim interval: yangi token yo'q
+    (0.5, (0, 0.5, 2)),
+    (0.5, (1, 0.0, 0)),
+]
+
+
+def _run(manager: ThrottleManager, clock: FakeClock):
+    async def scenario():
+        results = []
+        for elapsed, _ in SCENARIO:
+            clock.now += elapsed
+            results.append(await _attempt(manager))
+        return results
+
+    return asyncio.run(scenario())
+
+
+def test_local_gcra_burst_and_refill(clock):
+    assert _run(ThrottleManager(burst=3), clock) == [expected for _, expected in SCENARIO]
+
+
+def test_redis_script_matches_local_fallback(clock):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis Lua skriptlarni lupa orqali bajaradi
+    local = _run(ThrottleManager(burst=3), clock)
+    remote = _run(ThrottleManager(redis=fakeredis.FakeAsyncRedis(), burst=3), clock)
+    assert remote == local == [expected for _, expected in SCENARIO]
+
+
+def test_buckets_are_per_user_and_key(clock):
+    manager = ThrottleManager(burst=1)
+
+    async def scenario():
+        await manager.throttle("msg", rate=1, user_id=1, chat_id=1)
+        await manager.throttle("msg", rate=1, user_id=2, chat_id=2)
+        await manager.throttle("other", rate=1, user_id=1, chat_id=1)
+        with pytest.raises(Throttled):
+            await manager.throttle("msg", rate=1, user_id=1, chat_id=1)
+
+    asyncio.run(scenario())
+
+
+def test_local_buckets_are_evicted(clock):
+    manager = ThrottleManager(burst=1, max_local_keys=10)
+
+    async def scenario():
+        for user_id in range(10):
+            await manager.throttle("msg", rate=1, user_id=user_id, chat_id=user_id)
+        clock.now += 5
+        await manager.throttle("msg", rate=1, user_id=99, chat_id=99)
+
+    asyncio.run(scenario())
+    assert len(manager._local) == 1
+
+
+class FakeMessage:
+    def __init__(self):
+        self.from_user = SimpleNamespace(id=1)
+        self.chat = SimpleNamespace(id=1)
+        self.answers = []
+
+    async def answer(self, text: str):
+        self.answers.append(text)
+
+
+def test_middleware_warns_only_for_first_rejections(clock):
+    middleware = ThrottlingMiddleware(limit=1, burst=1)
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event)
+
+    async def scenario():
+        message = FakeMessage()
+        for _ in range(5):
+            await middleware(handler, message, {})
+        return message
+
+    message = asyncio.run(scenario())
+    assert len(handled) == 1
+    assert message.answers == ['Too many events.\nTry again in 1.00 seconds.'] * 2
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import signal
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp.test_utils import TestClient, TestServer
+
+from bench.fake_telegram import FakeTelegram, start_fake_telegram
+from utils.supervisor import Supervisor
+from utils.webhook import create_webhook_app, run_webhook
+
+
+def test_malformed_update_is_rejected_with_400():
+    async def scenario():
+        for app in (create_webhook_app(Dispatcher(), Bot("42:TEST"), "/webhook", None),
+                    Supervisor(bot=None, workers=1).webhook_app("/webhook", None)):
+            async with TestClient(TestServer(app)) as client:
+                for body in (b"{not json", b"[1, 2]"):
+                    response = await client.post("/webhook", data=body)
+                    assert response.status == 400
+
+    asyncio.run(scenario())
+
+
+def test_missing_base_url_fails_fast():
+    async def scenario():
+        with pytest.raises(ValueError, match="WEBHOOK_BASE_URL"):
+            await run_webhook(Dispatcher(), Bot("42:TEST"), base_url=None, path="/webhook",
+                              secret_token=None, host="127.0.0.1", port=0)
+
+    asyncio.run(scenario())
+
+
+def test_sigterm_runs_shutdown_handlers():
+    async def scenario():
+        fake = FakeTelegram()
+        runner, base_url = await start_fake_telegram(fake)
+        bot = Bot("42:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+        dp = Dispatcher()
+        shutdown = asyncio.Event()
+        dp.shutdown.register(shutdown.set)
+
+        server = asyncio.create_task(run_webhook(dp, bot, base_url="https://bot.example.com", path="/webhook",
+                                                 secret_token=None, host="127.0.0.1", port=0))
+        while not fake.calls["setWebhook"]:
+            await asyncio.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(server, 5)
+        assert shutdown.is_set()
+        await bot.session.close()
+        await runner.cleanup()
+
+    asyncio.run(scenario())
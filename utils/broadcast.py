@@ -0,0 +1,449 @@
+"""
+Foydalanuvchilarga ommaviy xabar (broadcast) yuborish.
+
+Barcha yuborishlar bitta token bucket orqali o'tadi (Telegram bot uchun
+sekundiga ~30 xabar), har bir chatga esa `chat_interval` da bir martadan
+ko'p yuborilmaydi. Oddiy chat trafigi bucketni kutmaydi, lekin
+`OutgoingBudget` session middleware i orqali undan token oladi - shuning
+uchun bot band bo'lganda broadcast o'zi sekinlashadi.
+
+Broadcast holati `state_dir` da saqlanadi: qabul qiluvchilar ro'yxati
+(bir marta), progress (`job.json`, har `checkpoint_interval` sekundda) va
+botni bloklagan foydalanuvchilar (`blocked.txt`; botga yana yozgan
+foydalanuvchi ro'yxatdan chiqariladi). To'xtatilgan broadcast keyingi ishga
+tushishda davom ettiriladi.
+
+Ko'p jarayonli rejimda supervisor admin broadcast buyruqlarini barcha
+workerlarga yuboradi (`is_fanout_command`): har bir worker o'z
+foydalanuvchilariga `BROADCAST_RATE / WORKERS` tezlikda yuboradi, holat esa
+`<state_dir>/w<N>/job.json` fayllaridan yig'iladi (`combined_summary`).
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter,
+    TelegramServerError
+)
+
+from utils import metrics
+from utils.json_manager.storage import atomic_write
+from utils.misc.rate_limiter import SlidingWindowLimiter
+
+logger = logging.getLogger(__name__)
+
+# Broadcast ichidan yuborilayotgan so'rovlar (OutgoingBudget ularni qayta hisoblamaydi)
+broadcasting: contextvars.ContextVar[bool] = contextvars.ContextVar('broadcasting', default=False)
+
+SENT, BLOCKED, FAILED = 'sent', 'blocked', 'failed'
+# Ko'p jarayonli rejimda barcha workerlarga yuboriladigan admin buyruqlari
+FANOUT_COMMANDS = frozenset({'broadcast', 'broadcast_cancel'})
+
+
+def _format_summary(title: str, status: str, processed: int, total: int, counts: Dict[str, int]) -> str:
+    progress = f" ({processed}/{total})" if status == 'running' else ''
+    return (f"{title}: {status}{progress}\n"
+            f"✅ yuborildi: {counts[SENT]}\n"
+            f"🚫 bloklagan: {counts[BLOCKED]}\n"
+            f"⚠️ xatolik: {counts[FAILED]}")
+
+
+class TokenBucket:
+    """
+    Sekundiga `rate` ta token, ko'pi bilan `burst` ta yig'iladi (standart: 0.2 sekundlik -
+    Telegram limiti sekund oynasida hisoblanadi, katta burst uni oshirib yuboradi).
+
+    `acquire` token bo'lguncha kutadi; `consume` kutmaydi va balansni
+    manfiy qilishi mumkin (boshqa trafik uchun); `pause` - RetryAfter dan
+    keyin butun bucketni to'xtatib turish.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate / 5)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, amount: float = 1.0) -> None:
+        self._refill(time.monotonic())
+        # Qarz burst dan oshmaydi, aks holda broadcast uzoq to'xtab qoladi
+        self._tokens = max(-self.burst, self._tokens - amount)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BroadcastJob:
+    """
+    Bitta broadcast: qabul qiluvchilar, xabar va progress.
+
+    Bir nechta yuborish parallel bo'lgani uchun progress `cursor` (undan
+    oldingilarining hammasi tugagan) va `done` (cursor dan keyin tugaganlar,
+    ko'pi bilan `concurrency` ta) bilan saqlanadi - davom ettirilganda hech
+    kimga ikki marta yuborilmaydi (`drain_timeout` ichida tugamagan yuborishlardan tashqari).
+    """
+
+    def __init__(self, job_id: str, recipients: List[str], text: Optional[str] = None,
+                 copy_from: Optional[Tuple[int, int]] = None):
+        self.id = job_id
+        self.recipients = recipients
+        self.text = text
+        self.copy_from = copy_from  # (chat_id, message_id) - xabar copyMessage bilan yuboriladi
+        self.cursor = 0
+        self.done: Set[int] = set()
+        self.counts = {SENT: 0, BLOCKED: 0, FAILED: 0}
+        self.status = 'running'  # running | done | cancelled | failed
+        self.started_at = datetime.now().isoformat()
+        self.finished_at: Optional[str] = None
+        self._next = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.recipients)
+
+    @property
+    def processed(self) -> int:
+        return sum(self.counts.values())
+
+    def take(self) -> Optional[int]:
+        """Navbatdagi hali yuborilmagan qabul qiluvchi indeksi"""
+        self._next = max(self._next, self.cursor)
+        while self._next in self.done:
+            self._next += 1
+        if self._next >= len(self.recipients):
+            return None
+        index, self._next = self._next, self._next + 1
+        return index
+
+    def complete(self, index: int, result: str) -> None:
+        self.counts[result] += 1
+        self.done.add(index)
+        while self.cursor in self.done:
+            self.done.remove(self.cursor)
+            self.cursor += 1
+
+    def summary(self) -> str:
+        return _format_summary(f"Broadcast {self.id}", self.status, self.processed, self.total, self.counts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id, 'text': self.text, 'copy_from': self.copy_from, 'total': self.total,
+            'cursor': self.cursor, 'done': sorted(self.done), 'counts': self.counts,
+            'status': self.status, 'started_at': self.started_at, 'finished_at': self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], recipients: List[str]) -> "BroadcastJob":
+        copy_from = data.get('copy_from')
+        job = cls(data['id'], recipients, text=data.get('text'), copy_from=tuple(copy_from) if copy_from else None)
+        job.cursor = data.get('cursor', 0)
+        job.done = set(data.get('done') or ())
+        job.counts.update(data.get('counts') or {})
+        job.status = data.get('status', 'running')
+        job.started_at = data.get('started_at', job.started_at)
+        job.finished_at = data.get('finished_at')
+        return job
+
+
+class Broadcaster:
+    """Broadcast va admin xabarnomalarini yuboruvchi: bir vaqtda bitta broadcast fon vazifasida"""
+
+    def __init__(self, bot: Bot, state_dir: str = 'data/broadcast', rate: float = 25.0,
+                 chat_interval: float = 1.0, concurrency: int = 8, retries: int = 3,
+                 checkpoint_interval: float = 2.0, drain_timeout: float = 5.0):
+        self.bot = bot
+        self.state_dir = state_dir
+        self.bucket = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.checkpoint_interval = checkpoint_interval
+        self.drain_timeout = drain_timeout
+        self.job: Optional[BroadcastJob] = None
+        self._chats = SlidingWindowLimiter(1, chat_interval)
+        self._blocked: Optional[Set[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def job_path(self) -> str:
+        return os.path.join(self.state_dir, 'job.json')
+
+    def _recipients_path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f'recipients-{job_id}.txt')
+
+    @property
+    def blocked(self) -> Set[str]:
+        """Botni bloklagan foydalanuvchilar (keyingi broadcastlarda o'tkazib yuboriladi)"""
+        if self._blocked is None:
+            path = os.path.join(self.state_dir, 'blocked.txt')
+            self._blocked = set()
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as file:
+                    self._blocked.update(line.strip() for line in file if line.strip())
+        return self._blocked
+
+    def unblock(self, chat_id: str) -> bool:
+        """Foydalanuvchi botga yana yozdi: keyingi broadcastlarda unga ham yuboriladi"""
+        if chat_id not in self.blocked:
+            return False
+        self.blocked.discard(chat_id)
+        atomic_write(os.path.join(self.state_dir, 'blocked.txt'), (f"{user}\n" for user in self.blocked))
+        return True
+
+    def _block(self, chat_id: str) -> None:
+        if chat_id in self.blocked:
+            return
+        self.blocked.add(chat_id)
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(os.path.join(self.state_dir, 'blocked.txt'), 'a', encoding='utf-8') as file:
+            file.write(f"{chat_id}\n")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _send(self, chat_id: str, text: Optional[str] = None,
+                    copy_from: Optional[Tuple[int, int]] = None, **kwargs) -> str:
+        """Bitta chatga yuborish: per-chat interval, umumiy bucket, RetryAfter va tarmoq xatolarida qayta urinish"""
+        for attempt in range(self.retries + 1):
+            wait = self._chats.hit(chat_id)
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self._chats.hit(chat_id)
+            await self.bucket.acquire()
+            token = broadcasting.set(True)
+            try:
+                if copy_from is not None:
+                    await self.bot.copy_message(chat_id, *copy_from, **kwargs)
+                else:
+                    await self.bot.send_message(chat_id, text, **kwargs)
+                return SENT
+            except TelegramRetryAfter as e:
+                # Flood limit butun bot uchun: barcha yuborishlar to'xtaydi
+                self.bucket.pause(e.retry_after)
+                metrics.broadcast_retry_after.inc()
+            except TelegramForbiddenError:
+                return BLOCKED
+            except TelegramBadRequest as e:
+                logger.warning(f"Broadcast to {chat_id} failed: {e}")
+                return FAILED
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning(f"Broadcast to {chat_id} failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+            except TelegramAPIError as e:
+                logger.warning(f"Broadcast to {chat_id} failed: {e}")
+                return FAILED
+            finally:
+                broadcasting.reset(token)
+        return FAILED
+
+    async def deliver(self, chat_ids: Iterable[str], text: str, **kwargs) -> Dict[str, int]:
+        """Kichik ro'yxatga (masalan, adminlarga) darhol yuborish, checkpointsiz"""
+        chat_ids = list(dict.fromkeys(str(chat_id) for chat_id in chat_ids))
+        results = await asyncio.gather(*(self._send(chat_id, text, **kwargs) for chat_id in chat_ids))
+        counts = {SENT: 0, BLOCKED: 0, FAILED: 0}
+        for result in results:
+            counts[result] += 1
+            metrics.broadcast_messages.labels(result).inc()
+        return counts
+
+    async def start(self, recipients: Iterable[str], text: Optional[str] = None,
+                    copy_from: Optional[Tuple[int, int]] = None) -> BroadcastJob:
+        """Yangi broadcast ni fon vazifasi sifatida boshlash (bloklaganlar chiqarib tashlanadi)"""
+        if self.running:
+            raise RuntimeError("Another broadcast is already running")
+        blocked = self.blocked
+        recipients = [chat_id for chat_id in dict.fromkeys(map(str, recipients)) if chat_id not in blocked]
+        job = BroadcastJob(uuid.uuid4().hex[:8], recipients, text=text, copy_from=copy_from)
+        os.makedirs(self.state_dir, exist_ok=True)
+        await asyncio.to_thread(atomic_write, self._recipients_path(job.id), ('\n'.join(recipients),))
+        await self._checkpoint(job)
+        self._launch(job)
+        return job
+
+    def resume(self) -> Optional[BroadcastJob]:
+        """
+        Oldingi ishga tushishda tugamay qolgan broadcast ni davom ettirish.
+
+        Holat fayllari buzilgan yoki yo'qolgan bo'lsa, broadcast `failed` deb
+        belgilanadi (bot ishga tushishi to'xtamaydi).
+        """
+        if self.running or not os.path.exists(self.job_path):
+            return None
+        try:
+            with open(self.job_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if not isinstance(data, dict):
+                raise ValueError("job.json is not an object")
+        except (OSError, ValueError) as e:
+            logger.error(f"Broadcast state {self.job_path} is unreadable, moving it aside: {e}")
+            os.replace(self.job_path, self.job_path + '.corrupt')
+            return None
+        if data.get('status') != 'running':
+            return None
+
+        try:
+            with open(self._recipients_path(data['id']), 'r', encoding='utf-8') as file:
+                recipients = file.read().split()
+            if 'total' in data and len(recipients) != data['total']:
+                raise ValueError(f"expected {data['total']} recipients, found {len(recipients)}")
+            job = BroadcastJob.from_dict(data, recipients)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Broadcast {data.get('id')} cannot be resumed: {e!r}")
+            data.update(status='failed', error=repr(e), finished_at=datetime.now().isoformat())
+            atomic_write(self.job_path, (json.dumps(data, ensure_ascii=False),))
+            return None
+        logger.info(f"Resuming broadcast {job.id} at {job.processed}/{job.total}")
+        self._launch(job)
+        return job
+
+    def _launch(self, job: BroadcastJob) -> None:
+        self.job = job
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(job))
+
+    def _save(self, job: BroadcastJob) -> None:
+        atomic_write(self.job_path, (json.dumps(job.to_dict(), ensure_ascii=False),))
+
+    async def _checkpoint(self, job: BroadcastJob) -> None:
+        await asyncio.to_thread(atomic_write, self.job_path, (json.dumps(job.to_dict(), ensure_ascii=False),))
+
+    async def _run(self, job: BroadcastJob) -> None:
+        async def worker():
+            while not self._stopping:
+                index = job.take()
+                if index is None:
+                    return
+                chat_id = job.recipients[index]
+                if job.copy_from is not None:
+                    result = await self._send(chat_id, copy_from=job.copy_from)
+                else:
+                    result = await self._send(chat_id, job.text, parse_mode=None)
+                if result == BLOCKED:
+                    self._block(chat_id)
+                metrics.broadcast_messages.labels(result).inc()
+                job.complete(index, result)
+
+        workers = asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        try:
+            while not workers.done():
+                await asyncio.wait((workers,), timeout=self.checkpoint_interval)
+                await self._checkpoint(job)
+            await workers
+            if job.status == 'running' and self._stopping:
+                # Bot to'xtayapti: progress saqlanadi, keyingi ishga tushishda davom etadi
+                await self._checkpoint(job)
+                return
+            if job.status == 'running':
+                job.status = 'done'
+        except asyncio.CancelledError:
+            # Yo'lda qolgan yuborishlar tugamagan hisoblanadi va davomida qayta yuboriladi
+            if job.status != 'running':
+                job.finished_at = datetime.now().isoformat()
+            self._save(job)
+            raise
+        except Exception as e:
+            logger.exception(f"Broadcast {job.id} stopped: {e}")
+            job.status = 'cancelled'
+        finally:
+            workers.cancel()
+            # Bekor qilingan gather ning xatosi "never retrieved" deb logga tushmasligi uchun
+            workers.add_done_callback(lambda future: future.cancelled() or future.exception())
+        job.finished_at = datetime.now().isoformat()
+        self._save(job)
+        logger.info(job.summary().replace('\n', ', '))
+
+    async def cancel(self) -> Optional[BroadcastJob]:
+        """Joriy broadcast ni butunlay to'xtatish (davom ettirilmaydi)"""
+        if not self.running:
+            return None
+        job = self.job
+        job.status = 'cancelled'
+        await self.close()
+        return job
+
+    async def close(self) -> None:
+        """
+        Bot to'xtaganda: yangi yuborishlar boshlanmaydi, yo'ldagilar `drain_timeout` gacha
+        kutiladi, progress saqlanadi va broadcast keyingi ishga tushishda davom etadi.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), self.drain_timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+def known_user_ids(data_managers: Iterable) -> List[str]:
+    """Chat tarixlaridagi (xotira va arxiv) barcha foydalanuvchilar, ID bo'yicha tartiblangan"""
+    user_ids: Set[str] = set()
+    for manager in data_managers:
+        user_ids.update(manager.user_ids())
+    return sorted(user_ids, key=lambda user_id: (len(user_id), user_id))
+
+
+def is_fanout_command(update: Dict[str, Any], admins: Iterable[str]) -> bool:
+    """Supervisor uchun: raw update - admindan kelgan /broadcast yoki /broadcast_cancel"""
+    message = update.get('message')
+    if not isinstance(message, dict):
+        return False
+    text = message.get('text') or ''
+    if not text.startswith('/'):
+        return False
+    command = (text[1:].split(maxsplit=1) or [''])[0].split('@', 1)[0]
+    sender = (message.get('from') or {}).get('id')
+    return command in FANOUT_COMMANDS and str(sender) in {str(admin) for admin in admins}
+
+
+def combined_summary(state_dir: str) -> Optional[str]:
+    """Ko'p jarayonli rejim: barcha workerlarning (`w<N>/job.json`) oxirgi saqlangan progressi"""
+    states = []
+    if os.path.isdir(state_dir):
+        for name in sorted(os.listdir(state_dir)):
+            path = os.path.join(state_dir, name, 'job.json')
+            if name.startswith('w') and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as file:
+                    states.append((name, json.load(file)))
+    if not states:
+        return None
+    counts = {SENT: 0, BLOCKED: 0, FAILED: 0}
+    for _, state in states:
+        for result, count in (state.get('counts') or {}).items():
+            counts[result] += count
+    statuses = {state.get('status') for _, state in states}
+    status = next((status for status in ('running', 'failed', 'cancelled') if status in statuses), 'done')
+    total = sum(state.get('total', 0) for _, state in states)
+    workers = ', '.join(f"{name}: {state.get('status')}" for name, state in states)
+    return _format_summary("Broadcast", status, sum(counts.values()), total, counts) + f"\n{workers}"
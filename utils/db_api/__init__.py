@@ -0,0 +1 @@
+from .sqlite import SQLiteDataManager, migrate_from_json
@@ -0,0 +1,316 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from utils.json_manager.manager import JSONDataManager
+from utils.json_manager.storage import BaseStorage
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    provider TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    last_message_time TEXT,
+    summary TEXT,
+    PRIMARY KEY (provider, user_id)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_user ON messages (provider, user_id, id);
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """WAL rejimidagi SQLite ulanishini ochish"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    # Eski bazalarda suhbat xulosasi ustuni bo'lmaydi
+    if 'summary' not in {row[1] for row in conn.execute("PRAGMA table_info(users)")}:
+        conn.execute("ALTER TABLE users ADD COLUMN summary TEXT")
+    return conn
+
+
+class SQLiteWriter(threading.Thread):
+    """
+    Bitta baza fayli uchun yagona yozuvchi thread.
+
+    Handlerlar operatsiyalarni navbatga qo'yadi, thread esa navbatda
+    to'planganlarning hammasini bitta tranzaksiyada yozadi.
+
+    Tranzaksiya xato bersa, rollback qilinadi va `retries` marta qayta
+    uriniladi (masalan, "database is locked"); baribir o'tmasa, operatsiyalar
+    bittadan yoziladi va o'tmaganlarining foydalanuvchilari `failed` ga
+    qo'shiladi - SQLiteStorage keyingi flush da ularni xotiradan to'liq
+    qayta yozadi. Kutilmagan xatolar ham thread ni to'xtatmaydi.
+    """
+
+    RETRY_DELAY = 0.1  # sekund, har urinishda ikki baravar
+
+    def __init__(self, db_path: str, batch_size: int = 500, retries: int = 3):
+        super().__init__(name=f"sqlite-writer:{db_path}", daemon=True)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.retries = retries
+        self.queue: "queue.Queue[tuple]" = queue.Queue()
+        # Yozilmay qolgan (provider, user_id) lar
+        self.failed: Set[Tuple[str, str]] = set()
+        self._failed_lock = threading.Lock()
+
+    def run(self) -> None:
+        conn: Optional[sqlite3.Connection] = None
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            barriers = [op[1] for op in batch if op[0] == 'barrier']
+            ops = [op for op in batch if op[0] != 'barrier']
+            try:
+                if conn is None:
+                    conn = connect(self.db_path)
+                self._commit(conn, ops)
+            except Exception as e:
+                logger.exception(f"SQLite writer failed on a batch of {len(ops)} ops: {e}")
+                self._mark_failed(ops)
+            finally:
+                for event in barriers:
+                    event.set()
+
+    def _commit(self, conn: sqlite3.Connection, ops: List[tuple]) -> None:
+        """Batch ni bitta tranzaksiyada yozish; o'tmasa - qayta urinish, so'ng bittadan"""
+        for attempt in range(self.retries + 1):
+            try:
+                with conn:  # xatoda rollback
+                    self._apply(conn, ops)
+                return
+            except sqlite3.OperationalError as e:
+                logger.warning(f"SQLite batch of {len(ops)} ops failed (attempt {attempt + 1}): {e}")
+                time.sleep(self.RETRY_DELAY * 2 ** attempt)
+            except Exception as e:
+                logger.warning(f"SQLite batch of {len(ops)} ops failed: {e}")
+                break
+
+        for op in ops:
+            try:
+                with conn:
+                    self._apply(conn, [op])
+            except Exception as e:
+                logger.error(f"SQLite {op[0]} op for {op[1]}:{op[2]} failed, will be rewritten: {e}")
+                self._mark_failed([op])
+
+    def _mark_failed(self, ops: List[tuple]) -> None:
+        with self._failed_lock:
+            self.failed.update((op[1], op[2]) for op in ops)
+
+    def take_failed(self, provider: str) -> List[str]:
+        """Provayderning yozilmay qolgan foydalanuvchilari (ro'yxatdan olib tashlanadi)"""
+        with self._failed_lock:
+            user_ids = [user_id for name, user_id in self.failed if name == provider]
+            self.failed.difference_update((provider, user_id) for user_id in user_ids)
+        return user_ids
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, ops: List[tuple]) -> None:
+        trimmed = {}
+        for op in ops:
+            kind, provider, user_id = op[0], op[1], op[2]
+            if kind == 'add':
+                _, _, _, role, content, last_time, keep = op
+                # Har bir xabar faollik vaqtini yangilaydi (janitor TTL shu ustun bo'yicha)
+                conn.execute(
+                    "INSERT INTO users (provider, user_id, last_message_time) VALUES (?, ?, ?) "
+                    "ON CONFLICT (provider, user_id) DO UPDATE SET last_message_time = excluded.last_message_time",
+                    (provider, user_id, last_time)
+                )
+                conn.execute(
+                    "INSERT INTO messages (provider, user_id, role, content) VALUES (?, ?, ?, ?)",
+                    (provider, user_id, role, content)
+                )
+                trimmed[(provider, user_id)] = keep
+            elif kind == 'set':
+                _, _, _, messages, last_time, summary = op
+                conn.execute(
+                    "INSERT INTO users (provider, user_id, last_message_time, summary) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (provider, user_id) DO UPDATE SET "
+                    "last_message_time = excluded.last_message_time, summary = excluded.summary",
+                    (provider, user_id, last_time, summary)
+                )
+                conn.execute("DELETE FROM messages WHERE provider = ? AND user_id = ?", (provider, user_id))
+                conn.executemany(
+                    "INSERT INTO messages (provider, user_id, role, content) VALUES (?, ?, ?, ?)",
+                    [(provider, user_id, role, content) for role, content in messages]
+                )
+            elif kind == 'del':
+                conn.execute("DELETE FROM users WHERE provider = ? AND user_id = ?", (provider, user_id))
+                conn.execute("DELETE FROM messages WHERE provider = ? AND user_id = ?", (provider, user_id))
+
+        # Har bir foydalanuvchi uchun eski xabarlarni bir marta o'chirish
+        for (provider, user_id), keep in trimmed.items():
+            conn.execute(
+                "DELETE FROM messages WHERE provider = ? AND user_id = ? AND id NOT IN ("
+                "SELECT id FROM messages WHERE provider = ? AND user_id = ? ORDER BY id DESC LIMIT ?)",
+                (provider, user_id, provider, user_id, keep)
+            )
+
+    def wait_flushed(self, timeout: Optional[float] = 30.0) -> bool:
+        """Navbatdagi barcha operatsiyalar commit bo'lishini kutish; `timeout` o'tsa False"""
+        event = threading.Event()
+        self.queue.put(('barrier', event))
+        return event.wait(timeout)
+
+
+_writers: Dict[str, SQLiteWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: str) -> SQLiteWriter:
+    """Baza fayli uchun yagona writer thread ni olish (kerak bo'lsa ishga tushirish)"""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None or not writer.is_alive():
+            previous = writer
+            writer = _writers[db_path] = SQLiteWriter(db_path)
+            if previous is not None:
+                # Navbatdagi operatsiyalar yo'qolmasligi uchun yangi thread shu navbatni davom ettiradi
+                logger.error(f"SQLite writer for {db_path} is not running, restarting")
+                writer.queue, writer.failed = previous.queue, previous.failed
+            writer.start()
+        return writer
+
+
+class SQLiteStorage(BaseStorage):
+    """JSONDataManager uchun SQLite backend: o'zgarishlar writer thread navbatiga yuboriladi"""
+
+    def __init__(self, db_path: str, provider: str, flush_timeout: float = 30.0):
+        self.db_path = db_path
+        self.provider = provider
+        self.flush_timeout = flush_timeout
+        self._recorded = 0
+
+    @property
+    def writer(self) -> SQLiteWriter:
+        return get_writer(self.db_path)
+
+    def load(self) -> Dict[str, Any]:
+        conn = connect(self.db_path)
+        try:
+            data = {}
+            for user_id, last_time, summary in conn.execute(
+                    "SELECT user_id, last_message_time, summary FROM users WHERE provider = ?", (self.provider,)
+            ):
+                data[user_id] = {'messages': [], 'last_message_time': last_time}
+                if summary:
+                    data[user_id]['summary'] = summary
+            for user_id, role, content in conn.execute(
+                    "SELECT user_id, role, content FROM messages WHERE provider = ? ORDER BY user_id, id",
+                    (self.provider,)
+            ):
+                if user_id in data:
+                    data[user_id]['messages'].append({"role": role, "content": content})
+        finally:
+            conn.close()
+        return data
+
+    def record(self, user_id, user_data, message=None) -> None:
+        self._recorded += 1
+        if user_data is None:
+            self.writer.queue.put(('del', self.provider, user_id))
+        elif message is not None:
+            self.writer.queue.put((
+                'add', self.provider, user_id, message.role, message.content,
+                user_data.last_message_time, self.max_messages
+            ))
+        else:
+            self.writer.queue.put((
+                'set', self.provider, user_id, [(message.role, message.content) for message in user_data],
+                user_data.last_message_time, user_data.summary or None
+            ))
+
+    @property
+    def pending(self) -> int:
+        # Writer thread navbatni o'zi bo'shatadi, manager flush ni tezlashtirishi shart emas
+        return 0
+
+    def prepare(self, data):
+        # Writer yoza olmagan foydalanuvchilar xotiradagi holatidan to'liq qayta yoziladi
+        for user_id in self.writer.take_failed(self.provider):
+            self.record(user_id, data.get(user_id))
+        if not self._recorded:
+            return None
+        self._recorded = 0
+        return True
+
+    def write(self, payload) -> None:
+        writer = self.writer
+        if not writer.wait_flushed(self.flush_timeout):
+            raise TimeoutError(f"SQLite writer did not commit within {self.flush_timeout:.0f}s")
+        if any(provider == self.provider for provider, _ in list(writer.failed)):
+            raise RuntimeError("some SQLite writes failed and will be retried on the next flush")
+
+    def disk_size(self) -> Optional[int]:
+        return os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+
+    def rollback(self, payload) -> None:
+        # Operatsiyalar writer navbatida yoki `failed` da qoladi: keyingi flush yana kutadi
+        self._recorded += 1
+
+
+class SQLiteDataManager(JSONDataManager):
+    """JSONDataManager bilan bir xil API, lekin ma'lumotlar SQLite (WAL) bazasida saqlanadi"""
+
+    def __init__(self, provider: str, db_path: str = 'data/chat_story/history.db', **kwargs):
+        self.provider = provider
+        super().__init__(file_path=db_path, storage=SQLiteStorage(db_path, provider), **kwargs)
+
+    def metrics_label(self) -> str:
+        return f"sqlite:{self.provider}"
+
+
+def migrate_from_json(json_paths: Dict[str, str], db_path: str = 'data/chat_story/history.db') -> Dict[str, int]:
+    """Mavjud JSON fayllardagi tarixni bir martalik SQLite ga ko'chirish"""
+    from utils.json_manager.storage import JSONFileStorage
+
+    conn = connect(db_path)
+    migrated = {}
+    try:
+        with conn:
+            for provider, json_path in json_paths.items():
+                data = JSONFileStorage(json_path).load()
+                for user_id, user_data in data.items():
+                    SQLiteWriter._apply(conn, [(
+                        'set', provider, user_id,
+                        [(message['role'], message['content']) for message in user_data.get('messages', [])],
+                        user_data.get('last_message_time') or datetime.now().isoformat(),
+                        user_data.get('summary')
+                    )])
+                migrated[provider] = len(data)
+    finally:
+        conn.close()
+    return migrated
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    result = migrate_from_json({
+        'openai': 'data/chat_story/openai_data.json',
+        'gemini': 'data/chat_story/gemini_data.json',
+        'deepseek': 'data/chat_story/deepseek_data.json',
+    })
+    for name, count in result.items():
+        logger.info(f"{name}: {count} users migrated")
@@ -0,0 +1,3 @@
+from .cache import CachedStorage
+from .redis_storage import CachedRedisStorage
+from .sqlite_storage import SQLiteStorage
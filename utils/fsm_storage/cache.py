@@ -0,0 +1,84 @@
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+# (state, data)
+Record = Tuple[Optional[str], Dict[str, Any]]
+
+
+class CachedStorage(BaseStorage):
+    """
+    FSM storage uchun umumiy asos: o'qishlar kichik LRU+TTL keshdan beriladi,
+    yozishlar esa backendga darhol yuboriladi (write-through).
+
+    Har bir update uchun chaqiriladigan get_state odatda keshdan qaytadi.
+    Bitta foydalanuvchi bitta jarayonda qayta ishlansa kesh doim to'g'ri;
+    aks holda `cache_ttl` eskirish vaqtini chegaralaydi.
+    """
+
+    def __init__(self, key_builder: Optional[KeyBuilder] = None, cache_size: int = 10000,
+                 cache_ttl: float = 30.0):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[float, Record]]" = OrderedDict()
+
+    @abstractmethod
+    async def _read(self, key: str) -> Record:
+        """Backenddan holat va ma'lumotlarni birga o'qish"""
+
+    @abstractmethod
+    async def _write_state(self, key: str, state: Optional[str]) -> None:
+        """Holatni backendga yozish"""
+
+    @abstractmethod
+    async def _write_data(self, key: str, data: Dict[str, Any]) -> None:
+        """Ma'lumotlarni backendga yozish"""
+
+    async def _get(self, key: str) -> Record:
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        record = await self._read(key)
+        self._remember(key, record)
+        return record
+
+    def _remember(self, key: str, record: Record) -> None:
+        self._cache[key] = (time.monotonic() + self.cache_ttl, record)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        state = state.state if isinstance(state, State) else state
+        await self._write_state(storage_key, state)
+
+        cached = self._cache.get(storage_key)
+        if cached is not None:
+            self._remember(storage_key, (state, cached[1][1]))
+        else:
+            self._cache.pop(storage_key, None)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._get(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        data = dict(data)
+        await self._write_data(storage_key, data)
+
+        cached = self._cache.get(storage_key)
+        if cached is not None:
+            self._remember(storage_key, (cached[1][0], data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._get(self.key_builder.build(key))
+        return dict(data)
@@ -0,0 +1,56 @@
+import json
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import KeyBuilder
+from redis.asyncio import Redis
+
+from .cache import CachedStorage, Record
+
+
+class CachedRedisStorage(CachedStorage):
+    """
+    Redis FSM storage: holat va ma'lumotlar bitta hash da saqlanadi.
+
+    O'qish HGETALL va EXPIRE ni bitta pipeline da bajaradi (bitta round trip),
+    shuning uchun faol foydalanuvchilar kaliti yangilanib turadi, `state_ttl`
+    sekund faol bo'lmaganlarniki esa o'chib ketadi.
+    """
+
+    def __init__(self, redis: Redis, state_ttl: Optional[int] = None,
+                 key_builder: Optional[KeyBuilder] = None, **cache_options):
+        super().__init__(key_builder=key_builder, **cache_options)
+        self.redis = redis
+        self.state_ttl = state_ttl
+
+    async def _read(self, key: str) -> Record:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            if self.state_ttl:
+                pipe.expire(key, self.state_ttl)
+            result = await pipe.execute()
+
+        fields = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in result[0].items()
+        }
+        return fields.get("state"), json.loads(fields["data"]) if fields.get("data") else {}
+
+    async def _write(self, key: str, field: str, value: Optional[str]) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if value is None:
+                pipe.hdel(key, field)
+            else:
+                pipe.hset(key, field, value)
+                if self.state_ttl:
+                    pipe.expire(key, self.state_ttl)
+            await pipe.execute()
+
+    async def _write_state(self, key: str, state: Optional[str]) -> None:
+        await self._write(key, "state", state)
+
+    async def _write_data(self, key: str, data: Dict[str, Any]) -> None:
+        await self._write(key, "data", json.dumps(data, ensure_ascii=False) if data else None)
+
+    async def close(self) -> None:
+        # Redis ulanishi loader.py da umumiy, uni app.py yopadi
+        pass
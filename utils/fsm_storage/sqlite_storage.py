@@ -0,0 +1,63 @@
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import KeyBuilder
+
+from .cache import CachedStorage, Record
+
+
+class SQLiteStorage(CachedStorage):
+    """
+    Lokal SQLite FSM storage (bitta server uchun, restartdan keyin ham holat saqlanadi).
+
+    Barcha so'rovlar bitta alohida thread da bajariladi, event loop bloklanmaydi.
+    `state_ttl` sekund yangilanmagan yozuvlar bo'sh deb hisoblanadi.
+    """
+
+    def __init__(self, db_path: str = 'data/fsm.db', state_ttl: Optional[int] = None,
+                 key_builder: Optional[KeyBuilder] = None, **cache_options):
+        super().__init__(key_builder=key_builder, **cache_options)
+        self.db_path = db_path
+        self.state_ttl = state_ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, state TEXT, data TEXT, updated_at REAL NOT NULL)"
+        )
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _read_sync(self, key: str) -> Record:
+        row = self._conn.execute("SELECT state, data, updated_at FROM fsm WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.state_ttl and time.time() - row[2] > self.state_ttl):
+            return None, {}
+        return row[0], json.loads(row[1]) if row[1] else {}
+
+    def _write_sync(self, key: str, column: str, value: Optional[str]) -> None:
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO fsm (key, {column}, updated_at) VALUES (?, ?, ?) "
+                f"ON CONFLICT (key) DO UPDATE SET {column} = excluded.{column}, updated_at = excluded.updated_at",
+                (key, value, time.time())
+            )
+
+    async def _read(self, key: str) -> Record:
+        return await self._run(self._read_sync, key)
+
+    async def _write_state(self, key: str, state: Optional[str]) -> None:
+        await self._run(self._write_sync, key, "state", state)
+
+    async def _write_data(self, key: str, data: Dict[str, Any]) -> None:
+        await self._run(self._write_sync, key, "data", json.dumps(data, ensure_ascii=False) if data else None)
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
@@ -1 +1,5 @@
+from .archive import HistoryArchive
+from .context import ContextBuilder, count_tokens, extractive_summary
+from .conversation import Conversation, ConversationView, Message
 from .manager import JSONDataManager
+from .storage import BaseStorage, JSONFileStorage, ShardedStorage, AppendLogStorage, make_storage
@@ -0,0 +1,115 @@
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .conversation import Conversation, jsonable
+
+logger = logging.getLogger(__name__)
+
+# user_id -> (gz fayl nomi, offset, uzunlik)
+Location = Tuple[str, int, int]
+
+
+class HistoryArchive:
+    """
+    Faol bo'lmagan foydalanuvchilar tarixi uchun sovuq arxiv: kunlik gzip JSONL.
+
+    Har bir foydalanuvchi `<kun><suffix>.jsonl.gz` ga alohida gzip a'zosi
+    (member) sifatida qo'shiladi - fayl oddiy `zcat` bilan o'qiladi, qaytgan
+    foydalanuvchini tiklash esa faqat uning baytlarini o'qiydi. Joylashuvlar
+    yonidagi `.idx` faylida (user_id, offset, uzunlik); idx qatori gz yozilib
+    fsync qilingandan keyin qo'shiladi. Keyingi yozuv oldingisini bekor qiladi.
+
+    `suffix` ko'p jarayonli rejimda har bir workerning o'z fayllari uchun.
+    """
+
+    def __init__(self, directory: str, suffix: str = ''):
+        self.directory = directory
+        self.suffix = suffix
+        self._index: Dict[str, Location] = {}
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def load(self, owner: Optional[Callable[[str], bool]] = None) -> None:
+        """Ishga tushganda barcha `.idx` fayllarni o'qish (kunlar tartibida)"""
+        self._index.clear()
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.idx'):
+                continue
+            archive_name = sys.intern(name[:-len('.idx')] + '.jsonl.gz')
+            with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        user_id, offset, length = line.rstrip('\n').split('\t')
+                        location = (archive_name, int(offset), int(length))
+                    except ValueError:
+                        logger.warning(f"Skipping corrupt line in {name}")
+                        continue
+                    if owner is None or owner(user_id):
+                        self._index[user_id] = location
+
+    def write(self, conversations: Dict[str, Conversation], day: Optional[date] = None) -> List[Tuple[str, Location]]:
+        """
+        Suhbatlarni bugungi faylga qo'shish (thread ichida). Indeks o'zgartirilmaydi:
+        qaytarilgan joylashuvlarni event loop `add` orqali qo'shadi.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        stem = f"{(day or date.today()).isoformat()}{self.suffix}"
+        archive_name = f"{stem}.jsonl.gz"
+        archived_at = datetime.now().isoformat()
+        locations = []
+        with open(os.path.join(self.directory, archive_name), 'ab') as archive_file:
+            offset = archive_file.seek(0, os.SEEK_END)
+            for user_id, conversation in conversations.items():
+                line = json.dumps({"u": user_id, "archived_at": archived_at, "d": conversation},
+                                  ensure_ascii=False, default=jsonable) + '\n'
+                member = gzip.compress(line.encode('utf-8'), mtime=0)
+                archive_file.write(member)
+                locations.append((user_id, (archive_name, offset, len(member))))
+                offset += len(member)
+            archive_file.flush()
+            os.fsync(archive_file.fileno())
+        with open(os.path.join(self.directory, f"{stem}.idx"), 'a', encoding='utf-8') as index_file:
+            index_file.writelines(f"{user_id}\t{offset}\t{length}\n" for user_id, (_, offset, length) in locations)
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        return locations
+
+    def add(self, locations: List[Tuple[str, Location]]) -> None:
+        self._index.update(locations)
+
+    def discard(self, user_id: str) -> None:
+        self._index.pop(user_id, None)
+
+    def read(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Foydalanuvchining oxirgi arxiv yozuvi (storage formatida); topilmasa yoki buzilgan bo'lsa None"""
+        location = self._index.get(user_id)
+        if location is None:
+            return None
+        archive_name, offset, length = location
+        try:
+            with open(os.path.join(self.directory, archive_name), 'rb') as archive_file:
+                archive_file.seek(offset)
+                entry = json.loads(gzip.decompress(archive_file.read(length)))
+        except (OSError, EOFError, ValueError) as e:
+            logger.error(f"Failed to read archived history of {user_id} from {archive_name}: {e}")
+            return None
+        return entry['d'] if entry.get('u') == user_id else None
+
+    def disk_size(self) -> int:
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
@@ -0,0 +1,116 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .conversation import Conversation, Message
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ixtiyoriy: bo'lmasa taxminiy hisoblanadi
+    tiktoken = None
+
+_encoding = tiktoken.get_encoding("cl100k_base") if tiktoken is not None else None
+
+# Har bir xabar uchun rol va ajratuvchilar (OpenAI formatida ~4 token)
+MESSAGE_OVERHEAD = 4
+
+
+def count_tokens(text: str) -> int:
+    """Matndagi tokenlar soni (tiktoken bo'lmasa ~4 bayt = 1 token)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def message_tokens(message: Message) -> int:
+    """Xabar tokenlari; natija xabarda keshlanadi va har navbatda qayta hisoblanmaydi"""
+    tokens = message.tokens
+    if tokens is None:
+        tokens = message.tokens = count_tokens(message.content) + MESSAGE_OVERHEAD
+    return tokens
+
+
+def extractive_summary(previous: str, messages: Sequence[Message], max_chars: int = 200) -> str:
+    """Eski xabarlarni qisqacha qatorlarga aylantirib, oldingi xulosaga qo'shish"""
+    lines = [previous] if previous else []
+    for message in messages:
+        text = ' '.join(message.content.split())
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(' ', 1)[0] + '…'
+        lines.append(f"{'User' if message.role == 'user' else 'Assistant'}: {text}")
+    return '\n'.join(lines)
+
+
+def trim_summary(summary: str, max_tokens: int) -> str:
+    """Xulosani eng eski qatorlardan boshlab qisqartirish"""
+    lines = summary.split('\n')
+    while len(lines) > 1 and count_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def pack_messages(messages: Sequence[Message], budget: int) -> Tuple[int, int]:
+    """
+    Eng yangi xabarlardan boshlab `budget` tokenga sig'adiganlarini tanlash.
+
+    (start, tokens) qaytaradi: messages[start:] kontekstga kiradi. Oxirgi
+    xabar byudjetdan katta bo'lsa ham doim kiritiladi.
+    """
+    used = 0
+    count = start = len(messages)
+    for message in reversed(messages):
+        tokens = message_tokens(message)
+        if used + tokens > budget and start < count:
+            break
+        used += tokens
+        start -= 1
+    return start, used
+
+
+Summarizer = Callable[[str, Sequence[Message]], str]
+
+SUMMARY_HEADER = "\n\nSummary of the earlier conversation:\n"
+
+
+class ContextBuilder:
+    """
+    Tarixdan provayderga yuboriladigan xabarlarni token byudjeti bo'yicha yig'ish.
+
+    Eng yangi xabarlardan boshlab byudjetga sig'adiganlari olinadi. `summarizer`
+    berilgan bo'lsa, byudjetdan tashqarida qolgan eski xabarlar suhbatning
+    `summary` siga qo'shiladi va tarixdan o'chiriladi.
+    """
+
+    def __init__(self, summarizer: Optional[Summarizer] = None, summary_tokens: int = 300):
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens
+
+    def build(self, conversation: Conversation, system_prompt: str, budget: Optional[int] = None,
+              max_messages: Optional[int] = None) -> Tuple[List[Dict[str, str]], bool]:
+        """(provayder formatidagi xabarlar, suhbat o'zgardimi)"""
+        summary = conversation.summary
+        window = max(0, len(conversation) - max_messages) if max_messages is not None else 0
+
+        start = window
+        if budget is not None:
+            # Xulosa uchun joy oldindan ajratiladi: u shu navbatda kattalashishi mumkin
+            reserved = count_tokens(system_prompt) + MESSAGE_OVERHEAD + (
+                self.summary_tokens if self.summarizer is not None else count_tokens(summary)
+            )
+            offset, _ = pack_messages(conversation[window:], budget - reserved)
+            start += offset
+
+        changed = False
+        if self.summarizer is not None and start > 0:
+            summary = conversation.summary = self.collapse(summary, conversation[:start])
+            conversation.drop_oldest(start)
+            start = 0
+            changed = True
+
+        system_content = system_prompt + SUMMARY_HEADER + summary if summary else system_prompt
+        # Provayder formatiga faqat shu yerda, kontekstga kiradigan xabarlar uchun o'tkaziladi
+        return [{"role": "system", "content": system_content}] + conversation[start:].to_wire(), changed
+
+    def collapse(self, summary: str, dropped: Sequence[Message]) -> str:
+        """Kontekstdan chiqqan xabarlarni saqlanadigan xulosaga qo'shish"""
+        if self.summarizer is None or not dropped:
+            return summary
+        return trim_summary(self.summarizer(summary, dropped), self.summary_tokens)
@@ -0,0 +1,190 @@
+import gc
+import sys
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+
+class Message:
+    """Tarixdagi bitta xabar: lug'at o'rniga __slots__, rol satri intern qilingan (hamma xabarlarda bitta obyekt)"""
+
+    __slots__ = ('role', 'content', 'tokens')
+
+    def __init__(self, role: str, content: str, tokens: Optional[int] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens = tokens  # message_tokens() birinchi marta hisoblaganda keshlanadi
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Message":
+        return cls(data['role'], data['content'], data.get('tokens'))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Saqlash formati (token soni ham yoziladi - yuklanganda qayta hisoblanmaydi)"""
+        data = {"role": self.role, "content": self.content}
+        if self.tokens is not None:
+            data["tokens"] = self.tokens
+        return data
+
+    def to_wire(self) -> Dict[str, str]:
+        """Provayderga yuboriladigan ko'rinish"""
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self) -> str:
+        return f"Message({self.role!r}, {self.content[:30]!r})"
+
+
+class Conversation:
+    """
+    Bitta foydalanuvchi suhbati: oxirgi `capacity` ta xabar halqa buferida.
+
+    Bufer to'lgach yangi xabar eng eskisining o'rniga yoziladi (ro'yxat
+    siljitilmaydi va qayta yaratilmaydi). Kesimlar (`conversation[-10:]`)
+    nusxa emas, ConversationView qaytaradi; provayder formatiga faqat
+    so'rov paytida `to_wire()` orqali o'tkaziladi.
+    """
+
+    __slots__ = ('capacity', 'summary', 'last_message_time', '_items', '_head')
+
+    def __init__(self, capacity: int, messages: Iterable[Message] = (), summary: str = '',
+                 last_message_time: Optional[str] = None):
+        self.capacity = capacity
+        self.summary = summary
+        self.last_message_time = last_message_time
+        items = list(messages)
+        self._items: List[Message] = items[-capacity:] if len(items) > capacity else items
+        self._head = 0  # eng eski xabarning _items dagi indeksi (bufer to'lganda siljiydi)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], capacity: int) -> "Conversation":
+        """Storage formatidagi yozuvdan ({"messages": [...], "last_message_time", "summary"})"""
+        return cls(
+            capacity,
+            (Message.from_dict(message) for message in data.get('messages') or ()),
+            summary=data.get('summary') or '',
+            last_message_time=data.get('last_message_time'),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'messages': [message.to_dict() for message in self], 'last_message_time': self.last_message_time}
+        if self.summary:
+            data['summary'] = self.summary
+        return data
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Message]:
+        items, head = self._items, self._head
+        if head == 0:
+            return iter(items)
+        return chain(islice(items, head, None), islice(items, head))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, "ConversationView"]:
+        size = len(self._items)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                raise ValueError("Conversation slices do not support a step")
+            return ConversationView(self, start, max(start, stop))
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("conversation index out of range")
+        return self._items[(self._head + index) % size]
+
+    def append(self, message: Message) -> Optional[Message]:
+        """Xabar qo'shish; bufer to'la bo'lsa, chiqarib yuborilgan eng eski xabar qaytariladi"""
+        items = self._items
+        if len(items) < self.capacity:
+            items.append(message)
+            return None
+        head = self._head
+        evicted, items[head] = items[head], message
+        self._head = (head + 1) % len(items)
+        return evicted
+
+    def last(self, count: int) -> "ConversationView":
+        """Oxirgi `count` ta xabar (nusxasiz)"""
+        size = len(self._items)
+        return ConversationView(self, max(0, size - count), size)
+
+    def drop_oldest(self, count: int) -> None:
+        """Eng eski `count` ta xabarni o'chirish (masalan, xulosaga o'tkazilganda)"""
+        if count <= 0:
+            return
+        self._items = list(self)[count:]
+        self._head = 0
+
+    def clear(self) -> None:
+        self._items = []
+        self._head = 0
+        self.summary = ''
+
+
+class ConversationView:
+    """Conversation ning [start, stop) oralig'i: xabarlar nusxalanmaydi, suhbat o'zgarguncha amal qiladi"""
+
+    __slots__ = ('_conversation', '_start', '_stop')
+
+    def __init__(self, conversation: Conversation, start: int, stop: int):
+        self._conversation = conversation
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, "ConversationView"]:
+        size = self._stop - self._start
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                raise ValueError("Conversation slices do not support a step")
+            return ConversationView(self._conversation, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("conversation view index out of range")
+        return self._conversation[self._start + index]
+
+    def __iter__(self) -> Iterator[Message]:
+        conversation = self._conversation
+        items, size = conversation._items, len(conversation._items)
+        start, stop = conversation._head + self._start, conversation._head + self._stop
+        if stop <= size:
+            return islice(items, start, stop)
+        # Oraliq bufer oxiridan boshiga o'tadi
+        return chain(islice(items, start, size), islice(items, max(0, start - size), stop - size))
+
+    def __reversed__(self) -> Iterator[Message]:
+        conversation = self._conversation
+        items, head, size = conversation._items, conversation._head, len(conversation._items)
+        for index in range(self._stop - 1, self._start - 1, -1):
+            yield items[(head + index) % size]
+
+    def to_wire(self) -> List[Dict[str, str]]:
+        return [message.to_wire() for message in self]
+
+
+def load_conversations(data: Dict[str, Dict[str, Any]], capacity: int,
+                       owner: Optional[Callable[[str], bool]] = None) -> Dict[str, Conversation]:
+    """Storage dan o'qilgan lug'atlarni Conversation larga o'tkazish (`owner` - faqat shu jarayon foydalanuvchilari)"""
+    # Millionlab Message yaratilayotganda yosh avlod GC si qayta-qayta ishga tushmasin
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return {
+            user_id: Conversation.from_dict(user_data, capacity)
+            for user_id, user_data in data.items()
+            if owner is None or owner(user_id)
+        }
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def jsonable(value: Any) -> Any:
+    """json.dumps(default=...) uchun: Conversation va Message ni saqlash formatiga o'tkazish"""
+    if isinstance(value, (Conversation, Message)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
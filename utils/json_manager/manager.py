@@ -1,21 +1,97 @@
-import json
+import asyncio
+import logging
 import os
-from typing import Dict, Any
+import time
+from typing import Callable, Dict, Any, Iterator, Optional
 from datetime import datetime, timedelta
 
+import utils.metrics as metrics
+
+from .archive import HistoryArchive
+from .context import ContextBuilder, message_tokens
+from .conversation import Conversation, Message, load_conversations
+from .storage import BaseStorage, JSONFileStorage
+
+logger = logging.getLogger(__name__)
+
 
 class JSONDataManager:
-    def __init__(self, file_path: str = 'data/chat_story/openai_data.json'):
+    """
+    Foydalanuvchi ma'lumotlari xotirada saqlanadi, o'zgarishlar `storage`
+    backendiga qayd etiladi va diskka taymer yoki chegara bo'yicha yoziladi.
+
+    Xotirada har bir foydalanuvchi - Conversation (xabarlar halqa buferida,
+    __slots__ li Message obyektlari); storage dan o'qilgan lug'atlar
+    yuklanganda bir marta shu ko'rinishga o'tkaziladi.
+
+    `owner` berilsa (ko'p jarayonli rejimda), umumiy storage dan faqat shu
+    jarayonga tegishli foydalanuvchilar xotiraga olinadi.
+
+    `ttl` berilsa, fon vazifasi (janitor) har `janitor_interval` sekundda
+    shuncha vaqt yozmagan foydalanuvchilarni xotira va storage dan o'chiradi;
+    `archive` bo'lsa, ularning tarixi avval gzip arxivga yoziladi va
+    foydalanuvchi qaytganda birinchi murojaatda jimgina tiklanadi.
+    """
+
+    MAX_STORED_MESSAGES = 20  # 10 ta suhbat = 20 ta xabar
+    EVICT_BATCH = 1000  # arxivga bitta thread chaqiruvida yoziladigan foydalanuvchilar
+    DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant. Provide concise and clear answers."
+
+    def __init__(self, file_path: str = 'data/chat_story/openai_data.json',
+                 flush_interval: float = 5.0, max_dirty: int = 100,
+                 storage: Optional[BaseStorage] = None,
+                 max_stored_messages: Optional[int] = None,
+                 context: Optional[ContextBuilder] = None,
+                 owner: Optional[Callable[[str], bool]] = None,
+                 ttl: Optional[float] = None, janitor_interval: float = 3600.0,
+                 archive: Optional[HistoryArchive] = None):
         self.file_path = file_path
-        self._ensure_file_exists()
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        self.max_stored_messages = max_stored_messages or self.MAX_STORED_MESSAGES
+        self.context = context or ContextBuilder()
+        self.storage = storage or JSONFileStorage(file_path)
+        self.storage.max_messages = self.max_stored_messages
+        self.ttl = ttl
+        self.janitor_interval = janitor_interval
+        self.archive = archive
+
+        self._flush_task: Optional[asyncio.Task] = None
+        self._periodic_task: Optional[asyncio.Task] = None
+        self._janitor_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # Arxivga yozilayotgan foydalanuvchilar: shu orada qaytsa, hot store ga qaytariladi
+        self._evicting: Dict[str, Conversation] = {}
+
+        store = self.metrics_label()
+        self._flush_duration = metrics.history_flush_duration.labels(store)
+        self._flush_bytes = metrics.history_flush_bytes.labels(store)
+        self._evictions = metrics.history_evictions.labels(store)
+        self._restores = metrics.history_restores.labels(store)
+        metrics.history_users.set_function(lambda: self.user_counts()['hot'], store, 'hot')
+        metrics.history_users.set_function(lambda: self.user_counts()['archived'], store, 'archived')
 
-    def _ensure_file_exists(self) -> None:
-        """JSON fayl mavjudligini tekshirish va yo'q bo'lsa yaratish"""
-        if not os.path.exists(os.path.dirname(self.file_path)):
-            os.makedirs(os.path.dirname(self.file_path))
+        started = time.perf_counter()
+        self._data: Dict[str, Conversation] = load_conversations(
+            self.storage.load(), self.max_stored_messages, owner
+        )
+        if archive is not None:
+            archive.load(owner)
+            for user_id in self._data:
+                archive.discard(user_id)  # qaytib kelgan foydalanuvchilarning eski arxiv yozuvlari
+        metrics.history_load_duration.labels(store).set(time.perf_counter() - started)
+        size = self.storage.disk_size()
+        if size is not None:
+            metrics.history_load_bytes.labels(store).set(size)
 
-        if not os.path.exists(self.file_path):
-            self.save_data({})
+    def metrics_label(self) -> str:
+        """Metrikalardagi `store` labeli (fayl nomi kengaytmasiz)"""
+        return os.path.splitext(os.path.basename(self.file_path))[0]
+
+    def _observe_flush(self, started: float, written: Optional[int]) -> None:
+        self._flush_duration.observe(time.perf_counter() - started)
+        if written is not None:
+            self._flush_bytes.observe(written)
 
     def _datetime_to_str(self, dt: datetime) -> str:
         """Datetime ni string formatga o'tkazish"""
@@ -28,106 +104,269 @@ class JSONDataManager:
         except (ValueError, TypeError):
             return datetime.now()
 
-    def load_data(self) -> Dict[str, Any]:
-        """JSON fayldan ma'lumotlarni yuklash"""
+    def _mark_dirty(self, user_id: str, message: Optional[Message] = None) -> None:
+        """Foydalanuvchi o'zgarishini backendga qayd etish"""
+        self.storage.record(user_id, self._data.get(user_id), message)
+        if self.storage.pending >= self.max_dirty:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Event loop ishlayotgan bo'lsa, navbatdan tashqari flush ni rejalashtirish"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        except json.JSONDecodeError:
-            return {}
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_task = loop.create_task(self.flush())
+
+    async def flush(self) -> None:
+        """O'zgarishlarni diskka yozish (fayl yozish alohida thread da)"""
+        async with self._flush_lock:
+            payload = self.storage.prepare(self._data)
+            if payload is None:
+                return
+            started = time.perf_counter()
+            try:
+                written = await asyncio.to_thread(self.storage.write, payload)
+            except Exception as e:
+                self.storage.rollback(payload)
+                logger.error(f"Failed to flush {self.file_path}: {e}")
+            else:
+                self._observe_flush(started, written)
+
+    def flush_sync(self) -> None:
+        """Event loop dan tashqarida (masalan, skriptlarda) sinxron saqlash"""
+        payload = self.storage.prepare(self._data)
+        if payload is not None:
+            started = time.perf_counter()
+            self._observe_flush(started, self.storage.write(payload))
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _evict_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.janitor_interval)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error(f"History janitor failed for {self.file_path}: {e}")
+
+    async def start(self) -> None:
+        """Davriy flush va (ttl berilgan bo'lsa) janitor vazifalarini ishga tushirish"""
+        if self._periodic_task is None or self._periodic_task.done():
+            self._periodic_task = asyncio.create_task(self._flush_periodically())
+        if self.ttl and (self._janitor_task is None or self._janitor_task.done()):
+            self._janitor_task = asyncio.create_task(self._evict_periodically())
+
+    async def close(self) -> None:
+        """Davriy vazifalarni to'xtatish va qolgan o'zgarishlarni saqlash"""
+        for task in (self._periodic_task, self._janitor_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._periodic_task = self._janitor_task = None
+        await self.flush()
+
+    async def evict_idle(self, ttl: Optional[float] = None) -> int:
+        """
+        `ttl` sekunddan beri yozmagan foydalanuvchilarni hot store dan chiqarish;
+        archive bo'lsa, tarix avval arxivga yoziladi. Chiqarilganlar sonini qaytaradi.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if not ttl:
+            return 0
+        cutoff = datetime.now() - timedelta(seconds=ttl)
+        idle = [
+            user_id for user_id, conversation in self._data.items()
+            if self._str_to_datetime(conversation.last_message_time) < cutoff
+        ]
+
+        evicted = 0
+        for start in range(0, len(idle), self.EVICT_BATCH):
+            batch = {}
+            for user_id in idle[start:start + self.EVICT_BATCH]:
+                conversation = self._data.pop(user_id, None)
+                if conversation is not None:
+                    batch[user_id] = conversation
+            self._evicting.update(batch)
+            locations = []
+            if self.archive is not None:
+                try:
+                    locations = await asyncio.to_thread(self.archive.write, batch)
+                except Exception as e:
+                    # Arxivga yozilmaganlar hot store da qoladi
+                    for user_id in batch:
+                        conversation = self._evicting.pop(user_id, None)
+                        if conversation is not None:
+                            self._data[user_id] = conversation
+                    logger.error(f"Failed to archive idle users of {self.file_path}: {e}")
+                    break
+
+            for user_id in batch:
+                # Yozish paytida qaytgan foydalanuvchi _evicting dan allaqachon olingan
+                if self._evicting.pop(user_id, None) is not None:
+                    self.storage.record(user_id, None)
+                    evicted += 1
+            if locations:
+                self.archive.add([(user_id, location) for user_id, location in locations
+                                  if user_id not in self._data])
+            await asyncio.sleep(0)
+
+        if evicted:
+            self._evictions.inc(evicted)
+            self._schedule_flush()
+            counts = self.user_counts()
+            logger.info(f"Evicted {evicted} idle users from {self.file_path} "
+                        f"(hot={counts['hot']}, archived={counts['archived']})")
+        return evicted
+
+    def user_counts(self) -> Dict[str, int]:
+        """Xotiradagi (hot) va arxivdagi foydalanuvchilar soni"""
+        return {
+            'hot': len(self._data) + len(self._evicting),
+            'archived': len(self.archive) if self.archive is not None else 0,
+        }
+
+    def user_ids(self) -> Iterator[str]:
+        """Tarixi bor barcha foydalanuvchilar: xotiradagi va arxivdagi"""
+        yield from self._data
+        yield from self._evicting
+        if self.archive is not None:
+            yield from self.archive
+
+    def _lookup(self, user_id: str) -> Optional[Conversation]:
+        """Hot store dagi suhbat; bo'lmasa, arxivlanayotgan yoki arxivdagisini tiklash"""
+        conversation = self._data.get(user_id)
+        if conversation is not None:
+            return conversation
+        conversation = self._evicting.pop(user_id, None)
+        if conversation is not None:
+            self._data[user_id] = conversation
+            return conversation
+        if self.archive is None or user_id not in self.archive:
+            return None
+
+        # Bitta gzip a'zosini o'qish - kichik sinxron I/O, faqat qaytgan foydalanuvchi uchun bir marta
+        user_data = self.archive.read(user_id)
+        self.archive.discard(user_id)
+        if user_data is None:
+            return None
+        conversation = self._data[user_id] = Conversation.from_dict(user_data, self.max_stored_messages)
+        self._restores.inc()
+        self._mark_dirty(user_id)
+        return conversation
+
+    def _new_conversation(self) -> Conversation:
+        return Conversation(self.max_stored_messages, last_message_time=self._datetime_to_str(datetime.now()))
+
+    def load_data(self) -> Dict[str, Conversation]:
+        """Xotiradagi ma'lumotlarni olish (nusxa emas)"""
+        return self._data
 
     def save_data(self, data: Dict[str, Any]) -> None:
-        """Ma'lumotlarni JSON faylga saqlash"""
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=2)
-
-    def get_user_data(self, user_id: str) -> Dict[str, Any]:
-        """Foydalanuvchi ma'lumotlarini olish"""
-        data = self.load_data()
-        if user_id not in data:
-            current_time = self._datetime_to_str(datetime.now())
-            data[user_id] = {
-                'messages': [],
-                'last_message_time': current_time
-            }
-            self.save_data(data)
-        return data[user_id]
+        """Barcha ma'lumotlarni almashtirish va saqlashga belgilash (Conversation yoki storage formatidagi lug'at)"""
+        old_data = self._data
+        self._data = {
+            user_id: user_data if isinstance(user_data, Conversation)
+            else Conversation.from_dict(user_data, self.max_stored_messages)
+            for user_id, user_data in data.items()
+        }
+        for user_id in set(old_data) | set(self._data):
+            self.storage.record(user_id, self._data.get(user_id))
+        self._schedule_flush()
 
-    def update_user_messages(self, user_id: str, messages: list) -> None:
-        """Foydalanuvchi xabarlarini yangilash"""
-        data = self.load_data()
-        if user_id not in data:
-            data[user_id] = {}
+    def get_user_data(self, user_id: str) -> Conversation:
+        """Foydalanuvchi suhbatini olish (yo'q bo'lsa yaratiladi)"""
+        conversation = self._lookup(user_id)
+        if conversation is None:
+            conversation = self._data[user_id] = self._new_conversation()
+            self._mark_dirty(user_id)
+        return conversation
 
-        data[user_id]['messages'] = messages
-        data[user_id]['last_message_time'] = self._datetime_to_str(datetime.now())
-        self.save_data(data)
+    def update_user_messages(self, user_id: str, messages: list) -> None:
+        """Foydalanuvchi xabarlarini yangilash ({"role", "content"} lug'atlari yoki Message lar)"""
+        conversation = self._lookup(user_id)
+        if conversation is None:
+            conversation = self._data[user_id] = self._new_conversation()
+        summary = conversation.summary
+        conversation.clear()
+        conversation.summary = summary
+        for message in messages:
+            conversation.append(message if isinstance(message, Message) else Message.from_dict(message))
+        conversation.last_message_time = self._datetime_to_str(datetime.now())
+        self._mark_dirty(user_id)
 
     def update_last_message_time(self, user_id: str) -> None:
         """Foydalanuvchining oxirgi xabar vaqtini yangilash"""
-        data = self.load_data()
-        if user_id not in data:
-            data[user_id] = {
-                'messages': [],
-                'last_message_time': self._datetime_to_str(datetime.now())
-            }
+        conversation = self._lookup(user_id)
+        if conversation is None:
+            self._data[user_id] = self._new_conversation()
         else:
-            data[user_id]['last_message_time'] = self._datetime_to_str(datetime.now())
-        self.save_data(data)
+            conversation.last_message_time = self._datetime_to_str(datetime.now())
+        self._mark_dirty(user_id)
 
     def check_rate_limit(self, user_id: str) -> bool:
         """Rate limitni tekshirish"""
         try:
-            user_data = self.get_user_data(user_id)
-            last_message_time = self._str_to_datetime(user_data['last_message_time'])
+            conversation = self.get_user_data(user_id)
+            last_message_time = self._str_to_datetime(conversation.last_message_time)
             time_diff = datetime.now() - last_message_time
             return time_diff >= timedelta(seconds=1)
         except Exception as e:
             # Xatolik bo'lsa, True qaytaramiz (ya'ni rate limit yo'q)
             return True
 
-    def manage_conversation_history(self, user_id: str, max_messages: int = 5) -> list:
-        """Suhbat tarixini boshqarish va cheklash"""
-        user_data = self.get_user_data(user_id)
-        messages = user_data.get('messages', [])
-
-        # Sistema xabarini qo'shish
-        system_message = {
-            "role": "system",
-            "content": "You are a helpful assistant. Provide concise and clear answers."
-        }
-
-        # Oxirgi xabarlarni olish
-        recent_messages = messages[-(max_messages * 2):] if messages else []
-
-        # Sistema xabari bilan birlashtirish
-        return [system_message] + recent_messages
+    def manage_conversation_history(self, user_id: str, max_messages: int = 5,
+                                    token_budget: Optional[int] = None,
+                                    system_prompt: Optional[str] = None) -> list:
+        """
+        Suhbat tarixini boshqarish va cheklash: oxirgi `max_messages` ta suhbatdan
+        `token_budget` ga sig'adigan eng yangi xabarlar sistema xabari bilan qaytariladi
+        """
+        conversation = self.get_user_data(user_id)
+        messages, changed = self.context.build(
+            conversation, system_prompt or self.DEFAULT_SYSTEM_PROMPT,
+            budget=token_budget, max_messages=max_messages * 2
+        )
+        if changed:
+            # Eski xabarlar xulosaga o'tkazildi
+            self._mark_dirty(user_id)
+        return messages
 
     def add_message(self, user_id: str, role: str, content: str) -> None:
         """Yangi xabar qo'shish"""
-        data = self.load_data()
-        if user_id not in data:
-            data[user_id] = {
-                'messages': [],
-                'last_message_time': self._datetime_to_str(datetime.now())
-            }
+        conversation = self._lookup(user_id)
+        if conversation is None:
+            conversation = self._data[user_id] = self._new_conversation()
+        else:
+            # Janitor faol bo'lmagan foydalanuvchilarni shu vaqt bo'yicha aniqlaydi
+            conversation.last_message_time = self._datetime_to_str(datetime.now())
 
-        # Xabarni qo'shish
-        data[user_id]['messages'].append({
-            "role": role,
-            "content": content
-        })
+        message = Message(role, content)
+        message_tokens(message)  # token soni xabarda saqlanadi
 
-        # Xabarlar sonini cheklash (oxirgi 10 ta suhbat)
-        if len(data[user_id]['messages']) > 20:  # 10 ta suhbat = 20 ta xabar
-            data[user_id]['messages'] = data[user_id]['messages'][-20:]
+        # Bufer to'lgan bo'lsa, eng eski xabar chiqib ketadi (oxirgi 10 ta suhbat qoladi)
+        evicted = conversation.append(message)
+        if evicted is not None:
+            summary = self.context.collapse(conversation.summary, (evicted,))
+            if summary:
+                conversation.summary = summary
+                self._mark_dirty(user_id)
+                return
 
-        self.save_data(data)
+        self._mark_dirty(user_id, message)
 
     def clear_history(self, user_id: str) -> None:
         """Foydalanuvchi chat tarixini tozalash"""
-        data = self.load_data()
-        if user_id in data:
-            data[user_id]['messages'] = []
-            data[user_id]['last_message_time'] = self._datetime_to_str(datetime.now())
-            self.save_data(data)
+        conversation = self._lookup(user_id)
+        if conversation is not None:
+            conversation.clear()
+            conversation.last_message_time = self._datetime_to_str(datetime.now())
+            self._mark_dirty(user_id)
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import quote, unquote
+
+from .conversation import Conversation, Message, jsonable
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(file_path: str, chunks: Iterable[str]) -> int:
+    """Faylni atomik yozish: vaqtinchalik fayl + fsync + os.replace; yozilgan baytlar sonini qaytaradi"""
+    directory = os.path.dirname(file_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            for chunk in chunks:
+                file.write(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+            size = os.fstat(file.fileno()).st_size
+        os.replace(tmp_path, file_path)
+        return size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def encode_user(user_id: str, user_data: Conversation) -> str:
+    """Bitta foydalanuvchi yozuvini `"id":{...}` ko'rinishidagi JSON bo'lagiga aylantirish"""
+    return f"{json.dumps(user_id)}:{json.dumps(user_data, ensure_ascii=False, default=jsonable)}"
+
+
+class BaseStorage:
+    """
+    JSONDataManager uchun saqlash backend interfeysi.
+
+    `load` storage formatidagi lug'atlarni qaytaradi ({"messages": [...],
+    "last_message_time", "summary"}), `record` va `prepare` esa xotiradagi
+    Conversation obyektlarini oladi. `record` va `prepare` event loop ichida
+    chaqiriladi va tez bo'lishi kerak, `write` esa alohida thread da
+    ishlaydi va diskka yozadi.
+    """
+
+    max_messages: int = 20
+
+    def load(self) -> Dict[str, Any]:
+        """Ishga tushganda barcha ma'lumotlarni o'qish"""
+        raise NotImplementedError
+
+    def record(self, user_id: str, user_data: Optional[Conversation],
+               message: Optional[Message] = None) -> None:
+        """Foydalanuvchi o'zgarganini qayd etish (message - faqat qo'shilgan xabar)"""
+        raise NotImplementedError
+
+    @property
+    def pending(self) -> int:
+        """Hali diskka yozilmagan o'zgarishlar soni"""
+        raise NotImplementedError
+
+    def prepare(self, data: Dict[str, Conversation]) -> Any:
+        """Yozish uchun payload tayyorlash (event loop ichida)"""
+        raise NotImplementedError
+
+    def write(self, payload: Any) -> Optional[int]:
+        """Payload ni diskka yozish (thread ichida); yozilgan baytlar soni, noma'lum bo'lsa None"""
+        raise NotImplementedError
+
+    def disk_size(self) -> Optional[int]:
+        """Diskdagi ma'lumotlar hajmi (bayt), noma'lum bo'lsa None"""
+        return None
+
+    def rollback(self, payload: Any) -> None:
+        """Yozish muvaffaqiyatsiz bo'lsa, o'zgarishlarni navbatga qaytarish"""
+        raise NotImplementedError
+
+
+class _EncodedUsers:
+    """Foydalanuvchilarning JSON bo'laklari keshi: faqat o'zgarganlar qayta kodlanadi"""
+
+    def __init__(self):
+        self.parts: Dict[str, str] = {}
+        self.dirty: Set[str] = set()
+
+    def reset(self, data: Dict[str, Any]) -> None:
+        self.parts = {user_id: encode_user(user_id, user_data) for user_id, user_data in data.items()}
+        self.dirty.clear()
+
+    def refresh(self, data: Dict[str, Any]) -> List[str]:
+        for user_id in self.dirty:
+            if user_id in data:
+                self.parts[user_id] = encode_user(user_id, data[user_id])
+            else:
+                self.parts.pop(user_id, None)
+        self.dirty.clear()
+        return list(self.parts.values())
+
+
+class JSONFileStorage(BaseStorage):
+    """Bitta JSON fayl: har bir flush da butun fayl qayta yoziladi"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._users = _EncodedUsers()
+
+    def load(self) -> Dict[str, Any]:
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        data = _read_json(self.file_path) or {}
+        self._users.reset(data)
+        return data
+
+    def record(self, user_id, user_data, message=None) -> None:
+        self._users.dirty.add(user_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._users.dirty)
+
+    def prepare(self, data):
+        if not self._users.dirty:
+            return None
+        dirty = set(self._users.dirty)
+        return dirty, self._users.refresh(data)
+
+    def write(self, payload) -> int:
+        _, parts = payload
+        return atomic_write(self.file_path, ('{', ','.join(parts), '}'))
+
+    def disk_size(self) -> Optional[int]:
+        return os.path.getsize(self.file_path) if os.path.exists(self.file_path) else 0
+
+    def rollback(self, payload) -> None:
+        dirty, _ = payload
+        self._users.dirty.update(dirty)
+
+
+class ShardedStorage(BaseStorage):
+    """Har bir foydalanuvchi uchun alohida fayl: flush narxi faqat faol foydalanuvchilarga bog'liq"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._dirty: Set[str] = set()
+
+    def _shard_path(self, user_id: str) -> str:
+        return os.path.join(self.directory, f"{quote(user_id, safe='')}.json")
+
+    def load(self) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        data = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name.startswith('.tmp_'):
+                continue
+            user_data = _read_json(os.path.join(self.directory, name))
+            if user_data is not None:
+                data[unquote(name[:-len('.json')])] = user_data
+        return data
+
+    def record(self, user_id, user_data, message=None) -> None:
+        self._dirty.add(user_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def prepare(self, data):
+        if not self._dirty:
+            return None
+        payload = {
+            user_id: json.dumps(data[user_id], ensure_ascii=False, default=jsonable) if user_id in data else None
+            for user_id in self._dirty
+        }
+        self._dirty.clear()
+        return payload
+
+    def write(self, payload) -> int:
+        written = 0
+        for user_id, encoded in payload.items():
+            path = self._shard_path(user_id)
+            if encoded is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                written += atomic_write(path, (encoded,))
+        return written
+
+    def disk_size(self) -> Optional[int]:
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def rollback(self, payload) -> None:
+        self._dirty.update(payload)
+
+
+class AppendLogStorage(BaseStorage):
+    """
+    Append-only JSONL log + davriy snapshot (compaction).
+
+    Har bir add_message logga bitta qator qo'shadi, shuning uchun yozish narxi
+    xabar hajmiga teng. Log `compact_every` qatordan oshganda butun holat
+    snapshot ga yoziladi va log qisqartiriladi - ishga tushishdagi replay
+    shu son bilan chegaralangan.
+    """
+
+    def __init__(self, file_path: str, compact_every: int = 10000):
+        self.file_path = file_path
+        self.snapshot_path = f"{file_path}.snapshot"
+        self.log_path = f"{file_path}.log"
+        self.compact_every = compact_every
+
+        self._seq = 0
+        self._lines: List[str] = []
+        self._log_size = 0
+        self._users = _EncodedUsers()
+
+    def load(self) -> Dict[str, Any]:
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        if os.path.exists(self.snapshot_path):
+            snapshot = _read_json(self.snapshot_path) or {}
+            data, self._seq = snapshot.get('users', {}), snapshot.get('seq', 0)
+        else:
+            # Eski bitta-fayl formatidan ko'chish
+            data = _read_json(self.file_path) or {}
+
+        snapshot_seq = self._seq
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Crash paytida chala yozilgan oxirgi qator
+                        logger.warning(f"Skipping corrupt line in {self.log_path}")
+                        continue
+                    self._log_size += 1
+                    if entry['s'] <= snapshot_seq:
+                        continue
+                    self._apply(data, entry)
+                    self._seq = entry['s']
+
+        self._users.reset(data)
+        return data
+
+    def _apply(self, data: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        user_id, op = entry['u'], entry['op']
+        if op == 'add':
+            user_data = data.setdefault(user_id, {'messages': []})
+            user_data['last_message_time'] = entry['t']
+            messages = user_data.setdefault('messages', [])
+            messages.append(entry['m'])
+            if len(messages) > self.max_messages:
+                user_data['messages'] = messages[-self.max_messages:]
+        elif op == 'set':
+            data[user_id] = entry['d']
+        elif op == 'del':
+            data.pop(user_id, None)
+
+    def record(self, user_id, user_data, message=None) -> None:
+        self._seq += 1
+        if user_data is None:
+            entry = {'s': self._seq, 'op': 'del', 'u': user_id}
+        elif message is not None:
+            entry = {'s': self._seq, 'op': 'add', 'u': user_id, 'm': message,
+                     't': user_data.last_message_time}
+        else:
+            entry = {'s': self._seq, 'op': 'set', 'u': user_id, 'd': user_data}
+        self._lines.append(json.dumps(entry, ensure_ascii=False, default=jsonable) + '\n')
+        self._users.dirty.add(user_id)
+
+    @property
+    def pending(self) -> int:
+        return len(self._lines)
+
+    def prepare(self, data):
+        if not self._lines:
+            return None
+        lines, self._lines = self._lines, []
+        snapshot = None
+        if self._log_size + len(lines) >= self.compact_every:
+            snapshot = (self._seq, self._users.refresh(data))
+        return lines, snapshot
+
+    def write(self, payload) -> int:
+        lines, snapshot = payload
+        if snapshot is None:
+            with open(self.log_path, 'a', encoding='utf-8') as file:
+                before = os.fstat(file.fileno()).st_size
+                file.writelines(lines)
+                file.flush()
+                os.fsync(file.fileno())
+                written = os.fstat(file.fileno()).st_size - before
+            self._log_size += len(lines)
+            return written
+
+        # Snapshot allaqachon `lines` dagi o'zgarishlarni o'z ichiga oladi
+        seq, parts = snapshot
+        written = atomic_write(self.snapshot_path, (f'{{"seq":{seq},"users":{{', ','.join(parts), '}}'))
+        atomic_write(self.log_path, ())
+        self._log_size = 0
+        return written
+
+    def disk_size(self) -> Optional[int]:
+        return sum(os.path.getsize(path) for path in (self.snapshot_path, self.log_path) if os.path.exists(path))
+
+    def rollback(self, payload) -> None:
+        lines, _ = payload
+        self._lines[:0] = lines
+
+
+def _read_json(file_path: str) -> Any:
+    """JSON faylni o'qish, buzilgan yoki yo'q bo'lsa None qaytarish"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def make_storage(kind: str, file_path: str) -> BaseStorage:
+    """Konfiguratsiyadagi nom bo'yicha backend yaratish: json | sharded | log"""
+    if kind == 'json':
+        return JSONFileStorage(file_path)
+    if kind == 'sharded':
+        return ShardedStorage(os.path.splitext(file_path)[0])
+    if kind == 'log':
+        return AppendLogStorage(file_path)
+    raise ValueError(f"Unknown history storage: {kind}")
@@ -0,0 +1,52 @@
+from .registry import BYTES_BUCKETS, LATENCY_BUCKETS, RATE_BUCKETS, Counter, Gauge, Histogram, Registry
+
+# Bot bo'yicha yagona registry va metrikalar to'plami (/metrics orqali beriladi)
+registry = Registry()
+
+update_duration = registry.histogram(
+    "bot_update_duration_seconds", "Time to process one Telegram update", ("update_type",))
+handler_duration = registry.histogram(
+    "bot_handler_duration_seconds", "Time spent in a message handler (including inner middlewares)", ("handler",))
+telegram_request_duration = registry.histogram(
+    "telegram_api_request_duration_seconds", "Bot API call latency", ("method",))
+telegram_request_errors = registry.counter(
+    "telegram_api_request_errors_total", "Failed Bot API calls", ("method",))
+
+provider_ttft = registry.histogram(
+    "provider_time_to_first_token_seconds", "Time from request to the first streamed chunk", ("provider",))
+provider_generation = registry.histogram(
+    "provider_generation_duration_seconds", "Total streaming time of a completed answer", ("provider",))
+provider_tokens_per_second = registry.histogram(
+    "provider_tokens_per_second", "Streaming speed after the first chunk", ("provider",), buckets=RATE_BUCKETS)
+provider_errors = registry.counter(
+    "provider_errors_total", "Provider requests that failed", ("provider",))
+provider_in_flight = registry.gauge(
+    "provider_in_flight_generations", "Generations currently streaming", ("provider",))
+
+history_load_duration = registry.gauge(
+    "history_load_duration_seconds", "Time to load a chat history store on startup", ("store",))
+history_load_bytes = registry.gauge(
+    "history_load_bytes", "Size of a chat history store on startup", ("store",))
+history_flush_duration = registry.histogram(
+    "history_flush_duration_seconds", "Time to write pending history changes", ("store",))
+history_flush_bytes = registry.histogram(
+    "history_flush_bytes", "Bytes written by one history flush", ("store",), buckets=BYTES_BUCKETS)
+history_users = registry.gauge(
+    "history_users", "Users with chat history, in memory (hot) or in the gzip archive", ("store", "tier"))
+history_evictions = registry.counter(
+    "history_evictions_total", "Idle users moved out of the hot store", ("store",))
+history_restores = registry.counter(
+    "history_restores_total", "Archived users reloaded after coming back", ("store",))
+
+broadcast_messages = registry.counter(
+    "broadcast_messages_total", "Broadcast and admin notification deliveries", ("result",))
+broadcast_retry_after = registry.counter(
+    "broadcast_retry_after_total", "RetryAfter (429) responses that paused broadcasting")
+
+throttle_rejections = registry.counter(
+    "throttle_rejections_total", "Messages rejected by rate limits", ("limiter",))
+
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "How late the loop watchdog heartbeat woke up")
+event_loop_blocked = registry.counter(
+    "event_loop_blocked_total", "Loop stalls above the watchdog threshold", ("handler",))
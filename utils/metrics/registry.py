@@ -0,0 +1,222 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Sekundlardagi kechikishlar uchun standart chegaralar
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B ... 64 MiB
+RATE_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 300, 500)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class FunctionChild:
+    """Qiymati scrape paytida funksiyadan olinadigan child (masalan, lug'at uzunligi)"""
+
+    __slots__ = ('func',)
+
+    def __init__(self, func: Callable[[], float]):
+        self.func = func
+
+    @property
+    def value(self) -> float:
+        return self.func()
+
+
+class HistogramChild:
+    """Oldindan ajratilgan bucketlar: observe faqat bisect va bitta indeks oshirish"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # oxirgisi +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    Label qiymatlari bo'yicha bolalar (child) saqlanadigan metrika.
+
+    Issiq yo'lda `labels(...)` natijasini oldindan olib qo'yish tavsiya etiladi;
+    labelsiz metrikada inc/observe to'g'ridan-to'g'ri chaqiriladi.
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def set_function(self, func: Callable[[], float], *values: str) -> None:
+        """Label qiymatlari uchun gauge ni har scrape da `func()` dan olish"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        self._children[values] = FunctionChild(func)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self) -> Iterable[str]:
+        names = self.labelnames + ('le',)
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(names, values + (le,))} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class CallbackMetric:
+    """Qiymati har bir scrape paytida funksiyadan olinadigan metrika (mavjud hisoblagichlar uchun)"""
+
+    def __init__(self, name: str, documentation: str, kind: str, func: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.func = func
+
+    def samples(self) -> Iterable[str]:
+        yield f"{self.name} {_format_value(self.func())}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def watch(self, prefix: str, stats, kind: str = 'counter') -> None:
+        """`as_dict()` qaytaradigan hisoblagichlar obyektini (masalan, RendererStats) ro'yxatga olish"""
+        for field in stats.as_dict():
+            name = f"{prefix}_{field}_total" if kind == 'counter' else f"{prefix}_{field}"
+            self._metrics.pop(name, None)
+            self.register(CallbackMetric(name, f"{prefix} {field}", kind,
+                                         lambda field=field: getattr(stats, field)))
+
+    def render(self) -> str:
+        """Prometheus text exposition formati (0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        lines.append('')
+        return '\n'.join(lines)
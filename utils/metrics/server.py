@@ -0,0 +1,19 @@
+from aiohttp import web
+
+from . import registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(body=registry.render().encode('utf-8'), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server(host: str, port: int, path: str = "/metrics") -> web.AppRunner:
+    """Prometheus uchun alohida HTTP server (webhook portidan mustaqil)"""
+    app = web.Application()
+    app.router.add_get(path, metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    return runner
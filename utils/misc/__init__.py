@@ -1,2 +1,2 @@
-from .throttling import rate_limit
+from .throttling import rate_limit, user_rate_limit
 from . import logging
@@ -0,0 +1,71 @@
+from typing import Any, Dict, Hashable, List
+
+# TurnGuard.enqueue natijalari
+QUEUED = "queued"  # navbatga birinchi bo'lib qo'shildi
+MERGED = "merged"  # oldin kutib turganlarga qo'shildi
+TRIMMED = "trimmed"  # limit oshdi: eng eski kutayotgan xabar tashlandi
+REJECTED = "rejected"  # "drop" siyosati: xabar qabul qilinmadi
+
+
+class TurnGuard:
+    """
+    Har bir kalit (foydalanuvchi) uchun bir vaqtda faqat bitta faol suhbat navbati.
+
+    Navbat band bo'lganda kelgan xabarlar `policy` ga qarab yoki keyingi
+    navbatga birlashtirish uchun saqlanadi ("merge"), yoki tashlab yuboriladi
+    ("drop"). Shu tufayli foydalanuvchi uchun parallel generatsiyalar
+    boshlanmaydi va tarixga yozish tartibi buzilmaydi. Birlashtiriladigan
+    xabarlar soni `max_queued` bilan cheklanadi: oshganda eng eskilari tashlanadi.
+    """
+
+    def __init__(self, policy: str = "merge", max_queued: int = 5):
+        if policy not in ("merge", "drop"):
+            raise ValueError(f"Unknown busy policy: {policy}")
+        if max_queued < 1:
+            raise ValueError("max_queued must be positive")
+        self.policy = policy
+        self.max_queued = max_queued
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._trimmed: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def begin(self, key: Hashable) -> bool:
+        """Navbatni egallash; band bo'lsa False"""
+        if key in self._pending:
+            return False
+        self._pending[key] = []
+        return True
+
+    def enqueue(self, key: Hashable, item: Any) -> str:
+        """
+        Band navbatga element qo'shish ("merge" da).
+
+        QUEUED/MERGED/REJECTED qaytaradi; limit oshib eng eski element
+        tashlansa, shu navbat uchun faqat birinchi marta TRIMMED.
+        """
+        if self.policy != "merge":
+            return REJECTED
+        queued = self._pending[key]
+        queued.append(item)
+        if len(queued) > self.max_queued:
+            del queued[0]
+            trimmed = self._trimmed[key] = self._trimmed.get(key, 0) + 1
+            return TRIMMED if trimmed == 1 else MERGED
+        return QUEUED if len(queued) == 1 else MERGED
+
+    def next_batch(self, key: Hashable) -> List[Any]:
+        """Kutib turgan elementlarni olish; bo'sh bo'lsa navbat bo'shatiladi"""
+        self._trimmed.pop(key, None)
+        queued = self._pending.get(key)
+        if not queued:
+            self._pending.pop(key, None)
+            return []
+        self._pending[key] = []
+        return queued
+
+    def end(self, key: Hashable) -> None:
+        """Navbatni majburan bo'shatish (xatolik bo'lganda)"""
+        self._pending.pop(key, None)
+        self._trimmed.pop(key, None)
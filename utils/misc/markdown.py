@@ -0,0 +1,244 @@
+import re
+from html import escape
+from typing import List, Optional
+
+# Qator ichidagi maxsus belgilar: shulargacha bo'lgan matn bir bo'lakda escape qilinadi
+_SPECIAL = re.compile(r'[`*_~\[\\]')
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})\s*([\w+#.-]*)')
+_HEADING = re.compile(r'^ {0,3}#{1,6}\s+(.*?)(?:\s+#+)?\s*$')
+_RULE = re.compile(r'^ {0,3}([-*_])(?:\s*\1){2,}\s*$')
+_BULLET = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+_ESCAPABLE = frozenset('\\`*_~[]()#+-.!>|{}')
+_LINK_SCHEMES = ('http://', 'https://', 'tg://', 'mailto:')
+
+
+def _escape(text: str) -> str:
+    return escape(text, quote=False)
+
+
+def fence_opener(line: str) -> Optional[str]:
+    """Qator kod blokini ochsa, uning normallashgan ko'rinishi (masalan, "```python"), aks holda None"""
+    match = _FENCE.match(line)
+    return match.group(1) + match.group(2) if match else None
+
+
+def closes_fence(line: str, opener: str) -> bool:
+    """Qator `opener` bilan ochilgan kod blokini yopadimi"""
+    stripped = line.strip()
+    delimiter = opener[:len(opener) - len(opener.lstrip(opener[0]))]
+    return stripped.startswith(delimiter) and not stripped.strip(opener[0])
+
+
+def _inline(text: str, plain_bold: bool = False) -> str:
+    """
+    Bitta qatordagi inline markdown: **qalin**, *kursiv*, `kod`, ~~o'chirilgan~~, [havola](url).
+
+    Teglar stekda kuzatiladi: noto'g'ri ichma-ich yopilganlari qayta ochiladi,
+    qator oxirigacha yopilmaganlari esa oddiy belgi sifatida qoldiriladi -
+    natijada teglar doim muvozanatda bo'ladi.
+    """
+    out: List[str] = []
+    stack: List[list] = []  # [teg, out dagi indeksi, asl belgi, qayta ochilganmi]
+    no_code = set()  # yopuvchisi topilmagan backtick uzunliklari
+    no_link = False
+    n = len(text)
+    pos = 0
+
+    def close(tag: str) -> None:
+        index = next(k for k in range(len(stack) - 1, -1, -1) if stack[k][0] == tag)
+        above = stack[index + 1:]
+        for entry in reversed(above):
+            out.append(f'</{entry[0]}>')
+        out.append(f'</{tag}>')
+        del stack[index:]
+        for entry in above:
+            stack.append([entry[0], len(out), entry[2], True])
+            out.append(f'<{entry[0]}>')
+
+    def toggle(tag: str, delimiter: str, can_open: bool, can_close: bool) -> None:
+        opened = next((entry for entry in reversed(stack) if entry[0] == tag), None)
+        if opened is not None:
+            # *kursiv* faqat * bilan, _kursiv_ faqat _ bilan yopiladi
+            if can_close and opened[2] == delimiter:
+                close(tag)
+                return
+        elif can_open:
+            stack.append([tag, len(out), delimiter, False])
+            out.append(f'<{tag}>')
+            return
+        out.append(_escape(delimiter))
+
+    while True:
+        match = _SPECIAL.search(text, pos)
+        if match is None:
+            out.append(_escape(text[pos:]))
+            break
+        i = match.start()
+        if i > pos:
+            out.append(_escape(text[pos:i]))
+        char = text[i]
+
+        if char == '\\':
+            if i + 1 < n and text[i + 1] in _ESCAPABLE:
+                out.append(_escape(text[i + 1]))
+                pos = i + 2
+            else:
+                out.append('\\')
+                pos = i + 1
+            continue
+
+        j = i
+        while j < n and text[j] == char:
+            j += 1
+        run = j - i
+        pos = j
+
+        if char == '`':
+            end = -1 if run in no_code else text.find(text[i:j], j)
+            if end == -1:
+                no_code.add(run)
+                out.append(text[i:j])
+            else:
+                out.append(f'<code>{_escape(text[j:end])}</code>')
+                pos = end + run
+            continue
+
+        if char == '[':
+            middle = -1 if no_link else text.find('](', j)
+            end = text.find(')', middle + 2) if middle != -1 else -1
+            if end == -1:
+                # Keyingi '[' lar uchun ham yopuvchi yo'q
+                no_link = True
+                out.append(text[i:j])
+                continue
+            label, url = _inline(text[j:middle]), text[middle + 2:end].strip()
+            out.append(text[i:j - 1])
+            if url.startswith(_LINK_SCHEMES):
+                out.append(f'<a href="{escape(url, quote=True)}">{label}</a>')
+            else:
+                out.append(f'{label} ({_escape(url)})')
+            pos = end + 1
+            continue
+
+        if char == '~':
+            if run == 2:
+                toggle('s', '~~', j < n and not text[j].isspace(), i > 0 and not text[i - 1].isspace())
+            else:
+                out.append(text[i:j])
+            continue
+
+        # '*' va '_': 1 - kursiv, 2 - qalin, 3 - ikkalasi
+        before = text[i - 1] if i > 0 else ' '
+        after = text[j] if j < n else ' '
+        can_open = not after.isspace()
+        can_close = not before.isspace()
+        if char == '_':
+            # snake_case kabi so'z ichidagi pastki chiziqlar formatlash emas
+            can_open = can_open and not before.isalnum()
+            can_close = can_close and not after.isalnum()
+        if run > 3 or not (can_open or can_close):
+            out.append(_escape(text[i:j]))
+            continue
+        tags = {1: ('i',), 2: ('b',), 3: ('b', 'i')}[run]
+        if run == 3 and any(entry[0] == 'i' for entry in stack) and can_close:
+            tags = ('i', 'b')
+        for tag in tags:
+            delimiter = char * (2 if tag == 'b' else 1)
+            if tag == 'b' and plain_bold:
+                continue  # sarlavha allaqachon qalin
+            toggle(tag, delimiter, can_open, can_close)
+
+    # Yopilmagan teglar: asl belgilar qaytariladi, qayta ochilganlari yopiladi
+    for tag, index, delimiter, reopened in reversed(stack):
+        if reopened:
+            if not ''.join(out[index + 1:]):
+                out[index] = ''  # qayta ochilgandan keyin matn yo'q: bo'sh teg qoldirilmaydi
+            else:
+                out.append(f'</{tag}>')
+        else:
+            out[index] = _escape(delimiter)
+    return ''.join(out)
+
+
+def _line(line: str) -> str:
+    """Kod blokidan tashqaridagi bitta qator: sarlavha, chiziq, ro'yxat yoki oddiy matn"""
+    match = _HEADING.match(line)
+    if match:
+        return f'<b>{_inline(match.group(1), plain_bold=True)}</b>'
+    if _RULE.match(line):
+        return '———'
+    match = _BULLET.match(line)
+    if match:
+        return f'{match.group(1)}• {_inline(match.group(2))}'
+    return _inline(line)
+
+
+class MarkdownStream:
+    """
+    Bo'laklab kelayotgan markdown ni Telegram HTML ga o'girish.
+
+    Har bir to'liq qator faqat bir marta qayta ishlanadi; `html()` tayyor
+    qatorlarga hali tugamagan oxirgi qatorni va ochiq kod blokini yopuvchi
+    teglarni qo'shib, doim muvozanatdagi HTML qaytaradi.
+    """
+
+    def __init__(self):
+        self._lines: List[str] = []
+        self._tail = ''
+        self._fence: Optional[str] = None  # ochiq kod blokining ochuvchisi (masalan, ```python)
+        self._open_tag: Optional[str] = None  # hali birorta qatori chiqmagan kod blokining ochuvchi tegi
+        self._close_tag = ''
+
+    def feed(self, chunk: str) -> None:
+        self._tail += chunk
+        if '\n' not in chunk:
+            return
+        *lines, self._tail = self._tail.split('\n')
+        for line in lines:
+            self._push(line)
+
+    def _push(self, line: str) -> None:
+        if self._fence is None:
+            match = _FENCE.match(line)
+            if match is None:
+                self._lines.append(_line(line))
+                return
+            self._fence = match.group(1) + match.group(2)
+            language = match.group(2)
+            self._open_tag = f'<pre><code class="language-{escape(language)}">' if language else '<pre>'
+            self._close_tag = '</code></pre>' if language else '</pre>'
+            return
+
+        if closes_fence(line, self._fence):
+            if self._open_tag is None:
+                self._lines[-1] += self._close_tag
+            self._fence = self._open_tag = None
+            return
+        self._lines.append(self._code_line(line))
+
+    def _code_line(self, line: str) -> str:
+        text = _escape(line)
+        if self._open_tag is not None:
+            text, self._open_tag = self._open_tag + text, None
+        return text
+
+    def html(self) -> str:
+        """Hozirgacha kelgan matnning HTML ko'rinishi"""
+        lines = self._lines
+        tail = self._tail
+        if self._fence is None:
+            if tail and not _FENCE.match(tail):
+                lines = lines + [_line(tail)]
+        # Ochiq kod bloki vaqtincha yopiladi (holat o'zgartirilmaydi)
+        elif tail and not closes_fence(tail, self._fence):
+            lines = lines + [(self._open_tag or '') + _escape(tail) + self._close_tag]
+        elif self._open_tag is None:
+            lines = lines[:-1] + [lines[-1] + self._close_tag]
+        return '\n'.join(lines)
+
+
+def markdown_to_html(text: str) -> str:
+    """Markdown formatini Telegram HTML ga o‘zgartirish (bir o'tishda, teglar muvozanatda)"""
+    stream = MarkdownStream()
+    stream.feed(text)
+    return stream.html()
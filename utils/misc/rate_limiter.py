@@ -0,0 +1,69 @@
+import time
+from array import array
+from collections import OrderedDict
+from typing import Hashable
+
+
+class _Window:
+    """Bitta kalit uchun oxirgi `limit` ta so'rov vaqtlari (to'lgach halqa bufer bo'ladi)"""
+
+    __slots__ = ('times', 'pos', 'last')
+
+    def __init__(self):
+        self.times = array('d')
+        self.pos = 0  # bufer to'lgandan keyin eng eski yozuv indeksi
+        self.last = float('-inf')
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding window rate limiter: `period` sekund ichida ko'pi bilan `limit` ta so'rov.
+
+    Vaqt monotonic soatdan olinadi, har bir kalit uchun hajmi `limit` dan oshmaydigan
+    halqa bufer ishlatiladi (tekshiruv O(1), yangi ro'yxat yaratilmaydi).
+    Kalitlar LRU tartibida saqlanadi: `period` dan beri faol bo'lmaganlar
+    va `max_keys` dan oshganlari o'chiriladi.
+    """
+
+    def __init__(self, limit: int, period: float, max_keys: int = 100000):
+        self.limit = limit
+        self.period = period
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[Hashable, _Window]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def hit(self, key: Hashable) -> float:
+        """So'rovni qayd etish: ruxsat bo'lsa 0, aks holda qancha sekund kutish kerakligini qaytarish"""
+        now = time.monotonic()
+        windows = self._windows
+
+        window = windows.get(key)
+        if window is None:
+            self._evict(now)
+            window = windows[key] = _Window()
+        else:
+            windows.move_to_end(key)
+
+        times = window.times
+        if len(times) < self.limit:
+            times.append(now)
+        else:
+            oldest = times[window.pos]
+            if now - oldest < self.period:
+                return self.period - (now - oldest)
+            times[window.pos] = now
+            window.pos = (window.pos + 1) % self.limit
+
+        window.last = now
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        """LRU boshidagi muddati o'tgan yoki ortiqcha kalitlarni o'chirish"""
+        windows = self._windows
+        while windows:
+            key, window = next(iter(windows.items()))
+            if len(windows) < self.max_keys and now - window.last < self.period:
+                break
+            del windows[key]
@@ -1,3 +1,11 @@
+import math
+from functools import wraps
+
+from aiogram.types import Message
+
+from .rate_limiter import SlidingWindowLimiter
+
+
 def rate_limit(limit: int, key=None):
     """
     Decorator for configuring rate limit and key in different functions.
@@ -14,3 +22,30 @@ def rate_limit(limit: int, key=None):
         return func
 
     return decorator
+
+
+def user_rate_limit(limit: int = 3, period: int = 60):
+    """
+    Rate limiting dekoratori
+    :param limit: Ruxsat etilgan so‘rovlar soni
+    :param period: Vaqt oralig'i (sekundlarda)
+    """
+    limiter = SlidingWindowLimiter(limit, period)
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(message: Message, *args, **kwargs):
+            # So‘rovlar sonini tekshirish
+            retry_after = limiter.hit(message.from_user.id)
+            if retry_after:
+                await message.reply(
+                    f"⚠️ Juda ko‘p so‘rov yubordingiz. "
+                    f"Iltimos, {math.ceil(retry_after)} sekund kutib turing."
+                )
+                return
+
+            return await func(message, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Hozir ishlayotgan handler nomi, task bo'yicha (sampler thread ham o'qiy oladi)
+_task_handlers: Dict[asyncio.Task, str] = {}
+
+
+@contextmanager
+def handler_scope(name: str) -> Iterator[None]:
+    """Joriy task ichida `name` handleri ishlayotganini belgilash"""
+    task = asyncio.current_task()
+    previous = _task_handlers.get(task)
+    _task_handlers[task] = name
+    try:
+        yield
+    finally:
+        if previous is None:
+            _task_handlers.pop(task, None)
+        else:
+            _task_handlers[task] = previous
+
+
+class LoopWatchdog:
+    """
+    Event loop kechikishini o'lchaydi va loop bloklanganda aybdor stackni yozadi.
+
+    Loop ichidagi heartbeat har `interval` da uyg'onib vaqtni belgilaydi va
+    kechikishni metrikaga yozadi. Alohida thread heartbeat `threshold` dan
+    ko'proq kechiksa, `sys._current_frames()` orqali loop thread ining
+    stackini va o'sha paytdagi handler nomini logga chiqaradi (har bir
+    bloklanish uchun bir marta).
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, stack_limit: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_limit = stack_limit
+        self.stalls = 0
+        self._beat = time.monotonic()
+        self._reported_beat: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def _heartbeat(self) -> None:
+        lag = metrics.event_loop_lag
+        while True:
+            started = time.monotonic()
+            self._beat = started
+            await asyncio.sleep(self.interval)
+            lag.observe(max(0.0, time.monotonic() - started - self.interval))
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or beat == self._reported_beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame, limit=self.stack_limit))
+            task = asyncio.current_task(self._loop)
+            handler = _task_handlers.get(task, "-") if task is not None else "-"
+            self.stalls += 1
+            metrics.event_loop_blocked.labels(handler).inc()
+            logger.warning(f"Event loop blocked for {blocked:.3f}s+ (handler: {handler}, task: "
+                           f"{task.get_name() if task is not None else '-'})\n{stack}")
+
+    def start(self) -> None:
+        """Heartbeat va sampler thread ni ishga tushirish (event loop ichida chaqiriladi)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._sample, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._thread.join(timeout=1)
+        self._thread = None
@@ -4,10 +4,8 @@ from data.config import ADMINS
 
 
 async def on_startup_notify():
-    from loader import bot
-    for admin in ADMINS:
-        try:
-            await bot.send_message(admin, "Bot ishga tushdi")
-
-        except Exception as err:
-            logging.exception(err)
+    from loader import broadcaster
+    # Adminlarga parallel, lekin umumiy flood limiti doirasida
+    counts = await broadcaster.deliver(ADMINS, "Bot ishga tushdi")
+    if counts['sent'] < len(ADMINS):
+        logging.warning(f"Startup notification not delivered to every admin: {counts}")
@@ -0,0 +1,2 @@
+from .cache import CacheStats, ResponseCache, first_turn_only, make_key, normalize_text
+from .tiers import CacheTier, RedisCacheTier, SQLiteCacheTier
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from providers.base import served_by
+from .tiers import CacheTier
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r'\s+')
+# Savol oxiridagi tinish belgilari javobni o'zgartirmaydi: "Python nima?" == "python nima"
+_TRAILING = re.compile(r'[\s?!.…]+$')
+
+
+def normalize_text(text: str) -> str:
+    """Kesh kaliti uchun matnni normallashtirish: kichik harf, bitta bo'shliq, oxirgi tinish belgilarisiz"""
+    return _TRAILING.sub('', _SPACES.sub(' ', text).strip().casefold())
+
+
+def make_key(provider: str, model: str, messages: List[Dict]) -> str:
+    """provider + model + normallashtirilgan sistema xabari va tarix bo'yicha kalit"""
+    normalized = [provider, model] + [[message['role'], normalize_text(message['content'])] for message in messages]
+    payload = json.dumps(normalized, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def first_turn_only(messages: List[Dict]) -> bool:
+    """Faqat tarixsiz so'rovlar (sistema xabari + bitta foydalanuvchi xabari) keshlanadi"""
+    return sum(1 for message in messages if message['role'] != 'system') == 1 and messages[-1]['role'] == 'user'
+
+
+class CacheStats:
+    """Javoblar keshi hisoblagichlari"""
+
+    __slots__ = ('hits', 'misses', 'stores', 'skipped', 'evictions')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0  # keshlanmaydigan (tarixli) so'rovlar
+        self.evictions = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ResponseCache:
+    """
+    Provayder javoblari uchun aniq moslik (exact-match) keshi.
+
+    Birinchi daraja - xotiradagi LRU+TTL, ikkinchisi ixtiyoriy `tier`
+    (Redis yoki SQLite). Kesh topilsa javob provayderga so'rov yubormasdan
+    bo'laklab qaytariladi va odatdagidek StreamRenderer orqali ko'rsatiladi.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0, tier: Optional[CacheTier] = None,
+                 cacheable: Callable[[List[Dict]], bool] = first_turn_only, replay_chunk: int = 200):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tier = tier
+        self.cacheable = cacheable
+        self.replay_chunk = replay_chunk
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, text = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return text
+
+    def _set_local(self, key: str, text: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        text = self._get_local(key)
+        if text is None and self.tier is not None:
+            try:
+                found = await self.tier.get(key)
+            except Exception as e:
+                logger.warning(f"Response cache tier read failed: {e}")
+                found = None
+            if found is not None:
+                text, ttl = found
+                self._set_local(key, text, min(ttl, self.ttl))
+        return text
+
+    async def set(self, key: str, text: str) -> None:
+        self._set_local(key, text, self.ttl)
+        self.stats.stores += 1
+        if self.tier is not None:
+            try:
+                await self.tier.set(key, text, self.ttl)
+            except Exception as e:
+                logger.warning(f"Response cache tier write failed: {e}")
+
+    async def stream(self, provider, messages: List[Dict]) -> AsyncIterator[str]:
+        """provider.stream o'rniga: keshdan qaytarish yoki javobni olib keshga yozish"""
+        if not self.cacheable(messages):
+            self.stats.skipped += 1
+            async with aclosing(provider.stream(messages)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+        key = make_key(provider.name, provider.model, messages)
+        text = await self.get(key)
+        if text is not None:
+            self.stats.hits += 1
+            for start in range(0, len(text), self.replay_chunk):
+                yield text[start:start + self.replay_chunk]
+            return
+
+        self.stats.misses += 1
+        parts = []
+        served_by.set(None)
+        async with aclosing(provider.stream(messages)) as chunks:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+
+        # Faqat oxirigacha muvaffaqiyatli olingan javob keshlanadi - uni haqiqatda bergan
+        # provayder/model kaliti bilan (router zaxira provayderdan olgan bo'lishi mumkin)
+        text = ''.join(parts)
+        if text.strip():
+            source = served_by.get()
+            if source is not None and source != (provider.name, provider.model):
+                key = make_key(*source, messages)
+            await self.set(key, text)
+
+    async def close(self) -> None:
+        if self.tier is not None:
+            await self.tier.close()
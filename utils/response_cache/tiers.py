@@ -0,0 +1,92 @@
+import asyncio
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+
+class CacheTier(ABC):
+    """Javoblar keshining ikkinchi (umumiy yoki doimiy) darajasi"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(javob matni, qolgan TTL sekundda) yoki None"""
+
+    @abstractmethod
+    async def set(self, key: str, text: str, ttl: float) -> None:
+        """Javobni TTL bilan saqlash"""
+
+    async def close(self) -> None:
+        """Resurslarni yopish"""
+
+
+class RedisCacheTier(CacheTier):
+    """Bir nechta bot jarayoni uchun umumiy Redis keshi (muddati Redis tomonidan o'chiriladi)"""
+
+    def __init__(self, redis, prefix: str = 'response_cache:'):
+        self.redis = redis
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            text, ttl_ms = await pipe.get(self.prefix + key).pttl(self.prefix + key).execute()
+        if text is None:
+            return None
+        return (text.decode('utf-8') if isinstance(text, bytes) else text), max(ttl_ms, 0) / 1000
+
+    async def set(self, key: str, text: str, ttl: float) -> None:
+        await self.redis.set(self.prefix + key, text, px=int(ttl * 1000))
+
+
+class SQLiteCacheTier(CacheTier):
+    """Qayta ishga tushirishdan keyin ham saqlanadigan disk keshi (bitta thread da ishlaydi)"""
+
+    SCHEMA = "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, text TEXT NOT NULL, expires_at REAL)"
+
+    def __init__(self, db_path: str, cleanup_every: int = 500):
+        self.db_path = db_path
+        # Muddati o'tganlarni o'chirish butun jadvalni ko'radi: har yozuvda emas, har `cleanup_every` tasida
+        self.cleanup_every = cleanup_every
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(self.SCHEMA)
+        return self._conn
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _get(self, key: str) -> Optional[Tuple[str, float]]:
+        row = self._connection().execute(
+            "SELECT text, expires_at FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0], row[1] - time.time()
+
+    def _set(self, key: str, text: str, ttl: float) -> None:
+        conn = self._connection()
+        now = time.time()
+        self._writes += 1
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)", (key, text, now + ttl))
+            if self._writes % self.cleanup_every == 0:
+                conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+
+    async def get(self, key: str) -> Optional[Tuple[str, float]]:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, text: str, ttl: float) -> None:
+        await self._run(self._set, key, text, ttl)
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
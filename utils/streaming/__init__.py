@@ -0,0 +1,2 @@
+from .renderer import StreamRenderer, render_stream, stats
+from .splitter import TELEGRAM_MESSAGE_LIMIT, MessageSplitter, Split, split_message, utf16_len
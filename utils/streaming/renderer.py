@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Optional
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from utils.misc.markdown import MarkdownStream
+from .splitter import TELEGRAM_MESSAGE_LIMIT, MessageSplitter
+
+logger = logging.getLogger(__name__)
+
+
+class RendererStats:
+    """Streaming renderer hisoblagichlari: qabul qilingan bo'laklar va yuborilgan tahrirlar"""
+
+    __slots__ = ('chunks_received', 'edits_sent', 'edits_skipped', 'messages_sent', 'retry_after')
+
+    def __init__(self):
+        self.chunks_received = 0
+        self.edits_sent = 0
+        self.edits_skipped = 0
+        self.messages_sent = 0
+        self.retry_after = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+stats = RendererStats()
+
+# chat_id -> keyingi so'rov yuborilishi mumkin bo'lgan vaqt (monotonic)
+_next_call_at: Dict[int, float] = {}
+
+
+def _reserve_slot(chat_id: int, interval: float) -> float:
+    """Chat uchun navbatdagi bo'sh vaqtni band qilish va unga qadar kutish kerak bo'lgan sekundni qaytarish"""
+    now = time.monotonic()
+    at = max(_next_call_at.get(chat_id, 0.0), now)
+    _next_call_at[chat_id] = at + interval
+    if len(_next_call_at) > 10000:
+        for key in [key for key, next_at in _next_call_at.items() if next_at < now]:
+            del _next_call_at[key]
+    return at - now
+
+
+class StreamRenderer:
+    """
+    Provayderdan kelayotgan javobni Telegram xabarida yangilab borish.
+
+    Bo'laklar kelishi bilan faqat matnga qo'shiladi; alohida vazifa har bir
+    chat uchun `min_interval` sekundda ko'pi bilan bir marta eng so'nggi
+    to'plangan matn bilan xabarni tahrirlaydi. Matn Telegram limitidan
+    (4096 UTF-16 birligi) oshishi bilan joriy xabar MessageSplitter tanlagan
+    chegarada (paragraf, kod bloki, gap) yakunlanadi va davomi darhol yangi
+    xabarda ko'rsatiladi.
+
+    `markdown=True` bo'lsa, har bir xabar matni MarkdownStream orqali
+    bo'laklar kelishi bilan Telegram HTML ga o'giriladi.
+    """
+
+    def __init__(self, message: types.Message, placeholder: str = "Thinking...",
+                 min_interval: float = 1.0, parse_mode: Optional[str] = None, markdown: bool = False):
+        self.message = message
+        self.placeholder = placeholder
+        self.min_interval = min_interval
+        self.parse_mode = "HTML" if markdown else parse_mode
+        self.markdown = markdown
+        if markdown:
+            mode = 'markdown'
+        else:
+            mode = 'html' if (parse_mode or '').upper() == 'HTML' else 'plain'
+        self._splitter = MessageSplitter(TELEGRAM_MESSAGE_LIMIT, mode)
+
+        self.text = ""
+        self._chat_id = message.chat.id
+        self._sent: Optional[types.Message] = None
+        self._rendered = ""
+        self._offset = 0  # joriy xabar boshlanadigan indeks
+        self._prefix = ''  # joriy xabar boshiga qo'shiladigan qayta ochilgan kod bloki yoki teglar
+        self._dirty = asyncio.Event()
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+        self._edits = 0
+        self._chunks = 0
+        self._markdown: Optional[MarkdownStream] = None
+        self._markdown_start = self._markdown_end = 0  # MarkdownStream ga berilgan matn oralig'i
+
+    async def start(self) -> None:
+        self._sent = await self._call(self.message.reply, self.placeholder, parse_mode=self.parse_mode)
+        self._rendered = self.placeholder
+        self._task = asyncio.create_task(self._run())
+
+    async def feed(self, chunk: str) -> None:
+        self.text += chunk
+        self._chunks += 1
+        stats.chunks_received += 1
+        self._dirty.set()
+
+    async def finish(self) -> str:
+        self._closing = True
+        self._dirty.set()
+        if self._task is not None:
+            await self._task
+
+        # Indekslar (`_offset`) siljimasligi uchun faqat oxiridagi bo'shliqlar olib tashlanadi
+        text = self.text.rstrip()
+        await self._render(text if text.strip() else "...")
+        logger.debug(f"Stream to chat {self._chat_id}: {self._chunks} chunks, {self._edits} edits")
+        return text.strip()
+
+    async def abort(self) -> None:
+        """Stream xatolik bilan tugaganda fon vazifasini to'xtatish"""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            await self._dirty.wait()
+            if self._closing:
+                return
+            self._dirty.clear()
+            if self.text.strip():
+                await self._render(self.text)
+
+    async def _render(self, text: str) -> None:
+        # Joriy xabarga sig'magan qism yakunlanadi, davomi darhol yangi xabarda
+        split = self._splitter.cut(text, self._offset, self._prefix)
+        while split is not None:
+            await self._edit(text, self._offset, split.end, split.suffix)
+            self._offset, self._prefix = split.end, split.prefix
+            split = self._splitter.cut(text, self._offset, self._prefix)
+            end, suffix = (split.end, split.suffix) if split is not None else (len(text), '')
+            self._sent = await self._send(text, self._offset, end, suffix)
+            self._rendered = text[self._offset:end] + suffix
+            stats.messages_sent += 1
+
+        await self._edit(text, self._offset, len(text))
+
+    def _format(self, text: str, start: int, end: int, suffix: str = '') -> str:
+        """Xabarga yuboriladigan matn: markdown yoqilgan bo'lsa, text[start:end] ning HTML ko'rinishi"""
+        if not self.markdown:
+            return self._prefix + text[start:end] + suffix
+        if self._markdown is None or start != self._markdown_start or end < self._markdown_end:
+            # Yangi xabar (yoki finish() dagi rstrip): qaytadan boshlanadi
+            self._markdown = MarkdownStream()
+            self._markdown.feed(self._prefix)
+            self._markdown_start = self._markdown_end = start
+        self._markdown.feed(text[self._markdown_end:end])
+        self._markdown_end = end
+        # Ochiq kod bloki html() da yopiladi, suffix kerak emas
+        return self._markdown.html()
+
+    async def _send(self, text: str, start: int, end: int, suffix: str = '') -> types.Message:
+        try:
+            return await self._call(self.message.reply, self._format(text, start, end, suffix),
+                                    parse_mode=self.parse_mode)
+        except TelegramBadRequest as e:
+            if not self.markdown or "can't parse entities" not in str(e):
+                raise
+            return await self._call(self.message.reply, text[start:end], parse_mode=None)
+
+    async def _edit(self, text: str, start: int, end: int, suffix: str = '') -> None:
+        if text[start:end] + suffix == self._rendered:
+            stats.edits_skipped += 1
+            return
+        try:
+            await self._call(self._sent.edit_text, self._format(text, start, end, suffix),
+                             parse_mode=self.parse_mode)
+        except TelegramBadRequest as e:
+            if self.markdown and "can't parse entities" in str(e):
+                # Telegram HTML ni qabul qilmasa, matn formatlashsiz ko'rsatiladi
+                await self._call(self._sent.edit_text, text[start:end], parse_mode=None)
+            elif "message is not modified" not in str(e):
+                raise
+        self._rendered = text[start:end] + suffix
+        self._edits += 1
+        stats.edits_sent += 1
+
+    async def _call(self, method, *args, **kwargs):
+        """Chat uchun interval va RetryAfter ni hisobga olgan holda Telegram so'rovini yuborish"""
+        while True:
+            delay = _reserve_slot(self._chat_id, self.min_interval)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await method(*args, **kwargs)
+            except TelegramRetryAfter as e:
+                stats.retry_after += 1
+                _next_call_at[self._chat_id] = max(
+                    _next_call_at.get(self._chat_id, 0.0), time.monotonic() + e.retry_after
+                )
+
+
+async def render_stream(message: types.Message, chunks: AsyncIterator[str], **options) -> str:
+    """Javob bo'laklarini StreamRenderer orqali foydalanuvchiga ko'rsatish va to'liq matnni qaytarish"""
+    renderer = StreamRenderer(message, **options)
+    await renderer.start()
+    try:
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                await renderer.feed(chunk)
+    except BaseException:
+        await renderer.abort()
+        raise
+    return await renderer.finish()
@@ -0,0 +1,210 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils.misc.markdown import closes_fence, fence_opener
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+_SENTENCE_END = re.compile(r'[.!?…]\s')
+_HTML_TOKEN = re.compile(r'<(/?)([a-zA-Z][\w-]*)[^>]*>|&(?:#\d+|#x[0-9a-fA-F]+|\w+);')
+_OPEN_TAG = re.compile(r'<([a-zA-Z][\w-]*)[^>]*>')
+_BLOCK_TAGS = frozenset({'pre', 'blockquote'})
+
+
+def utf16_len(text: str) -> int:
+    """Telegram hisoblaydigan uzunlik: UTF-16 kod birliklari soni"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _fit(text: str, start: int, units: int) -> int:
+    """text[start:end] `units` ta UTF-16 birligiga sig'adigan eng katta `end`"""
+    end = min(len(text), start + units)
+    while True:
+        excess = utf16_len(text[start:end]) - units
+        if excess <= 0:
+            return end
+        # Har bir surrogate juftlik bitta ortiqcha birlik: kamida shuncha belgi olib tashlanadi
+        end -= (excess + 1) // 2
+
+
+def _last_sentence_end(text: str, start: int, end: int) -> int:
+    last = -1
+    for match in _SENTENCE_END.finditer(text, start, end):
+        last = match.end()
+    return last
+
+
+class Split(NamedTuple):
+    end: int  # yakunlangan qism text[start:end]
+    prefix: str = ''  # keyingi qism boshiga qo'shiladigan ochuvchi belgilar (kod bloki, teglar)
+    suffix: str = ''  # yakunlangan qism oxiriga qo'shiladigan yopuvchi belgilar
+
+
+class MessageSplitter:
+    """
+    Uzun javobni Telegram xabarlariga bo'lish: uzunlik UTF-16 birliklarida o'lchanadi.
+
+    Kesish joyi ustuvorlik bo'yicha tanlanadi: paragraf yoki kod bloki
+    oxiri, qator oxiri, gap oxiri, bo'shliq va faqat oxirgi chora sifatida
+    aynan limit (kesish qismni kamida yarmigacha to'ldirishi kerak).
+    mode: plain - oddiy matn; markdown - kod bloki ichida kesilsa, keyingi
+    qism ``` bilan qayta ochiladi; html - ochiq teglar qism oxirida yopilib,
+    keyingisida qayta ochiladi.
+
+    `cut` holatsiz: oldingi qismning `prefix` i keyingi chaqiruvga beriladi,
+    shuning uchun uni streaming da har yangilanishda chaqirish mumkin - qism
+    to'lishi bilan yakunlanadi va keyingi xabar darhol boshlanadi.
+    """
+
+    def __init__(self, limit: int = TELEGRAM_MESSAGE_LIMIT, mode: str = 'plain'):
+        if mode not in ('plain', 'markdown', 'html'):
+            raise ValueError(f"Unknown split mode: {mode}")
+        self.limit = limit
+        self.mode = mode
+
+    def cut(self, text: str, start: int = 0, prefix: str = '') -> Optional[Split]:
+        """text[start:] limitga sig'masa, birinchi qismning kesish joyi; sig'sa None"""
+        if self.mode == 'html':
+            return self._cut_html(text, start, prefix)
+        end = _fit(text, start, self.limit)
+        if end >= len(text):
+            return None
+        return self._cut_text(text, start, end, prefix)
+
+    def _cut_text(self, text: str, start: int, end: int, prefix: str) -> Split:
+        markdown = self.mode == 'markdown'
+        fence = fence_opener(prefix) if markdown and prefix else None
+        low = start + (end - start) // 2
+        block = line = -1
+        line_fence = None
+
+        pos = start
+        while True:
+            newline = text.find('\n', pos, end)
+            if newline == -1:
+                break
+            current = text[pos:newline]
+            if markdown:
+                if fence is None:
+                    fence = fence_opener(current)
+                    if fence is not None:
+                        # Kod blokidan oldin kesish - bo'sh blok qoldirmaslik uchun
+                        if pos > start:
+                            line, line_fence = pos, None
+                        pos = newline + 1
+                        continue
+                elif closes_fence(current, fence):
+                    fence = None
+                    block = newline + 1
+            if fence is None and not current.strip():
+                block = newline + 1
+            line, line_fence = newline + 1, fence
+            pos = newline + 1
+
+        if block >= low:
+            return Split(block)
+        if line >= low:
+            return self._in_fence(text, line, line_fence)
+        # Qator ichida kesiladi: holat - oxirgi to'liq qatordan keyingi holat
+        cut = _last_sentence_end(text, low, end)
+        if cut == -1:
+            space = max(text.rfind(' ', low, end), text.rfind('\t', low, end))
+            cut = space + 1 if space != -1 else end
+        return self._in_fence(text, cut, fence)
+
+    @staticmethod
+    def _in_fence(text: str, end: int, fence: Optional[str]) -> Split:
+        if fence is None:
+            return Split(end)
+        delimiter = fence[:len(fence) - len(fence.lstrip(fence[0]))]
+        suffix = delimiter if text[end - 1] == '\n' else '\n' + delimiter
+        return Split(end, prefix=fence + '\n', suffix=suffix)
+
+    def _cut_html(self, text: str, start: int, prefix: str) -> Optional[Split]:
+        stack: List[Tuple[str, str]] = [(match.group(1).lower(), match.group(0))
+                                        for match in _OPEN_TAG.finditer(prefix)]
+        limit = self.limit
+        low = limit // 2
+        visible = 0
+        best: Dict[str, Tuple[int, tuple]] = {}  # tur -> (indeks, o'sha joydagi ochiq teglar)
+        n = len(text)
+        pos = start
+        while pos < n:
+            match = _HTML_TOKEN.search(text, pos)
+            run_end = match.start() if match is not None else n
+            if pos < run_end:
+                units = utf16_len(text[pos:run_end])
+                if visible + units > limit:
+                    end = _fit(text, pos, limit - visible)
+                    self._candidates(text, pos, end, visible, low, stack, best)
+                    return self._choose_html(best, end, stack)
+                self._candidates(text, pos, run_end, visible, low, stack, best)
+                visible += units
+            if match is None:
+                return None
+
+            if match.group(2):
+                name = match.group(2).lower()
+                if not match.group(1):
+                    stack.append((name, match.group(0)))
+                else:
+                    for index in range(len(stack) - 1, -1, -1):
+                        if stack[index][0] == name:
+                            del stack[index]
+                            break
+                    if name in _BLOCK_TAGS and visible >= low:
+                        best['block'] = (match.end(), tuple(stack))
+            else:
+                # HTML entity ko'rinadigan matnda bitta belgi
+                if visible + 1 > limit:
+                    return self._choose_html(best, match.start(), stack)
+                visible += 1
+            pos = match.end()
+        return None
+
+    @staticmethod
+    def _candidates(text: str, start: int, end: int, visible: int, low: int,
+                    stack: List[Tuple[str, str]], best: Dict[str, Tuple[int, tuple]]) -> None:
+        # Indeks farqi ko'rinadigan uzunlikka taxminan teng (faqat "yarmigacha to'ldirish" sharti uchun)
+        if visible + (end - start) < low:
+            return
+        floor = max(start, start + low - visible)
+        state = tuple(stack)
+        in_pre = any(name == 'pre' for name, _ in stack)
+        found = {
+            'paragraph': -1 if in_pre else text.rfind('\n\n', floor, end),
+            'line': text.rfind('\n', floor, end),
+            'sentence': _last_sentence_end(text, floor, end),
+            'space': text.rfind(' ', floor, end),
+        }
+        for kind, index in found.items():
+            if index != -1:
+                best[kind] = (index if kind == 'sentence' else index + 1, state)
+
+    @staticmethod
+    def _choose_html(best: Dict[str, Tuple[int, tuple]], hard: int, stack: List[Tuple[str, str]]) -> Split:
+        blocks = [best[kind] for kind in ('block', 'paragraph') if kind in best]
+        if blocks:
+            end, state = max(blocks)
+        else:
+            kind = next((kind for kind in ('line', 'sentence', 'space') if kind in best), None)
+            end, state = best[kind] if kind is not None else (hard, tuple(stack))
+        return Split(
+            end,
+            prefix=''.join(tag for _, tag in state),
+            suffix=''.join(f'</{name}>' for name, _ in reversed(state)),
+        )
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT, mode: str = 'plain') -> List[str]:
+    """Matnni har biri alohida yuborilishi mumkin bo'lgan qismlarga bo'lish"""
+    splitter = MessageSplitter(limit, mode)
+    parts: List[str] = []
+    start, prefix = 0, ''
+    while True:
+        split = splitter.cut(text, start, prefix)
+        if split is None:
+            parts.append(prefix + text[start:])
+            return parts
+        parts.append(prefix + text[start:split.end] + split.suffix)
+        start, prefix = split.end, split.prefix
@@ -0,0 +1,366 @@
+"""
+Ko'p jarayonli rejim: bitta qabul qiluvchi (polling yoki webhook) va N ta worker.
+
+Supervisor jarayoni updatelarni pydantic modellariga o'girmaydi - faqat JSON
+dan foydalanuvchi ID sini oladi va updateni `user_id % WORKERS` indeksli
+workerga Unix socket orqali uzatadi. Bitta foydalanuvchining barcha
+updatelari doim bitta workerga boradi, shuning uchun xotiradagi FSM,
+throttling va TurnGuard holati har bir workerda to'g'ri qoladi; chat tarixi
+esa workerlar bo'yicha bo'linadi (loader._data_manager ga qarang).
+Worker ichida updatelar UpdateQueue da parallel qayta ishlanadi, ya'ni bitta
+foydalanuvchining updatelari qat'iy tartibda bajarilishi kafolatlanmaydi:
+suhbat navbatlarini TurnGuard ketma-ket qiladi.
+Faqat admin /broadcast buyruqlari barcha workerlarga yuboriladi
+(utils.broadcast ga qarang).
+
+Worker - odatdagi app: handlerlar, on_startup/on_shutdown va webhook
+rejimidagi UpdateQueue. Kutilmaganda to'xtagan worker qayta ishga tushiriladi.
+
+    WORKERS=4 python -m utils.supervisor
+"""
+import asyncio
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import ClientError, ClientTimeout, web
+
+from data import config
+from utils.broadcast import is_fanout_command
+
+logger = logging.getLogger(__name__)
+
+# Har bir update: 4 baytli uzunlik (big-endian) + JSON
+_FRAME = struct.Struct('!I')
+RESPAWN_DELAY = 1.0
+
+
+def shard_for(user_id: int, workers: int) -> int:
+    """Foydalanuvchi updatelarini qayta ishlovchi worker indeksi"""
+    return user_id % workers
+
+
+def owns_user(index: int, workers: int, user_id: str) -> bool:
+    """Chat tarixidagi foydalanuvchi (kalit - ID satri) `index` workerga tegishlimi"""
+    try:
+        return shard_for(int(user_id), workers) == index
+    except ValueError:
+        return index == 0
+
+
+def update_user_id(update: dict) -> Optional[int]:
+    """Raw updatedagi foydalanuvchi ID si (foydalanuvchi bo'lmasa - chat ID si)"""
+    for key, event in update.items():
+        if key == 'update_id' or not isinstance(event, dict):
+            continue
+        for field in ('from', 'user'):
+            user = event.get(field)
+            if isinstance(user, dict) and 'id' in user:
+                return user['id']
+        chat = event.get('chat') or (event.get('message') or {}).get('chat')
+        return chat.get('id') if isinstance(chat, dict) else None
+    return None
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_FRAME.size)
+    return await reader.readexactly(_FRAME.unpack(header)[0])
+
+
+def _write_frame(writer: asyncio.StreamWriter, payload: bytes) -> None:
+    writer.write(_FRAME.pack(len(payload)) + payload)
+
+
+class WorkerLink:
+    """Supervisor tomonidagi bitta worker: jarayon va unga ulangan socket"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connected = asyncio.Event()
+        self.sent = 0
+        self._lock = asyncio.Lock()
+
+    def attach(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.connected.set()
+
+    def detach(self) -> None:
+        self.connected.clear()
+        self.writer = None
+
+    async def send(self, payload: bytes) -> None:
+        """Updateni workerga yuborish; worker uzilgan bo'lsa, qayta ulanguncha kutiladi"""
+        while True:
+            await self.connected.wait()
+            writer = self.writer
+            try:
+                async with self._lock:
+                    _write_frame(writer, payload)
+                    # Worker navbati to'lsa, socket buferi ham to'ladi - qabul qiluvchi sekinlashadi
+                    await writer.drain()
+            except ConnectionError:
+                if self.writer is writer:
+                    self.detach()
+                continue
+            self.sent += 1
+            return
+
+
+class Supervisor:
+    """Worker jarayonlarini boshqarish va updatelarni ularga foydalanuvchi bo'yicha taqsimlash"""
+
+    def __init__(self, bot: Bot, workers: int):
+        self.bot = bot
+        self.workers = workers
+        self.links = [WorkerLink(index) for index in range(workers)]
+        self.allowed_updates: Optional[List[str]] = None
+        self._context = multiprocessing.get_context('spawn')
+        self._directory: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopping = False
+
+    @property
+    def socket_path(self) -> str:
+        return os.path.join(self._directory, 'workers.sock')
+
+    async def start(self, timeout: float = 120.0) -> None:
+        """Workerlarni ishga tushirish va hammasi ulanib, tayyor bo'lguncha kutish"""
+        self._directory = tempfile.mkdtemp(prefix='bot-supervisor-')
+        self._server = await asyncio.start_unix_server(self._accept, path=self.socket_path)
+        for link in self.links:
+            self._spawn(link)
+        await asyncio.wait_for(asyncio.gather(*(link.connected.wait() for link in self.links)), timeout)
+        logger.info(f"{self.workers} workers ready")
+
+    def _spawn(self, link: WorkerLink) -> None:
+        # spawn: yangi jarayon muhit o'zgaruvchilarini start() paytidagi holatda oladi,
+        # data.config esa ularni worker ichida import qilinganda o'qiydi
+        os.environ.update(WORKERS=str(self.workers), WORKER_INDEX=str(link.index))
+        try:
+            link.process = self._context.Process(target=_run_worker, args=(link.index, self.socket_path),
+                                                  name=f"bot-worker-{link.index}")
+            link.process.start()
+        finally:
+            del os.environ['WORKER_INDEX']
+        asyncio.get_running_loop().add_reader(link.process.sentinel, self._on_exit, link)
+
+    def _on_exit(self, link: WorkerLink) -> None:
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(link.process.sentinel)
+        link.process.join()
+        if self._stopping:
+            return
+        logger.error(f"Worker {link.index} exited with code {link.process.exitcode}, restarting")
+        link.detach()
+        loop.call_later(RESPAWN_DELAY, lambda: self._stopping or self._spawn(link))
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        hello = json.loads(await _read_frame(reader))
+        link = self.links[hello['worker']]
+        if self.allowed_updates is None:
+            self.allowed_updates = hello.get('allowed_updates')
+        link.attach(writer)
+        try:
+            # Worker hech narsa yubormaydi: EOF - worker to'xtadi
+            await reader.read()
+        finally:
+            if link.writer is writer:
+                link.detach()
+            writer.close()
+
+    async def dispatch(self, update: dict, payload: Optional[bytes] = None) -> None:
+        """
+        Updateni foydalanuvchisi tegishli workerga uzatish (ID yo'q bo'lsa - birinchi workerga).
+        Admin broadcast buyruqlari barcha workerlarga: har biri o'z foydalanuvchilariga yuboradi.
+        """
+        if payload is None:
+            payload = json.dumps(update, ensure_ascii=False).encode()
+        if is_fanout_command(update, config.ADMINS):
+            await asyncio.gather(*(link.send(payload) for link in self.links))
+            return
+        user_id = update_user_id(update)
+        link = self.links[shard_for(user_id, self.workers) if user_id is not None else 0]
+        await link.send(payload)
+
+    async def poll(self, timeout: int = 10) -> None:
+        """getUpdates long polling: javob JSON holida olinadi va darhol workerlarga tarqatiladi"""
+        session = await self.bot.session.create_session()
+        url = self.bot.session.api.api_url(self.bot.token, 'getUpdates')
+        offset: Optional[int] = None
+        backoff = 1.0
+        while True:
+            # aiogram kabi form-data: Bot API ham, local server ham qabul qiladi
+            params = {'timeout': str(timeout)}
+            if offset is not None:
+                params['offset'] = str(offset)
+            if self.allowed_updates is not None:
+                params['allowed_updates'] = json.dumps(self.allowed_updates)
+            try:
+                async with session.post(url, data=params, timeout=ClientTimeout(total=timeout + 10)) as response:
+                    result = await response.json()
+            except (ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.warning(f"getUpdates failed: {e!r}, retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            if not result.get('ok'):
+                retry_after = (result.get('parameters') or {}).get('retry_after', backoff)
+                logger.warning(f"getUpdates failed: {result.get('description')}, retrying in {retry_after:.0f}s")
+                await asyncio.sleep(retry_after)
+                continue
+            backoff = 1.0
+            for update in result['result']:
+                offset = update['update_id'] + 1
+                await self.dispatch(update)
+
+    def webhook_app(self, path: str, secret_token: Optional[str]) -> web.Application:
+        """Webhook qabul qiluvchi ilova: update tanasi o'zgartirilmasdan workerga uzatiladi"""
+
+        async def handle_update(request: web.Request) -> web.Response:
+            if secret_token:
+                header = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+                if not hmac.compare_digest(header, secret_token):
+                    return web.Response(status=401)
+            payload = await request.read()
+            try:
+                update = json.loads(payload)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Rejected malformed webhook request: {e}")
+                return web.Response(status=400)
+            if not isinstance(update, dict):
+                return web.Response(status=400)
+            await self.dispatch(update, payload)
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(path, handle_update)
+        return app
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Workerlarga EOF yuborish: ular navbatni tugatib, tarixni saqlab chiqadi"""
+        self._stopping = True
+        loop = asyncio.get_running_loop()
+        for link in self.links:
+            if link.process is not None:
+                loop.remove_reader(link.process.sentinel)
+            if link.writer is not None:
+                link.writer.close()
+        deadline = loop.time() + timeout
+        for link in self.links:
+            while link.process is not None and link.process.is_alive() and loop.time() < deadline:
+                await asyncio.sleep(0.1)
+            if link.process is not None and link.process.is_alive():
+                logger.warning(f"Worker {link.index} did not stop in {timeout:.0f}s, terminating")
+                link.process.terminate()
+                link.process.join()
+        self._server.close()
+        await self._server.wait_closed()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+# --- worker jarayoni ---
+
+def _run_worker(index: int, socket_path: str) -> None:
+    # Ctrl+C butun guruhga yuboriladi: to'xtatishni supervisor boshqaradi
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout,
+                        format=f"[worker {index}] %(levelname)s:%(name)s:%(message)s")
+    asyncio.run(_serve_worker(index, socket_path))
+
+
+async def _serve_worker(index: int, socket_path: str) -> None:
+    from aiogram.types import Update
+
+    import app
+    from loader import bot, dp, http_clients
+    from utils.webhook import UpdateQueue
+
+    dp.startup.register(app.on_startup)
+    dp.shutdown.register(app.on_shutdown)
+    updates = UpdateQueue(dp, bot, workers=config.WEBHOOK_WORKERS, maxsize=config.WEBHOOK_QUEUE_SIZE)
+    await updates.start()
+    await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot])
+
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    _write_frame(writer, json.dumps({"worker": index, "allowed_updates": dp.resolve_used_update_types()}).encode())
+    await writer.drain()
+    try:
+        while True:
+            try:
+                payload = await _read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            await updates.put(Update.model_validate_json(payload, context={"bot": bot}))
+    finally:
+        writer.close()
+        await updates.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot])
+        await bot.session.close()
+        await http_clients.aclose()
+
+
+# --- supervisor ---
+
+async def run_supervisor(workers: int) -> None:
+    """Workerlarni va qabul qiluvchini ishga tushirish (SIGINT/SIGTERM gacha ishlaydi)"""
+    if config.BOT_MODE == "webhook" and not config.WEBHOOK_BASE_URL:
+        raise ValueError("BOT_MODE=webhook requires WEBHOOK_BASE_URL")
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(config.TELEGRAM_API_URL)) if config.TELEGRAM_API_URL else None
+    bot = Bot(token=config.BOT_TOKEN, session=session)
+    supervisor = Supervisor(bot, workers)
+    if config.HISTORY_STORAGE in ('json', 'log'):
+        logger.warning(f"HISTORY_STORAGE={config.HISTORY_STORAGE}: history is partitioned per worker, "
+                       f"changing WORKERS moves users away from their history (use sharded or sqlite)")
+
+    runner: Optional[web.AppRunner] = None
+    receiver: Optional[asyncio.Task] = None
+    await supervisor.start()
+    try:
+        if config.BOT_MODE == "webhook":
+            runner = web.AppRunner(supervisor.webhook_app(config.WEBHOOK_PATH, config.WEBHOOK_SECRET))
+            await runner.setup()
+            await web.TCPSite(runner, host=config.WEBAPP_HOST, port=config.WEBAPP_PORT).start()
+            await bot.set_webhook(
+                url=f"{config.WEBHOOK_BASE_URL.rstrip('/')}{config.WEBHOOK_PATH}",
+                secret_token=config.WEBHOOK_SECRET,
+                allowed_updates=supervisor.allowed_updates,
+                drop_pending_updates=False,
+            )
+            logger.info(f"Webhook server listening on {config.WEBAPP_HOST}:{config.WEBAPP_PORT}{config.WEBHOOK_PATH}")
+        else:
+            await bot.delete_webhook(drop_pending_updates=False)
+            receiver = asyncio.create_task(supervisor.poll())
+            logger.info("Polling for updates")
+        await stop.wait()
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+        if runner is not None:
+            await runner.cleanup()
+        await supervisor.stop()
+        await bot.session.close()
+        logger.info(f"Updates per worker: {[link.sent for link in supervisor.links]}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    asyncio.run(run_supervisor(config.WORKERS))
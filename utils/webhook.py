@@ -0,0 +1,134 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """
+    Webhook orqali kelgan updatelar uchun chegaralangan navbat va N ta worker.
+
+    Navbat to'lsa, webhook handler joy bo'shaguncha kutadi - Telegram
+    yangi updatelarni sekinroq yuboradi (backpressure). Updatelar kelish
+    tartibida olinadi, lekin `workers` tasi parallel ishlaydi: bitta
+    foydalanuvchining ketma-ket xabarlari ham bir vaqtda handlerga yetishi
+    mumkin (polling dagi handle_as_tasks kabi; suhbatda TurnGuard ularni
+    navbatga qo'yadi yoki birlashtiradi).
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int = 16, maxsize: int = 1000):
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self.queue: "asyncio.Queue[Update]" = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker(), name=f"update-worker-{i}") for i in range(self.workers)]
+
+    async def put(self, update: Update) -> None:
+        await self.queue.put(update)
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.exception(f"Failed to process update {update.update_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Navbatdagi updatelarni qayta ishlab bo'lish va workerlarni to'xtatish"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.queue.qsize()} updates left unprocessed on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Ilovadagi navbatga (masalan, testlarda) kirish kaliti
+UPDATE_QUEUE_KEY = web.AppKey("updates", UpdateQueue)
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, path: str, secret_token: Optional[str],
+                       workers: int = 16, queue_size: int = 1000) -> web.Application:
+    """Telegram webhook qabul qiluvchi aiohttp ilovasini yaratish"""
+    updates = UpdateQueue(dp, bot, workers=workers, maxsize=queue_size)
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret_token:
+            header = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(header, secret_token):
+                return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except (json.JSONDecodeError, ValidationError) as e:
+            logger.warning(f"Rejected malformed webhook request: {e}")
+            return web.Response(status=400)
+        await updates.put(update)
+        return web.Response()
+
+    async def on_startup(_: web.Application) -> None:
+        await updates.start()
+        await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot])
+
+    async def on_shutdown(_: web.Application) -> None:
+        await updates.stop()
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot])
+
+    app = web.Application()
+    app[UPDATE_QUEUE_KEY] = updates
+    app.router.add_post(path, handle_update)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, base_url: str, path: str, secret_token: Optional[str],
+                      host: str, port: int, workers: int = 16, queue_size: int = 1000) -> None:
+    """
+    Webhook ni o'rnatish va aiohttp serverini ishga tushirish. SIGINT/SIGTERM gacha
+    ishlaydi, so'ng navbat tugatiladi va on_shutdown (chat tarixini saqlash) bajariladi.
+    """
+    if not base_url:
+        raise ValueError("BOT_MODE=webhook requires WEBHOOK_BASE_URL")
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    app = create_webhook_app(dp, bot, path, secret_token, workers=workers, queue_size=queue_size)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+
+    await bot.set_webhook(
+        url=f"{base_url.rstrip('/')}{path}",
+        secret_token=secret_token,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=False,
+    )
+    logger.info(f"Webhook server listening on {host}:{port}{path}")
+
+    try:
+        await stop.wait()
+        logger.info("Stopping webhook server")
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()